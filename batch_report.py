@@ -0,0 +1,223 @@
+import argparse
+import datetime
+import itertools
+import json
+import os
+import re
+import time
+import pandas as pd
+import compare
+
+# default output directory of batch reports
+PATH_REPORTS = './reports'
+
+class ParameterSidebar:
+    def __init__(self, params):
+        '''
+        Sidebar answering the widgets of the dashboard with the values of a parameter set, by widget label (without the trailing colon), or with
+        their default values, so that a request is defined exactly as through the Streamlit sidebar, without it. Values are checked against the
+        options of the widgets.
+
+        Args:
+            params: Dictionary with the value of each widget, by label (e.g., {'Instrument': 'ES', 'Group by': 'Time'}).
+        '''
+        self.params = params
+        self.used = set()
+
+    def _get(self, label, default):
+        '''
+        Function to get the value of a widget, marking the parameter as used.
+        '''
+        key = label.strip().rstrip(':')
+        if key not in self.params:
+            return default
+        self.used.add(key)
+        return self.params[key]
+
+    def _check(self, label, values, options):
+        '''
+        Function to check that values are options of a widget.
+        '''
+        list_options = list(options)
+        for value in values:
+            if value not in list_options:
+                raise ValueError(f"'{value}' is not an option of '{label.strip().rstrip(':')}' (options: {list_options}).")
+
+    def _check_range(self, label, values, min_value, max_value):
+        '''
+        Function to check that values are in the range of a widget.
+        '''
+        for value in values:
+            if ((min_value is not None) and (value < min_value)) or ((max_value is not None) and (value > max_value)):
+                raise ValueError(f"{value} is out of the range of '{label.strip().rstrip(':')}' ({min_value} to {max_value}).")
+
+    def radio(self, label, options, **kwargs):
+        value = self._get(label, list(options)[0])
+        self._check(label, [value], options)
+        return value
+
+    selectbox = radio
+
+    def multiselect(self, label, options, default = None, **kwargs):
+        values = list(self._get(label, default or []))
+        self._check(label, values, options)
+        return values
+
+    def number_input(self, label, min_value = None, max_value = None, value = None, **kwargs):
+        value = type(value)(self._get(label, value))
+        self._check_range(label, [value], min_value, max_value)
+        return value
+
+    def select_slider(self, label, options, value = None, **kwargs):
+        values = list(self._get(label, value))
+        self._check(label, values, options)
+        return values
+
+    def slider(self, label, min_value, max_value, value, **kwargs):
+        # dates are given as strings
+        if isinstance(min_value, datetime.datetime):
+            convert = lambda x: pd.Timestamp(x).to_pydatetime()
+        elif isinstance(min_value, datetime.date):
+            convert = lambda x: pd.Timestamp(x).date()
+        else:
+            convert = type(min_value)
+        values = [convert(i) for i in self._get(label, value)]
+        self._check_range(label, values, min_value, max_value)
+        return type(value)(values)
+
+    date_input = slider
+
+    def text_input(self, label, value = '', **kwargs):
+        return str(self._get(label, value))
+
+    def error(self, text):
+        raise ValueError(text)
+
+    def check_unused(self):
+        '''
+        Function to check that all the parameters were used by a widget of the request (e.g., no misspelled labels, nor widgets hidden by the
+        other options).
+
+        Args: None.
+
+        Returns: None.
+        '''
+        list_unused = [key for key in self.params.keys() if key not in self.used]
+        if len(list_unused) > 0:
+            raise ValueError(f'Parameters not used by the widgets of the request: {", ".join(list_unused)}.')
+
+def read_jobs(path):
+    '''
+    Function to read the parameter sets of a batch report from a JSON file with a list of reports, each with a name, the values of the widgets
+    shared by its charts (`params`) and, optionally, the lists of values of the widgets whose combinations give its charts (`grid`), e.g.:
+        {"reports": [{"name": "ranges", "params": {"Timeframe": "5m", "Date range": ["2015-01-01", "2024-12-31"]},
+                      "grid": {"Instrument": ["ES", "NQ"], "Group by": ["Time", "Day of week + time"], "Metric": ["Range", "Volume"]}}]}
+    Widgets are identified by their label in the sidebar, without the trailing colon; widgets which are not given keep their default value.
+
+    Args:
+        path: File path.
+
+    Returns:
+        list_jobs: List of dictionaries with keys 'name' (unique, used for output files) and 'params'.
+    '''
+    with open(path) as file:
+        content = json.load(file)
+    list_jobs = []
+    for report in content['reports']:
+        grid = report.get('grid', {})
+        for values in itertools.product(*grid.values()):
+            name = '_'.join([report['name']] + [re.sub('[^0-9A-Za-z]+', '-', str(value)).strip('-') for value in values])
+            list_jobs.append({'name': name, 'params': {**report.get('params', {}), **dict(zip(grid.keys(), values))}})
+    # names made unique
+    dict_count = {}
+    for job in list_jobs:
+        dict_count[job['name']] = dict_count.get(job['name'], 0) + 1
+        if dict_count[job['name']] > 1:
+            job['name'] = f'{job["name"]}_{dict_count[job["name"]]}'
+    return list_jobs
+
+def run_job(job, path_output, max_rows = 250000):
+    '''
+    Function to compute and plot the chart of a parameter set, as the dashboard does, writing the chart as a self-contained HTML file (with the
+    plotting library embedded) and the aggregated results as a CSV table to the output directory.
+
+    Args:
+        job: Dictionary with keys 'name' and 'params' (see `read_jobs`).
+        path_output: Output directory.
+        max_rows: Maximum number of rows of a time series (see `Dashboard`).
+
+    Returns:
+        summary: Dictionary with the name, instrument, status ('OK', 'Refused' or 'Error'), strategy of the request, rows of the table,
+            computation and plotting times (in seconds) and messages of the job.
+    '''
+    from dashboard import Dashboard
+    summary = {'name': job['name'], 'instrument': job['params'].get('Instrument'), 'status': 'OK', 'strategy': None, 'rows': 0,
+               'time_compute': 0.0, 'time_plot': 0.0, 'messages': ''}
+    time_start = time.perf_counter()
+    try:
+        sidebar = ParameterSidebar(job['params'])
+        dashboard = Dashboard(max_rows = max_rows, sidebar = sidebar)
+        sidebar.check_unused()
+        if (len(dashboard.compare_instruments) > 0) or (dashboard.correlation == 'Yes') or (dashboard.live_mode == 'Yes'):
+            raise ValueError('Comparisons, correlations and live sessions are not available in batch reports.')
+        if dashboard.session_conditions is None:
+            raise ValueError('Conditions on sessions are not valid.')
+        summary['instrument'] = dashboard.instrument
+        # messages are collected instead of being shown
+        dashboard.shown = []
+        dashboard._get_data()
+        dashboard._plan_query()
+        summary['strategy'] = dashboard.plan['strategy']
+        if dashboard.plan['strategy'] == 'Refuse':
+            summary['status'] = 'Refused'
+        else:
+            dashboard._compute()
+            if dashboard.zoom_window is not None:
+                dashboard._compute_zoom()
+            dashboard.df.to_csv(os.path.join(path_output, f'{job["name"]}.csv'), index = False)
+            summary['rows'] = dashboard.df.shape[0]
+            summary['time_compute'] = time.perf_counter() - time_start
+            time_start = time.perf_counter()
+            dashboard._plot().write_html(os.path.join(path_output, f'{job["name"]}.html'), include_plotlyjs = True)
+            summary['time_plot'] = time.perf_counter() - time_start
+        summary['messages'] = ' | '.join(dashboard.shown)
+    except Exception as error:
+        summary['status'] = 'Error'
+        summary['messages'] = f'{type(error).__name__}: {error}'
+    return summary
+
+def run_batch(list_jobs, path_output = PATH_REPORTS, max_workers = None, max_rows = 250000):
+    '''
+    Function to run the jobs of a batch report on the pool of worker processes (see `compare.get_executor`), writing a run summary with the
+    timings of each job to the output directory. Jobs are submitted grouped by instrument: the first process needing an instrument decodes its
+    data and publishes it in shared memory, and the other jobs of the instrument map it (see `data_store.attach`), in any process.
+
+    Args:
+        list_jobs: List of jobs (see `read_jobs`).
+        path_output: Output directory.
+        max_workers: Number of processes of the pool (used only when the pool is created).
+        max_rows: Maximum number of rows of a time series (see `Dashboard`).
+
+    Returns:
+        df_summary: Frame with the summary of each job (see `run_job`).
+    '''
+    os.makedirs(path_output, exist_ok = True)
+    executor = compare.get_executor(max_workers)
+    list_jobs = sorted(list_jobs, key = lambda job: str(job['params'].get('Instrument', '')))
+    list_futures = [executor.submit(run_job, job, path_output, max_rows) for job in list_jobs]
+    df_summary = pd.DataFrame([future.result() for future in list_futures])
+    df_summary.to_csv(os.path.join(path_output, 'summary.csv'), index = False)
+    return df_summary
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Charts and tables of predefined parameter sets of the dashboard.')
+    parser.add_argument('path_jobs', help = 'JSON file with the parameter sets (see `read_jobs`).')
+    parser.add_argument('--output', default = PATH_REPORTS, help = 'Output directory.')
+    parser.add_argument('--workers', type = int, default = None, help = 'Number of worker processes (by default, the number of CPUs).')
+    args = parser.parse_args()
+    #
+    time_start = time.perf_counter()
+    df_summary = run_batch(read_jobs(args.path_jobs), args.output, args.workers)
+    print(df_summary[['name', 'status', 'strategy', 'rows', 'time_compute', 'time_plot']].to_string(index = False, float_format = '%.2f'))
+    print(f'{(df_summary["status"] == "OK").sum()} of {df_summary.shape[0]} jobs done in {time.perf_counter() - time_start:.1f} s; summary written to '
+          f'{os.path.join(args.output, "summary.csv")}.')
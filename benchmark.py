@@ -0,0 +1,423 @@
+import numpy as np
+import pandas as pd
+import argparse
+import os
+import tempfile
+import time
+
+def make_bars(n_days = 250, sess_start = '17:00:00', sess_end = '16:00:00', seed = 0):
+    '''
+    Function to generate synthetic 1-minute bars (with the columns of the data files), used when real data is not available.
+
+    Args:
+        n_days: Number of sessions.
+        sess_start: Session opening time ('%H:%M:%S').
+        sess_end: Session closing time ('%H:%M:%S').
+        seed: Seed of the random generator.
+
+    Returns:
+        df: Synthetic bars.
+    '''
+    rng = np.random.default_rng(seed)
+    minutes_start, minutes_end = [pd.Timedelta(i).value//(60*10**9) for i in [sess_start, sess_end]]
+    n_minutes = (minutes_end - minutes_start)%1440 + 1
+    # sessions end on business days
+    days_end = pd.bdate_range('2015-01-05', periods = n_days)
+    days_start = days_end - pd.Timedelta(days = 1 if minutes_start > minutes_end else 0)
+    date = (days_start.values[:, None] + np.timedelta64(minutes_start, 'm') + np.arange(n_minutes)*np.timedelta64(1, 'm')).ravel()
+    session_start = np.tile(np.arange(n_minutes) == 0, n_days)
+    close = np.round((3000 + np.cumsum(rng.normal(0, 1, date.shape[0])))*4)/4
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    return pd.DataFrame({'date': date, 'session_start': session_start, 'open': open_,
+                         'high': np.maximum(open_, close) + rng.integers(0, 4, date.shape[0])*0.25,
+                         'low': np.minimum(open_, close) - rng.integers(0, 4, date.shape[0])*0.25, 'close': close, 'bpv': 50.0,
+                         'vol': rng.integers(1, 500, date.shape[0])})
+
+def load_bars(instrument, n_days):
+    '''
+    Function to load the bars of an instrument, falling back to synthetic bars if its data file is not available (e.g., not fetched from LFS).
+
+    Args:
+        instrument: Instrument name (`None` for synthetic bars).
+        n_days: Number of sessions of the synthetic bars.
+
+    Returns:
+        df: Bars, with session counter.
+    '''
+    import data_store
+    if instrument is not None:
+        try:
+            return data_store.read_instrument(instrument)
+        except Exception:
+            print(f'Data of {instrument} not available: synthetic bars are used.')
+    df = make_bars(n_days)
+    df['n_sess'] = np.cumsum(df['session_start'].values) - 1.0
+    return df
+
+def bench_live(df, timeframe = '5m', metric = 'Num highs or lows'):
+    '''
+    Function to measure the latency of the live mode for each new bar (feed read plus session update); the final state is checked against a batch
+    computation in `tests/test_live_feed.py`.
+    '''
+    from live_feed import BarFeed, LiveSession, append_to_feed
+    df = df[df['n_sess'] >= df['n_sess'].max() - 1].reset_index(drop = True)
+    path_feed = os.path.join(tempfile.mkdtemp(), 'feed.csv')
+    feed = BarFeed(path_feed)
+    live = LiveSession('17:00:00', timeframe, metric)
+    latency = []
+    for i in range(df.shape[0]):
+        append_to_feed(path_feed, df.iloc[i:i + 1])
+        time_start = time.perf_counter()
+        live.update(feed.read_new())
+        latency.append(time.perf_counter() - time_start)
+    latency = np.array(latency)*1000
+    print(f'Live update ({timeframe}, {metric}): {latency.shape[0]} bars, mean {latency.mean():.3f} ms, median {np.median(latency):.3f} ms, '
+          f'p99 {np.percentile(latency, 99):.3f} ms per new bar.')
+
+def bench_quantiles(df, list_q = [0.1, 0.25, 0.5, 0.75, 0.9]):
+    '''
+    Function to compare the quantile sketches with exact quantiles on the 'Time' grouping of 1-minute bars (range of each bar): speed, memory
+    and rank error, also when the sketches of single years are merged.
+    '''
+    from quantile_sketch import QuantileSketch
+    time_of_day = (df['date'] - df['date'].dt.normalize()).values.astype(np.int64)
+    groups = np.unique(time_of_day, return_inverse = True)[1]
+    values = (df['high'] - df['low']).values.astype(float)
+    #
+    time_start = time.perf_counter()
+    df_exact = pd.DataFrame({'group': groups, 'value': values}).groupby('group')['value'].quantile(list_q).unstack()
+    time_exact = time.perf_counter() - time_start
+    time_start = time.perf_counter()
+    sketch = QuantileSketch.from_values(groups, values)
+    groups_sketch, result = sketch.quantile(list_q)
+    time_sketch = time.perf_counter() - time_start
+    # sketches of single years, merged
+    years = df['date'].dt.year.values
+    time_start = time.perf_counter()
+    sketch_merged = None
+    for year in np.unique(years):
+        sketch_year = QuantileSketch.from_values(groups[years == year], values[years == year])
+        sketch_merged = sketch_year if sketch_merged is None else sketch_merged.merge(sketch_year)
+    result_merged = sketch_merged.quantile(list_q)[1]
+    time_merged = time.perf_counter() - time_start
+    # rank error: distance between the requested quantile and the range of ranks of the estimate (values are discrete, so ties are common)
+    values_sorted = pd.DataFrame({'group': groups, 'value': values}).sort_values(by = ['group', 'value'])
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(groups))))
+    def _rank_error(x, estimate, q):
+        rank_left, rank_right = np.searchsorted(x, estimate, side = 'left')/x.shape[0], np.searchsorted(x, estimate, side = 'right')/x.shape[0]
+        return max(rank_left - q, q - rank_right, 0)
+    error, error_merged = 0, 0
+    for i, group in enumerate(groups_sketch):
+        x = values_sorted['value'].values[offsets[group]:offsets[group + 1]]
+        for j, q in enumerate(list_q):
+            error, error_merged = max(error, _rank_error(x, result[i, j], q)), max(error_merged, _rank_error(x, result_merged[i, j], q))
+    print(f'Quantiles {list_q} of {values.shape[0]} values in {groups_sketch.shape[0]} groups: exact {time_exact*1000:.1f} ms, '
+          f'sketch {time_sketch*1000:.1f} ms, sketches merged by year {time_merged*1000:.1f} ms.')
+    print(f'Memory: values {values.nbytes/1024**2:.2f} MB, sketches {sketch.nbytes/1024**2:.2f} MB.')
+    print(f'Max rank error: {error:.4f} (sketch), {error_merged:.4f} (merged by year); max difference from exact quantiles: '
+          f'{np.abs(result - df_exact.loc[groups_sketch].values).max():.4f}.')
+
+def bench_bootstrap(df, n_boot = 1000, n_naive = 20):
+    '''
+    Function to measure the replicates per second of the bootstrap of the 'Time' profile of 1-minute bars (range of each bar), with one process
+    and with a process pool, against a loop resampling sessions with pandas.
+    '''
+    from session_matrix import SessionMatrix
+    df = df[df['n_sess'] >= 0].reset_index(drop = True)
+    df['metric'] = (df['high'] - df['low']).astype(float)
+    matrix = SessionMatrix(df, 17*3600*10**9, ['metric'])
+    labels = (np.zeros(matrix.shape[0], dtype = int), np.zeros(matrix.shape[0], dtype = int))
+    for n_jobs in sorted(set([1, os.cpu_count()])):
+        time_start = time.perf_counter()
+        matrix.bootstrap('metric', labels, 'Mean', n_boot = n_boot, n_jobs = n_jobs)
+        time_boot = time.perf_counter() - time_start
+        print(f'Bootstrap ({n_jobs} processes): {n_boot} replicates of {matrix.shape[0]} sessions x {matrix.shape[1]} time slots in '
+              f'{time_boot:.2f} s ({n_boot/time_boot:.0f} replicates/s).')
+    # loop over replicates
+    df['time'] = (df['date'] - pd.Timedelta(17, unit = 'h')).dt.time
+    list_sess = df['n_sess'].unique()
+    rng = np.random.default_rng(0)
+    time_start = time.perf_counter()
+    for _ in range(n_naive):
+        sessions = pd.DataFrame({'n_sess': rng.choice(list_sess, list_sess.shape[0])})
+        sessions.merge(df[['n_sess', 'time', 'metric']], on = 'n_sess').groupby('time')['metric'].mean()
+    time_naive = time.perf_counter() - time_start
+    print(f'Loop with pandas: {n_naive} replicates in {time_naive:.2f} s ({n_naive/time_naive:.1f} replicates/s).')
+
+def bench_tops(df, k = 15, n_repeat = 5):
+    '''
+    Function to measure the selection of the highest and lowest values of the 'History' results of 1-minute bars (range of each bar) by year,
+    against sorting the whole results with pandas.
+    '''
+    from ranking import top_bottom_k
+    import decimal
+    values = (df['high'] - df['low']).values.astype(float)
+    codes, _ = pd.factorize(df['date'].dt.year)
+    df_result = pd.DataFrame({'Metric': values, 'Year': codes})
+    # sort of the whole results, and number of digits from the sorted distinct values
+    time_start = time.perf_counter()
+    for _ in range(n_repeat):
+        list_sorted = [df_year.sort_values(by = 'Metric', ascending = False) for _, df_year in df_result.groupby('Year')]
+        list_sorted = [(df_year.iloc[:k], df_year.iloc[-k:]) for df_year in list_sorted]
+        gap = np.diff(df_result['Metric'].drop_duplicates().sort_values().values[:2])[0]
+        len(decimal.Decimal(round(1/gap)).as_tuple().digits)
+    time_sort = (time.perf_counter() - time_start)/n_repeat
+    # partial selection, and number of digits from two minima
+    time_start = time.perf_counter()
+    for _ in range(n_repeat):
+        list_top, list_bottom = top_bottom_k(values, codes, k)
+        gap = values[values > values.min()].min() - values.min()
+        len(decimal.Decimal(round(1/gap)).as_tuple().digits)
+    time_select = (time.perf_counter() - time_start)/n_repeat
+    print(f'Tops and bottoms ({k} per year) of {values.shape[0]} results in {codes.max() + 1} years: sort {time_sort*1000:.1f} ms, '
+          f'partial selection {time_select*1000:.1f} ms ({time_sort/time_select:.1f}x).')
+
+def bench_first_paint(df, n_repeat = 5):
+    '''
+    Function to measure the time to build the sidebar of the dashboard (first paint, run without a Streamlit server) in a new server process,
+    against building it and importing the data, as done before widgets used the metadata of the instrument. The sidebar is also built after new
+    bars are appended (a new data version), which must not touch the data either.
+    '''
+    import logging
+    import shutil
+    import data_store
+    import ingest
+    from dashboard import Dashboard
+    logging.disable(logging.CRITICAL)
+    # data file of the first instrument of the sidebar, in a temporary directory
+    path_root = tempfile.mkdtemp()
+    os.makedirs(os.path.join(path_root, 'data'))
+    df.drop(columns = 'n_sess').to_pickle(os.path.join(path_root, 'data', 'data_AD.pickle.gz'))
+    os.environ['DASHBOARD_SHARED_DIR'] = os.path.join(path_root, 'shared')
+    os.chdir(path_root)
+    #
+    def _new_process():
+        data_store._release_all()
+        data_store._attached.clear()
+        data_store._metadata.clear()
+        shutil.rmtree(os.path.join(path_root, 'shared'), ignore_errors = True)
+    # last session of the bars, appended again a week later at each repetition
+    df_session = df[df['n_sess'] == df['n_sess'].iloc[-1]].drop(columns = 'n_sess')
+    list_times = {'sidebar with data import (as before)': [], 'sidebar, new data version': [], 'sidebar': []}
+    for i in range(n_repeat):
+        ingest.append_bars('AD', df_session.assign(date = df_session['date'] + pd.Timedelta(days = 7*(i + 1))), path_data = 'data')
+        _new_process()
+        time_start = time.perf_counter()
+        Dashboard()
+        list_times['sidebar, new data version'].append(time.perf_counter() - time_start)
+        #
+        _new_process()
+        time_start = time.perf_counter()
+        Dashboard()
+        list_times['sidebar'].append(time.perf_counter() - time_start)
+        #
+        _new_process()
+        time_start = time.perf_counter()
+        Dashboard()._get_data()
+        list_times['sidebar with data import (as before)'].append(time.perf_counter() - time_start)
+    print(f'First paint of the dashboard ({df.shape[0]} bars, new server process): ' +
+          ', '.join([f'{key} {np.median(times)*1000:.1f} ms' for key, times in list_times.items()]) + '.')
+
+def bench_rolling(df, list_windows = [5, 50, 500]):
+    '''
+    Function to measure the rolling z-score of the range of 1-minute bars by time slot over windows of sessions of increasing length, against a
+    rolling standard deviation with pandas, grouping by time slot.
+    '''
+    import rolling
+    from time_index import segment_offsets
+    df = df[df['n_sess'] >= 0].reset_index(drop = True)
+    values = (df['high'] - df['low']).values.astype(float)
+    offsets = segment_offsets(df['n_sess'].values)
+    slots = np.unique(((df['date'] - pd.Timedelta(17, unit = 'h')).dt.hour*60 + df['date'].dt.minute).values, return_inverse = True)[1]
+    dates_session = df['date'].values[offsets[:-1]]
+    for window in list_windows:
+        starts = rolling.get_window_starts(dates_session, window, 'Sessions')
+        time_start = time.perf_counter()
+        rolling.rolling_statistic(values, offsets, starts, 'Rolling z-score', slots)
+        time_prefix = time.perf_counter() - time_start
+        time_start = time.perf_counter()
+        pd.Series(values).groupby(slots).rolling(window, min_periods = 2).std()
+        time_pandas = time.perf_counter() - time_start
+        print(f'Rolling z-score by time slot over {window} sessions ({values.shape[0]} bars): prefix sums {time_prefix*1000:.1f} ms, '
+              f'pandas {time_pandas*1000:.1f} ms.')
+
+def bench_group(df, n_repeat = 3):
+    '''
+    Function to measure the grouping of the range of 1-minute bars for each `group_by` option (keys built from the dates, then aggregated), with
+    the fast paths of `fast_groupby` against formatting the keys with pandas and grouping with `groupby().agg()`.
+    '''
+    import fast_groupby
+    from time_index import format_dates, format_times, to_ns
+    df = df[['date', 'session_start', 'open', 'high', 'low', 'close', 'bpv', 'vol']].copy()
+    df['metric'] = df['high'] - df['low']
+    dict_agg = {'metric': 'mean', 'date': 'max', 'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+                'bpv': 'first', 'vol': 'sum'}
+    dict_keys = {'Time': ['time'], 'Day of week + time': ['weekday', 'time'], 'Day of month + time': ['day_of_month', 'time'],
+                 'Month + time': ['month', 'time'], 'Month + day of month + time': ['month', 'day_of_month', 'time'], 'History': ['history'],
+                 'Day of week + history': ['weekday', 'history'], 'Day of month + history': ['day_of_month', 'history'],
+                 'Month + history': ['month', 'history']}
+    # keys formatted by pandas, and looked up in a table of names or formatted once per distinct value
+    names = np.array([str(i) for i in range(32)], dtype = object)
+    dict_format = {'time': [lambda x: (x['date'] - pd.Timedelta(17, unit = 'h')).dt.time.astype(str),
+                            lambda x: format_times(to_ns(x['date']) - 17*3600*10**9)],
+                   'weekday': [lambda x: x['date'].dt.weekday.astype(str), lambda x: names[x['date'].dt.weekday.values]],
+                   'day_of_month': [lambda x: x['date'].dt.day.astype(str), lambda x: names[x['date'].dt.day.values]],
+                   'month': [lambda x: x['date'].dt.month.astype(str), lambda x: names[x['date'].dt.month.values]],
+                   'history': [lambda x: x['date'].astype(str), lambda x: format_dates(x['date'])]}
+    for group_by, group_cols in dict_keys.items():
+        list_times = []
+        for fast in [False, True]:
+            time_start = time.perf_counter()
+            for _ in range(n_repeat):
+                for col in group_cols:
+                    df[col] = dict_format[col][fast](df)
+                df_result = fast_groupby.aggregate(df, group_cols, dict_agg) if fast else None
+                if df_result is None:
+                    df_result = df.groupby(group_cols).agg(dict_agg).reset_index()
+            list_times.append((time.perf_counter() - time_start)/n_repeat)
+        print(f'{group_by} ({df_result.shape[0]} groups of {df.shape[0]} bars): pandas {list_times[0]*1000:.1f} ms, fast paths '
+              f'{list_times[1]*1000:.1f} ms ({list_times[0]/list_times[1]:.1f}x).')
+
+def bench_event(df, list_windows = [15, 60, 115], n_repeat = 3):
+    '''
+    Function to measure the alignment of 1-minute bars on the settlement (15:00) of each session, for windows of increasing length (within the
+    session, so that both methods see the same bars), gathering windows with `searchsorted` and fancy indexing against computing the offset of
+    every bar from the event of its session and grouping with pandas.
+    '''
+    import event_study
+    from time_index import segment_labels, segment_offsets, to_ns
+    df = df[df['n_sess'] >= 0].reset_index(drop = True)
+    ts = to_ns(df['date'])
+    values = (df['high'] - df['low']).values.astype(float)
+    offsets = segment_offsets(df['n_sess'].values)
+    for window in list_windows:
+        time_start = time.perf_counter()
+        for _ in range(n_repeat):
+            ts_anchor = event_study.get_anchor_times(ts[offsets[:-1]], 17*60, 15*60)
+            [matrix], minutes = event_study.gather_windows(ts, [values], ts_anchor, window, window, 1)
+            result, count = event_study.reduce_windows(matrix, np.zeros(matrix.shape[0], dtype = np.int64), 1, 'Mean')
+        time_gather = (time.perf_counter() - time_start)/n_repeat
+        time_start = time.perf_counter()
+        for _ in range(n_repeat):
+            ts_anchor = event_study.get_anchor_times(ts[offsets[:-1]], 17*60, 15*60)
+            offset = (ts - ts_anchor[segment_labels(offsets)])//(60*10**9)
+            keep = (offset >= -window) & (offset <= window)
+            series = pd.Series(values[keep]).groupby(offset[keep]).mean()
+        time_pandas = (time.perf_counter() - time_start)/n_repeat
+        assert np.allclose(series.values, result[0][count[0] > 0])
+        print(f'Event windows of +/- {window} minutes over {offsets.shape[0] - 1} sessions ({ts.shape[0]} bars): gather {time_gather*1000:.1f} ms, '
+              f'offsets of all bars with pandas {time_pandas*1000:.1f} ms ({time_pandas/time_gather:.1f}x).')
+
+def bench_bars(df, n_repeat = 3):
+    '''
+    Function to measure the building of daily and weekly bars from 1-minute bars, grouping by calendar day (`dt.date`) and ISO week
+    (`isocalendar()`) with pandas against reducing the contiguous segments of sessions and trading weeks.
+    '''
+    from time_index import NS_PER_DAY, reduce_segments, segment_offsets, to_ns
+    dict_agg = {'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'bpv': 'first', 'vol': 'sum'}
+    for timeframe in ['Daily', 'Weekly']:
+        time_start = time.perf_counter()
+        for _ in range(n_repeat):
+            if timeframe == 'Daily':
+                df_calendar = df.groupby(df['date'].dt.date).agg(dict_agg)
+            else:
+                df_calendar = pd.concat((df, df['date'].dt.isocalendar()), axis = 1).groupby(['year', 'week']).agg({'date': 'max', **dict_agg})
+        time_calendar = (time.perf_counter() - time_start)/n_repeat
+        time_start = time.perf_counter()
+        for _ in range(n_repeat):
+            ts = to_ns(df['date'])
+            offsets = segment_offsets(df['n_sess'].values)
+            if timeframe == 'Weekly':
+                offsets = offsets[segment_offsets((ts[offsets[1:] - 1]//NS_PER_DAY + 3)//7)]
+            df_session = reduce_segments(df, offsets, {'date': 'last', **dict_agg})
+        time_session = (time.perf_counter() - time_start)/n_repeat
+        print(f'{timeframe} bars of {df.shape[0]} bars: calendar groupby {time_calendar*1000:.1f} ms ({df_calendar.shape[0]} bars), session segments '
+              f'{time_session*1000:.1f} ms ({df_session.shape[0]} bars, {time_calendar/time_session:.1f}x).')
+
+def bench_periods(df, list_windows = [3, 6, 12], n_repeat = 3):
+    '''
+    Function to measure the grouping by time slot of 1-minute bars over rolling windows of periods, merging per-period partial aggregates
+    against grouping the bars of each window with pandas. Periods are months, so that synthetic bars have enough of them.
+    '''
+    from heatmap import window_reduce
+    from time_index import NS_PER_DAY, to_ns
+    values = (df['high'] - df['low']).values.astype(float)
+    slots, cols = np.unique(to_ns(df['date'])%NS_PER_DAY, return_inverse = True)
+    months = df['date'].dt.year.values*12 + df['date'].dt.month.values
+    periods = months - months.min()
+    n_periods = periods.max() + 1
+    for window in list_windows:
+        time_start = time.perf_counter()
+        for _ in range(n_repeat):
+            result, count = window_reduce(periods, np.zeros(cols.shape[0], dtype = np.int64), cols, values, (1, slots.shape[0]), n_periods, window,
+                                          'Mean')
+        time_partials = (time.perf_counter() - time_start)/n_repeat
+        time_start = time.perf_counter()
+        for _ in range(n_repeat):
+            list_series = [pd.Series(values[keep]).groupby(cols[keep]).mean()
+                           for keep in [(periods >= i) & (periods < i + window) for i in range(n_periods - window + 1)]]
+        time_pandas = (time.perf_counter() - time_start)/n_repeat
+        assert all(np.allclose(series.values, result[i, 0][count[i, 0] > 0]) for i, series in enumerate(list_series))
+        print(f'Rolling windows of {window} months ({result.shape[0]} windows of {values.shape[0]} bars): partial aggregates '
+              f'{time_partials*1000:.1f} ms, pandas by window {time_pandas*1000:.1f} ms ({time_pandas/time_partials:.1f}x).')
+
+def bench_profile(df, tick = 0.25, n_repeat = 3):
+    '''
+    Function to measure the volume-at-price profiles of 1-minute bars (over the whole date range and of each session), histogramming the volume
+    of each bar with `bincount`s at its lowest and above its highest level, against expanding every bar into its price levels and grouping them
+    with pandas. Multi-year data gives the real size of the absolute profile (e.g., `--instrument ES`, or synthetic bars with `--days 2500`).
+    '''
+    import market_profile
+    from time_index import segment_labels, segment_offsets
+    sessions = segment_labels(segment_offsets(df['n_sess'].values))
+    low, high = market_profile.price_levels(df['low'].values, tick), market_profile.price_levels(df['high'].values, tick)
+    weights = df['vol'].values.astype(float)
+    for profile_by, labels in [('Date range', np.zeros(df.shape[0], dtype = np.int64)), ('Session', sessions)]:
+        n_labels = labels.max() + 1
+        time_start = time.perf_counter()
+        for _ in range(n_repeat):
+            levels, groups, profile = market_profile.bin_profile(low, high, labels, n_labels, weights)
+        time_histogram = (time.perf_counter() - time_start)/n_repeat
+        time_start = time.perf_counter()
+        for _ in range(n_repeat):
+            n_levels = high - low + 1
+            rows = np.repeat(np.arange(df.shape[0]), n_levels)
+            level = low[rows] + np.arange(rows.shape[0]) - np.repeat(np.cumsum(n_levels) - n_levels, n_levels)
+            series = pd.Series((weights/n_levels)[rows]).groupby([labels[rows], level]).sum()
+        time_pandas = (time.perf_counter() - time_start)/n_repeat
+        assert np.allclose(series.values, profile)
+        print(f'Volume profile by {profile_by.lower()} ({df.shape[0]} bars, {rows.shape[0]} bar levels, {profile.shape[0]} bins): histogram '
+              f'{time_histogram*1000:.1f} ms, expanded levels with pandas {time_pandas*1000:.1f} ms ({time_pandas/time_histogram:.1f}x).')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Benchmarks of the dashboard computations.')
+    parser.add_argument('benchmark', choices = ['live', 'quantiles', 'bootstrap', 'tops', 'first_paint', 'rolling', 'group', 'event', 'bars',
+                                                     'periods', 'profile'],
+                        help = 'Benchmark to run.')
+    parser.add_argument('--instrument', default = None, help = 'Instrument whose data is used (synthetic bars if not given).')
+    parser.add_argument('--days', type = int, default = 250, help = 'Number of sessions of synthetic bars.')
+    args = parser.parse_args()
+    #
+    df = load_bars(args.instrument, args.days)
+    if args.benchmark == 'live':
+        bench_live(df)
+    if args.benchmark == 'quantiles':
+        bench_quantiles(df)
+    if args.benchmark == 'bootstrap':
+        bench_bootstrap(df)
+    if args.benchmark == 'tops':
+        bench_tops(df)
+    if args.benchmark == 'first_paint':
+        bench_first_paint(df)
+    if args.benchmark == 'rolling':
+        bench_rolling(df)
+    if args.benchmark == 'group':
+        bench_group(df)
+    if args.benchmark == 'event':
+        bench_event(df)
+    if args.benchmark == 'bars':
+        bench_bars(df)
+    if args.benchmark == 'periods':
+        bench_periods(df)
+    if args.benchmark == 'profile':
+        bench_profile(df)
@@ -0,0 +1,83 @@
+import numpy as np
+import concurrent.futures
+import multiprocessing
+import os
+import warnings
+
+# arrays used by the replicates computed in a process (set once for each worker of the pool)
+_shared = {}
+
+def bootstrap_ci(values, cross, list_groups, group_function, level = 0.95, n_boot = 1000, seed = 0, n_jobs = None, chunk_size = 100,
+                 min_parallel = 10**9):
+    '''
+    Function to compute bootstrap confidence intervals of intraday profiles, resampling whole sessions. Each replicate draws the number of times
+    each session is resampled (multinomial weights), so a block of replicates is a matrix product between weights and the (sessions x time slots)
+    values. Blocks of replicates are computed by a process pool when the computation is large.
+
+    Args:
+        values: Matrix (sessions x time slots) of values, NaN for missing bars.
+        cross: Array with 1 for the time slots falling on the calendar day after the session day, 0 otherwise.
+        list_groups: List with, for each group, the rows of its sessions and a boolean array (sessions x 2) telling whether the session belongs
+                     to the group before and after midnight.
+        group_function: 'Mean', 'Sum' or 'Cumsum'.
+        level: Confidence level.
+        n_boot: Number of replicates.
+        seed: Seed of the random generator.
+        n_jobs: Number of processes (by default, the number of CPUs).
+        chunk_size: Number of replicates of each block.
+        min_parallel: Minimum number of multiply-adds for which the process pool is used.
+
+    Returns:
+        lower: Matrix (groups x time slots) of lower bounds.
+        upper: Matrix (groups x time slots) of upper bounds.
+    '''
+    n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+    # blocks of replicates; each block has its own seed, so results do not depend on the number of processes
+    tasks = [(i, rows, include, min(chunk_size, n_boot - j)) for i, (rows, include) in enumerate(list_groups) for j in range(0, n_boot, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    list_args = [(rows, include, group_function, n, seed) for (_, rows, include, n), seed in zip(tasks, seeds)]
+    n_operations = n_boot*sum([rows.shape[0] for rows, _ in list_groups])*values.shape[1]
+    if (n_jobs > 1) and (n_operations >= min_parallel):
+        with concurrent.futures.ProcessPoolExecutor(max_workers = n_jobs, mp_context = multiprocessing.get_context('spawn'),
+                                                    initializer = _init_shared, initargs = (values, cross)) as executor:
+            list_futures = [executor.submit(_bootstrap_block, *args) for args in list_args]
+            list_replicates = [future.result() for future in list_futures]
+    else:
+        _init_shared(values, cross)
+        list_replicates = [_bootstrap_block(*args) for args in list_args]
+        _shared.clear()
+    # percentiles of the replicates of each group
+    lower = np.full((len(list_groups), values.shape[1]), np.nan)
+    upper = np.full((len(list_groups), values.shape[1]), np.nan)
+    task_groups = np.array([task[0] for task in tasks])
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category = RuntimeWarning)
+        for i in range(len(list_groups)):
+            replicates = np.vstack([list_replicates[j] for j in np.flatnonzero(task_groups == i)])
+            lower[i], upper[i] = np.nanpercentile(replicates, [50*(1 - level), 50*(1 + level)], axis = 0)
+    return lower, upper
+
+def _init_shared(values, cross):
+    '''
+    Function to keep the arrays used by the replicates in the process.
+    '''
+    _shared['valid'] = ~np.isnan(values)
+    _shared['values'] = np.where(_shared['valid'], values, 0)
+    _shared['cross'] = cross
+
+def _bootstrap_block(rows, include, group_function, n_boot, seed):
+    '''
+    Function to compute a block of replicates of the profile of a group of sessions.
+    '''
+    valid = _shared['valid'][rows] & include[:, _shared['cross']]
+    values = np.where(valid, _shared['values'][rows], 0)
+    rng = np.random.default_rng(seed)
+    weights = rng.multinomial(rows.shape[0], np.full(rows.shape[0], 1/rows.shape[0]), size = n_boot).astype(float)
+    total = weights@values
+    if group_function == 'Sum':
+        return total
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        mean = total/(weights@valid)
+    if group_function == 'Cumsum':
+        mean = np.where(np.isnan(mean), np.nan, np.cumsum(np.nan_to_num(mean), axis = 1))
+    return mean
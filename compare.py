@@ -0,0 +1,237 @@
+import numpy as np
+import pandas as pd
+import atexit
+import concurrent.futures
+import multiprocessing
+import os
+import session_registry
+import time
+import warnings
+
+# pool of worker processes, kept across requests
+_executor = None
+
+def get_executor(max_workers = None):
+    '''
+    Function to get the pool of worker processes computing the instruments of a comparison, creating it the first time.
+
+    Args:
+        max_workers: Number of processes (by default, the number of CPUs).
+
+    Returns:
+        executor: Pool of processes.
+    '''
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ProcessPoolExecutor(max_workers = max_workers or os.cpu_count(),
+                                                           mp_context = multiprocessing.get_context('spawn'))
+        atexit.register(_executor.shutdown)
+    return _executor
+
+def run_instrument(state, instrument):
+    '''
+    Function to compute the aggregated results of a request for an instrument, with the parameters of the request of another instrument. If the
+    time filter spans the whole session, the session of the instrument is used.
+
+    Args:
+        state: Dictionary with the attributes of the dashboard defining the request (data excluded).
+        instrument: Instrument name.
+
+    Returns:
+        df: Aggregated results (`None` if the request is too expensive, or data is missing or cannot be read).
+        attrs: Dictionary of attributes needed to plot the results.
+        elapsed: Computation time, in seconds.
+    '''
+    time_start = time.perf_counter()
+    dashboard = _make_dashboard(state, instrument)
+    try:
+        dashboard._get_data()
+    except FileNotFoundError:
+        return None, {'messages': [f'{instrument}: data is not available.']}, time.perf_counter() - time_start
+    # unreadable data files (e.g., corrupted or not fetched) only fail their instrument
+    except Exception as error:
+        return None, {'messages': [f'{instrument}: data cannot be read ({type(error).__name__}: {error}).']}, time.perf_counter() - time_start
+    dashboard._plan_query()
+    if dashboard.plan['strategy'] == 'Refuse':
+        return None, {'messages': [f'{instrument}: {text}' for text in dashboard.shown]}, time.perf_counter() - time_start
+    dashboard._compute()
+    return dashboard.df, _get_attrs(dashboard, dashboard.__dict__), time.perf_counter() - time_start
+
+def read_stored(state, instrument):
+    '''
+    Function to read the aggregated results of a request for an instrument from the result store, as `run_instrument` would compute them.
+
+    Args:
+        state: Dictionary with the attributes of the dashboard defining the request (data excluded).
+        instrument: Instrument name.
+
+    Returns:
+        result: Tuple with the outputs of `run_instrument` (`None` if the results are not in the store).
+    '''
+    time_start = time.perf_counter()
+    dashboard = _make_dashboard(state, instrument)
+    # if the data version cannot be read, results are computed (and the error reported) by `run_instrument`
+    try:
+        df, attrs = dashboard.result_store.get(dashboard._get_result_key())
+    except Exception:
+        return None
+    if df is None:
+        return None
+    dashboard.shown += attrs['messages']
+    return df, _get_attrs(dashboard, attrs), time.perf_counter() - time_start
+
+def compare_instruments(state, list_instruments, max_workers = None):
+    '''
+    Function to compute the aggregated results of a request for several instruments: results already in the result store are read, the others
+    are computed concurrently on the pool of worker processes.
+
+    Args:
+        state: Dictionary with the attributes of the dashboard defining the request (data excluded).
+        list_instruments: List of instrument names.
+        max_workers: Number of processes of the pool (used only when the pool is created).
+
+    Returns:
+        dict_results: Dictionary with the outputs of `run_instrument` of each instrument (instruments whose computation fails have no results,
+            and their error as message).
+    '''
+    dict_results = {instrument: read_stored(state, instrument) for instrument in list_instruments}
+    list_missing = [instrument for instrument, result in dict_results.items() if result is None]
+    if len(list_missing) > 0:
+        executor = get_executor(max_workers)
+        dict_futures = {instrument: executor.submit(run_instrument, state, instrument) for instrument in list_missing}
+        for instrument, future in dict_futures.items():
+            # an instrument failing in its worker is skipped, with its error as message
+            try:
+                dict_results[instrument] = future.result()
+            except Exception as error:
+                dict_results[instrument] = (None, {'messages': [f'{instrument}: results cannot be computed ({type(error).__name__}: {error}).']}, 0.0)
+    return dict_results
+
+def to_clock_time(values, minutes_shift):
+    '''
+    Function to shift the times of a grouping by time (strings '%H:%M:%S', or dates with time) back to clock times, so that instruments whose
+    sessions begin at different times are aligned.
+
+    Args:
+        values: Series of times.
+        minutes_shift: Shift of the times of the grouping, in minutes (see `Session.minutes_shift`).
+
+    Returns:
+        values: Series of clock times.
+    '''
+    shift = pd.Timedelta(minutes_shift, unit = 'min')
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values + shift
+    return (pd.to_datetime('2000-01-01 ' + values) + shift).dt.strftime('%H:%M:%S')
+
+def get_profile(df, attrs):
+    '''
+    Function to get the profile of an instrument (i.e., its aggregated metric) indexed by a key of the grid shared by all the instruments: the
+    breakdown and the value of the x-axis variable (in clock time).
+
+    Args:
+        df: Aggregated results.
+        attrs: Dictionary of attributes of the results (output of `run_instrument`).
+
+    Returns:
+        profile: Series of values of the metric.
+    '''
+    x = df[attrs['col_x']]
+    if (attrs['col_x'] in ['time', 'day of month']) and (attrs['minutes_shift'] is not None):
+        x = to_clock_time(x, attrs['minutes_shift'])
+    keys = x.astype(str)
+    if attrs['col_color'] is not None:
+        keys = df[attrs['col_color']].astype(str) + ' | ' + keys
+    return pd.Series(df['metric'].values.astype(float), index = keys.values)
+
+def correlation_matrix(dict_profiles, min_points = 10):
+    '''
+    Function to compute the correlation between the profiles of all pairs of instruments, on the points of the grid where both are defined.
+    Profiles are placed as rows of a matrix (NaN where undefined), so that counts, sums and cross products of all pairs are matrix products.
+
+    Args:
+        dict_profiles: Dictionary with the profile (output of `get_profile`) of each instrument.
+        min_points: Minimum number of common points needed to compute a correlation.
+
+    Returns:
+        corr: Matrix of correlations (NaN if the instruments have less than `min_points` points in common).
+        n_points: Matrix with the number of common points.
+    '''
+    grid = pd.Index(sorted(set().union(*[profile.index for profile in dict_profiles.values()])))
+    values = np.vstack([profile.reindex(grid).values for profile in dict_profiles.values()])
+    # profiles are standardized first, so that sums of squares do not lose precision
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category = RuntimeWarning)
+        values = (values - np.nanmean(values, axis = 1, keepdims = True))/np.nanstd(values, axis = 1, keepdims = True)
+    valid = (~np.isnan(values)).astype(float)
+    values = np.where(valid == 1, values, 0)
+    # pairwise counts, sums, sums of squares and cross products
+    n_points = valid@valid.T
+    total = values@valid.T
+    total_sq = (values**2)@valid.T
+    cross = values@values.T
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        cov = cross - total*total.T/n_points
+        corr = cov/np.sqrt((total_sq - total**2/n_points)*(total_sq.T - total.T**2/n_points))
+    corr[n_points < min_points] = np.nan
+    return np.clip(corr, -1, 1), n_points.astype(int)
+
+def cluster_order(corr):
+    '''
+    Function to order instruments so that instruments with similar profiles are close (spectral seriation): instruments are sorted by the angle
+    of their coordinates on the two leading eigenvectors of the correlation matrix.
+
+    Args:
+        corr: Matrix of correlations.
+
+    Returns:
+        order: Array with the order of the instruments.
+    '''
+    if corr.shape[0] < 3:
+        return np.arange(corr.shape[0])
+    _, vectors = np.linalg.eigh(np.nan_to_num(corr))
+    return np.argsort(np.arctan2(vectors[:, -2], vectors[:, -1]), kind = 'stable')
+
+def normalize(values, method):
+    '''
+    Function to normalize the metric of an instrument, so that instruments can be compared on the same scale.
+
+    Args:
+        values: Array of values.
+        method: 'No' or 'Z-score'.
+
+    Returns:
+        values: Normalized values.
+    '''
+    if method == 'Z-score':
+        return (values - np.nanmean(values))/np.nanstd(values)
+    return values
+
+def _make_dashboard(state, instrument):
+    '''
+    Function to build a dashboard (without data) with the parameters of the request, for an instrument.
+    '''
+    from dashboard import Dashboard
+    dashboard = object.__new__(Dashboard)
+    dashboard.__dict__.update(state)
+    dashboard.instrument = instrument
+    dashboard.session = session_registry.get_session(instrument)
+    dashboard.messages = []
+    # messages are collected and shown by the main process
+    dashboard.shown = []
+    dashboard.result_key = None
+    dashboard.metric_matrix_key = None
+    if state['filter_time'][0] is not None:
+        session = dashboard.session
+        if list(state['filter_time']) == [state['sess_start'], state['sess_end']]:
+            dashboard.filter_time = [session.sess_start, session.sess_end]
+        dashboard.sess_start, dashboard.sess_end = session.sess_start, session.sess_end
+    return dashboard
+
+def _get_attrs(dashboard, attrs):
+    '''
+    Function to get the attributes needed to plot the results of an instrument.
+    '''
+    minutes_shift = dashboard.session.minutes_shift if 'sess_start' in dashboard.__dict__ else None
+    return {'col_x': attrs['col_x'], 'col_color': attrs['col_color'], 'metric': attrs['metric'], 'minutes_shift': minutes_shift,
+            'timeframe': attrs.get('timeframe'), 'messages': [f'{dashboard.instrument}: {text}' for text in dashboard.shown]}
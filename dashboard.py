@@ -2,10 +2,43 @@ import numpy as np
 import pandas as pd
 import streamlit as st
 import datetime
+import plotly.colors
 import plotly.graph_objects as go
 import decimal
 import hmac
+import time
+import compare
+import data_store
+import event_study
+import fast_groupby
+import market_profile
+import ingest
+import metric_matrix
+import ranking
+import rolling
+import session_features
+import session_matrix
+import session_registry
 from plotly.subplots import make_subplots
+from heatmap import grid_reduce, window_reduce
+from live_feed import BarFeed, LiveSession
+from result_store import ResultStore
+from quantile_sketch import QuantileSketch, window_quantile
+from session_matrix import SessionMatrix
+from time_index import (NS_PER_DAY, format_dates, format_times, reduce_segments, segment_first_true, segment_labels, segment_offsets,
+                        session_start_weekday, to_ns)
+
+# cost model of requests
+# bytes per input row: date, OHLC, point value, volume, session columns and index (about 73 bytes), rounded up
+BYTES_PER_ROW = 80
+# copies of the input data alive at the same time: shared data, filtered data and bars being built
+N_COPIES_INPUT = 3
+# bytes per bar when grouping: string keys of the breakdowns (e.g., 'Mon - 2020-2021') and group labels dominate
+BYTES_PER_BAR_GROUPED = 500
+# bytes per bar without grouping: numeric columns of the bars and of the metric matrix
+BYTES_PER_BAR = 100
+# bytes per output point: up to 16 float64 columns (metric, percentiles, bounds and helper columns)
+BYTES_PER_POINT = 16*8
 
 def check_password():
     '''Returns `True` if the user had a correct password.'''
@@ -38,69 +71,71 @@ def check_password():
     return False
 
 class Dashboard:
-    def __init__(self, max_rows = 250000):
+    def __init__(self, max_rows = 250000, max_memory = 2*1024**3, sidebar = None):
         '''
         Args:
-            max_rows: Maximum number of rows which can be present in a time series: if the number is exceeded, data is aggregated.
+            max_rows: Maximum number of rows which can be present in a time series: if the number is exceeded, data is aggregated (or downsampled).
+            max_memory: Maximum (estimated) peak memory, in bytes, of a request: if the number is exceeded, the request is refused.
+            sidebar: Object providing the widgets of the sidebar (by default, the Streamlit sidebar; see `batch_report.ParameterSidebar`).
         '''
+        self.sidebar = st.sidebar if sidebar is None else sidebar
         # sidebar - choose instrument
-        dict_sess = {'AD': ['17:00:00', '16:00:00'], 'ADAUSD': ['00:00:00', '23:59:00'], 'AVAXUSD': ['00:00:00', '23:59:00'], 'BP': ['17:00:00', '16:00:00'],
-                     'BTC': ['17:00:00', '16:00:00'], 'BTCUSD': ['00:00:00', '23:59:00'], 'C': ['19:00:00', '13:20:00'], 'CD': ['17:00:00', '16:00:00'],
-                     'CL': ['18:00:00', '17:00:00'], 'CT': ['21:00:00', '14:20:00'], 'DOGEUSD': ['00:00:00', '23:59:00'], 'EC': ['17:00:00', '16:00:00'],
-                     'ES': ['17:00:00', '16:00:00'], 'ETHUSD': ['00:00:00', '23:59:00'], 'FC': ['08:30:00', '13:05:00'], 'FDAX': ['01:10:00', '22:00:00'],
-                     'GC': ['18:00:00', '17:00:00'], 'HG': ['18:00:00', '17:00:00'], 'HO': ['18:00:00', '17:00:00'], 'LC': ['08:30:00', '13:05:00'],
-                     'LH': ['08:30:00', '13:05:00'], 'NG': ['18:00:00', '17:00:00'], 'NQ': ['17:00:00', '16:00:00'], 'PL': ['18:00:00', '17:00:00'],
-                     'RB': ['18:00:00', '17:00:00'], 'RTY': ['17:00:00', '16:00:00'], 'S': ['19:00:00', '13:20:00'], 'SB': ['03:30:00', '13:00:00'],
-                     'SI': ['18:00:00', '17:00:00'], 'SOLUSD': ['00:00:00', '23:59:00'], 'THETAUSD': ['00:00:00', '23:59:00'], 'TY': ['17:00:00', '16:00:00'],
-                     'US': ['17:00:00', '16:00:00'], 'VX': ['17:00:00', '16:00:00'], 'XRPUSD': ['00:00:00', '23:59:00'], 'YM': ['17:00:00', '16:00:00']}
-        dict_settlement_hour = {'AD': '14:00:00', 'BP': '14:00:00', 'BTC': '15:00:00', 'C': '13:15:00', 'CD': '14:00:00', 'CL': '14:30:00',
-                                'EC': '14:00:00', 'ES': '15:00:00', 'FC': '13:00:00', 'FDAX': '22:00:00', 'GC': '13:30:00', 'HG': '13:00:00', 'HO': '14:30:00',
-                                'LC': '13:00:00', 'LH': '13:00:00', 'NG': '14:30:00', 'NQ': '15:00:00', 'PL': '13:05:00', 'RB': '14:30:00', 'RTY': '15:00:00',
-                                'S': '13:15:00', 'SI': '13:25:00', 'TY': '15:00:00', 'US': '14:00:00', 'VX': '15:00:00', 'YM': '14:00:00'}
-        dict_rth = {'AD': ['07:20:00', '14:00:00'], 'BP': ['07:20:00', '14:00:00'], 'C': ['08:30:00', '13:20:00'], 'CD': ['07:20:00', '14:00:00'],
-                    'CL': ['09:00:00', '14:30:00'], 'EC': ['07:20:00', '14:00:00'], 'ES': ['08:30:00', '15:15:00'], 'FDAX': ['08:00:00', '22:00:00'],
-                    'GC': ['08:20:00', '13:30:00'], 'HG': ['08:10:00', '13:00:00'], 'HO': ['09:00:00', '14:30:00'], 'NG': ['09:00:00', '14:30:00'],
-                    'NQ': ['08:30:00', '15:15:00'], 'PL': ['08:20:00', '13:05:00'], 'RB': ['09:00:00', '14:30:00'], 'RTY': ['08:30:00', '15:15:00'],
-                    'S': ['08:30:00', '13:20:00'], 'SI': ['08:25:00', '13:25:00'], 'TY': ['08:30:00', '15:15:00'],
-                    'US': ['08:30:00', '15:15:00'], 'VX': ['08:30:00', '15:15:00'], 'YM': ['08:30:00', '15:15:00']}
         dict_month = {'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6, 'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12}
         dict_day_of_week = {'Mon': 0, 'Tue': 1, 'Wed': 2, 'Thu': 3, 'Fri': 4, 'Sat': 5, 'Sun': 6}
         #
-        list_instr = list(dict_sess.keys())
-        list_instr = [i for i in list_instr if 'USD' not in i]
-        instrument = st.sidebar.selectbox(label = 'Instrument:', options = list_instr)
+        list_instr = session_registry.list_instruments()
+        instrument = self.sidebar.selectbox(label = 'Instrument:', options = list_instr)
         # sidebar - choose timeframe
-        timeframe = st.sidebar.radio(label = 'Timeframe:', options = ['1m', '5m', '15m', '30m', '60m', '120m', '240m', '480m', 'Daily', 'Weekly'],
+        timeframe = self.sidebar.radio(label = 'Timeframe:', options = ['1m', '5m', '15m', '30m', '60m', '120m', '240m', '480m', 'Daily', 'Weekly'],
                                      horizontal = True)
+        # daily and weekly bars of calendar days or of sessions
+        bars_alignment = 'Calendar'
+        if timeframe in ['Daily', 'Weekly']:
+            bars_alignment = self.sidebar.radio(label = 'Daily and weekly bars of:', options = ['Calendar', 'Session'], horizontal = True)
         # sidebar - choose plot type
-        plot_type = st.sidebar.radio(label = 'Plot type:', options = ['Lines', 'Bars'], horizontal = True)
+        plot_type = self.sidebar.radio(label = 'Plot type:', options = ['Lines', 'Bars'], horizontal = True)
         #
-        self.dict_sess = dict_sess
-        self.dict_settlement_hour = dict_settlement_hour
-        self.dict_rth = dict_rth
+        self.list_instr = list_instr
         self.dict_month = dict_month
         self.dict_day_of_week = dict_day_of_week
         self.instrument = instrument
+        self.session = session_registry.get_session(instrument)
         self.max_rows = max_rows
+        self.max_memory = max_memory
         self.timeframe = timeframe
+        self.bars_alignment = bars_alignment
         self.plot_type = plot_type
+        self.messages = []
+        self.shown = None
+        self.result_store = ResultStore()
+        self.result_key = None
+        self.metric_matrix_key = None
+        self.metadata = None
         #
         self._get_dates_filter()
         self._get_month_filter()
         self._get_day_of_month_filter()
         self._get_day_of_week_filter()
-        self._get_data()
+        self._get_session_filter()
         self._get_time_filter()
         #
         self._select_number_of_metrics()
         self._select_metric()
         self._select_group_strategy()
+        self._select_event()
+        self._select_profile()
         self._select_split_in_periods()
         self._select_group_function()
+        self._select_heatmap()
+        self._select_confidence_intervals()
         self._select_unit()
         self._highlight_trading_sessions_rth()
         if self.n_metrics == 1:
             self._get_tops_bottoms()
+        self._select_live_mode()
+        self._select_comparison()
+        self._select_correlation()
+        self._select_zoom_window()
 
     def _get_dates_filter(self):
         '''
@@ -111,7 +146,7 @@ class Dashboard:
         Returns: None.
         '''
         # sidebar - choose the way to filter dates
-        filt_date = st.sidebar.selectbox(label = 'Filter date by: ', options = ['Slider', 'Calendar'])
+        filt_date = self.sidebar.selectbox(label = 'Filter date by: ', options = ['Slider', 'Calendar'])
         filter_date_start = datetime.datetime.strptime('2010-01-01', '%Y-%m-%d')
         filter_date_end = datetime.datetime.strptime('2050-01-01', '%Y-%m-%d')
         # get current month
@@ -122,11 +157,11 @@ class Dashboard:
             filter_date_end = curr_month_date - datetime.timedelta(days = 1)
         # sidebar - filter date with slider
         if filt_date == 'Slider':
-            filter_date = st.sidebar.slider(label = 'Date range', min_value = filter_date_start, max_value = filter_date_end,
+            filter_date = self.sidebar.slider(label = 'Date range', min_value = filter_date_start, max_value = filter_date_end,
                                             value = [filter_date_start, filter_date_end])
         # sidebar - filter date with calendar
         elif filt_date == 'Calendar':
-            filter_date = st.sidebar.date_input(label = 'Date range', min_value = filter_date_start, max_value = filter_date_end,
+            filter_date = self.sidebar.date_input(label = 'Date range', min_value = filter_date_start, max_value = filter_date_end,
                                                 value = [filter_date_start, filter_date_end])
         # no date filter
         else:
@@ -144,7 +179,7 @@ class Dashboard:
         Returns: None.
         '''
         # sidebar - filter month
-        filt_month = st.sidebar.multiselect(label = 'Months to exclude:',
+        filt_month = self.sidebar.multiselect(label = 'Months to exclude:',
                                             options = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
         self.filt_month = filt_month
 
@@ -157,7 +192,7 @@ class Dashboard:
         Returns: None.
         '''
         # sidebar - filter day of month
-        filt_day_month = st.sidebar.multiselect(label = 'Days of month to exclude:', options = range(1, 32))
+        filt_day_month = self.sidebar.multiselect(label = 'Days of month to exclude:', options = range(1, 32))
         self.filt_day_month = filt_day_month
 
     def _get_day_of_week_filter(self):
@@ -169,9 +204,37 @@ class Dashboard:
         Returns: None.
         '''
         # sidebar - filter day of week
-        filt_day_week = st.sidebar.multiselect(label = 'Days of week to exclude:', options = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
+        filt_day_week = self.sidebar.multiselect(label = 'Days of week to exclude:', options = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
         self.filt_day_week = filt_day_week
 
+    def _get_session_filter(self):
+        '''
+        Function to create the filter of sessions by conditions on their features (e.g., range of the previous session, gap at the open).
+
+        Args: None.
+
+        Returns: None.
+        '''
+        # sidebar - filter sessions
+        text = self.sidebar.text_input(label = 'Sessions to keep:', value = '', placeholder = 'e.g. prior_range > 20 and gap > 0',
+                                     help = f"Conditions joined by 'and', prices in points. Features: {', '.join(session_features.LIST_FEATURES)}.")
+        try:
+            self.session_conditions = session_features.parse_conditions(text)
+        except ValueError as error:
+            self.sidebar.error(str(error))
+            self.session_conditions = None
+
+    def _get_metadata(self):
+        '''
+        Function to get the metadata of the instrument, used by the zoom window instead of its data (which is imported only when a request is run).
+        It is read only when the zoom window is shown, since it may have to be computed from the data (see `data_store.read_metadata`).
+
+        Args: None.
+
+        Returns: None.
+        '''
+        self.metadata = data_store.read_metadata(self.instrument)
+
     def _get_data(self):
         '''
         Function to import data.
@@ -180,14 +243,8 @@ class Dashboard:
 
         Returns: None.
         '''
-        df = pd.read_pickle(f'./data/data_{self.instrument}.pickle.gz')
-        df['date'] = pd.to_datetime(df['date'])
-        # add a session counter
-        df.loc[df['session_start'] == True, 'n_sess'] = range(df['session_start'].sum())
-        df['n_sess'] = df['n_sess'].ffill()
-        df = df[~df['n_sess'].isnull()].reset_index(drop = True)
-        #
-        self.df = df
+        # decoded data is shared (read-only) between server processes
+        self.df, self.index = data_store.attach(self.instrument)
 
     def _get_time_filter(self):
         '''
@@ -197,31 +254,16 @@ class Dashboard:
 
         Returns: None.
         '''
-        df = self.df.copy()
         timeframe = self.timeframe
         self.filter_time = [None, None]
         #
         if timeframe in ['1m', '5m', '15m', '30m', '60m', '120m', '240m', '480m']:
-            sess_start, sess_end = self.dict_sess[self.instrument]
-            # compute time ranges
-            range_times = []
-            curr_time = datetime.datetime.strptime(sess_start, '%H:%M:%S')
-            if (sess_start == '00:00:00') and (sess_end == '23:59:00'):
-                time_end = datetime.datetime.strptime('23:59:00', '%H:%M:%S')
-            elif eval(sess_start.split(':')[0].lstrip('0')) < eval(sess_end.split(':')[0].lstrip('0')):
-                time_end = datetime.datetime.strptime(sess_end, '%H:%M:%S')
-            else:
-                time_end = datetime.datetime.strptime(sess_end, '%H:%M:%S') + datetime.timedelta(days = 1)
-            while curr_time <= time_end:
-                range_times.append(curr_time.strftime("%H:%M:%S"))
-                curr_time += pd.Timedelta(5, unit = 'min')
-            if sess_end == '23:59:00':
-                range_times.append('23:59:59')
+            range_times = self.session.time_options
             # sidebar - filter time
-            self.filter_time = st.sidebar.select_slider(label = 'Time range:', options = range_times, value = [range_times[0], range_times[-1]])
+            self.filter_time = self.sidebar.select_slider(label = 'Time range:', options = range_times, value = [range_times[0], range_times[-1]])
             #
-            self.sess_start = sess_start
-            self.sess_end = sess_end
+            self.sess_start = self.session.sess_start
+            self.sess_end = self.session.sess_end
 
     def _select_number_of_metrics(self):
         '''
@@ -233,7 +275,7 @@ class Dashboard:
         '''
         self.n_metrics = 1
         if self.timeframe in ['1m', '5m', '15m', '30m', '60m', '120m', '240m', '480m']:
-            self.n_metrics = st.sidebar.radio(label = 'Number of metrics:', options = [1, 2], horizontal = True)
+            self.n_metrics = self.sidebar.radio(label = 'Number of metrics:', options = [1, 2], horizontal = True)
 
     def _select_metric(self):
         '''
@@ -245,20 +287,20 @@ class Dashboard:
         '''
         if self.timeframe in ['1m', '5m', '15m', '30m', '60m', '120m', '240m', '480m']:
             if self.n_metrics == 1:
-                self.metric = st.sidebar.radio(label = 'Metric:', options = ['Close', 'Delta close', 'Body', 'Range', 'Open-high', 'Open-low', 'Num highs',
+                self.metric = self.sidebar.radio(label = 'Metric:', options = ['Close', 'Delta close', 'Body', 'Range', 'Open-high', 'Open-low', 'Num highs',
                                                                             'Num lows', 'Num highs or lows','Volume'],
                                             horizontal = True)
             else:
-                self.metric = st.sidebar.multiselect(label = 'Metrics (choose 2):', options = ['Close', 'Delta close', 'Body', 'Range', 'Open-high',
+                self.metric = self.sidebar.multiselect(label = 'Metrics (choose 2):', options = ['Close', 'Delta close', 'Body', 'Range', 'Open-high',
                                                                                                'Open-low', 'Num highs', 'Num lows', 'Num highs or lows',
                                                                                                'Volume'])
                 self.metric = self.metric[:2]
         else:
             if self.n_metrics == 1:
-                self.metric = st.sidebar.radio(label = 'Metric:', options = ['Close', 'Body', 'Range', 'Open-high', 'Open-low', 'Volume'],
+                self.metric = self.sidebar.radio(label = 'Metric:', options = ['Close', 'Body', 'Range', 'Open-high', 'Open-low', 'Volume'],
                                             horizontal = True)
             else:
-                self.metric = st.sidebar.multiselect(label = 'Metrics (choose 2):', options = ['Close', 'Body', 'Range', 'Open-high', 'Open-low', 'Volume'])
+                self.metric = self.sidebar.multiselect(label = 'Metrics (choose 2):', options = ['Close', 'Body', 'Range', 'Open-high', 'Open-low', 'Volume'])
                 self.metric = self.metric[:2]
 
     def _select_group_strategy(self):
@@ -270,13 +312,48 @@ class Dashboard:
         Returns: None.
         '''
         if self.timeframe in ['1m', '5m', '15m', '30m', '60m', '120m', '240m', '480m']:
-            self.group_by = st.sidebar.radio(label = 'Group by:', options = [None, 'Time', 'Day of week + time', 'Day of month + time', 'Month + time',
-                                                                             'Month + day of month + time', 'History', 'Day of week + history',
-                                                                             'Day of month + history', 'Month + history'],
-                                             horizontal = True)
+            list_options = [None, 'Time', 'Day of week + time', 'Day of month + time', 'Month + time', 'Month + day of month + time', 'History',
+                            'Day of week + history', 'Day of month + history', 'Month + history', 'Around event']
+            # market profile (volume or time at price) of the bars
+            if self.n_metrics == 1:
+                list_options.append('Profile')
+            self.group_by = self.sidebar.radio(label = 'Group by:', options = list_options, horizontal = True)
         else:
             self.group_by = None
 
+    def _select_event(self):
+        '''
+        Function to select the event on which sessions are aligned, and the window of bars around it, for the 'Around event' grouping.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        self.event = None
+        if self.group_by == 'Around event':
+            anchor = self.sidebar.selectbox(label = 'Event:', options = event_study.list_anchors(self.session))
+            time_custom = None
+            if anchor == 'Custom time':
+                time_custom = self.sidebar.selectbox(label = 'Event time:', options = self.session.time_options)
+            minutes_before = self.sidebar.number_input(label = 'Minutes before the event:', min_value = 0, max_value = 1440, value = 60)
+            minutes_after = self.sidebar.number_input(label = 'Minutes after the event:', min_value = 0, max_value = 1440, value = 60)
+            self.event = [anchor, time_custom, int(minutes_before), int(minutes_after)]
+
+    def _select_profile(self):
+        '''
+        Function to select the quantity distributed over the price levels of the bars, the prices and the sessions of the 'Profile' grouping.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        self.profile = None
+        if self.group_by == 'Profile':
+            quantity = self.sidebar.radio(label = 'Profile of:', options = market_profile.LIST_PROFILES, horizontal = True)
+            prices = self.sidebar.radio(label = 'Profile prices:', options = ['Absolute', 'From session open'], horizontal = True)
+            profile_by = self.sidebar.radio(label = 'Profile of each:', options = ['Date range', 'Session'], horizontal = True)
+            self.profile = [quantity, prices, profile_by]
+
     def _select_split_in_periods(self):
         '''
         Function to decide whether to show split outputs by (periods of) years.
@@ -286,9 +363,15 @@ class Dashboard:
         Returns: None.
         '''
         self.split_in_periods = 'No'
+        self.period_window = None
         if self.group_by is not None:
-            self.split_in_periods = st.sidebar.radio(label = 'Split in periods:', options = ['No', 'By year', 'By two years', 'By three years'],
-                                                     horizontal = True)
+            list_options = ['No', 'By year', 'By two years', 'By three years']
+            # rolling windows of years, stepping by one year (walk-forward stability of the grouped metric)
+            if (self.n_metrics == 1) and ('time' in self.group_by.lower()):
+                list_options.append('Rolling years')
+            self.split_in_periods = self.sidebar.radio(label = 'Split in periods:', options = list_options, horizontal = True)
+            if self.split_in_periods == 'Rolling years':
+                self.period_window = int(self.sidebar.number_input(label = 'Years in rolling window:', min_value = 2, max_value = 10, value = 3))
 
     def _select_group_function(self):
         '''
@@ -298,8 +381,60 @@ class Dashboard:
 
         Returns: None.
         '''
-        self.group_function = st.sidebar.radio(label = 'Grouping function:', options = ['Mean', 'Median', 'Sum', 'Cumsum', 'Count', 'Std'],
-                                               horizontal = True)
+        list_functions = ['Mean', 'Median', 'Sum', 'Cumsum', 'Count', 'Std']
+        # profiles are summed over sessions, or averaged by session
+        if self.group_by == 'Profile':
+            list_functions = ['Mean', 'Sum']
+        # rolling windows of years merge per-year partial aggregates, which medians do not have
+        if self.split_in_periods == 'Rolling years':
+            list_functions.remove('Median')
+        # rolling statistics of the series of the metric
+        if (self.n_metrics == 1) and (self.group_by == 'History'):
+            list_functions += rolling.LIST_ROLLING
+        self.group_function = self.sidebar.radio(label = 'Grouping function:', options = list_functions, horizontal = True)
+        self.rolling = None
+        if self.group_function in rolling.LIST_ROLLING:
+            window = self.sidebar.number_input(label = 'Rolling window:', min_value = 2, max_value = 5000, value = 20)
+            unit = self.sidebar.radio(label = 'Rolling window of:', options = ['Sessions', 'Days'], horizontal = True)
+            by_slot = self.sidebar.radio(label = 'Rolling by time slot:', options = ['No', 'Yes'], horizontal = True)
+            self.rolling = [int(window), unit, by_slot]
+        # percentiles drawn as bands around the grouped metric
+        self.percentiles = []
+        if ((self.n_metrics == 1) and (self.group_by is not None) and ('history' not in self.group_by.lower()) and
+            (self.group_function != 'Cumsum') and (self.group_by != 'Profile')):
+            self.percentiles = self.sidebar.multiselect(label = 'Percentile bands:', options = [5, 10, 25, 75, 90, 95])
+
+    def _select_heatmap(self):
+        '''
+        Function to decide whether to show the breakdowns of the grouping (day of week, day of month, month or period) against time as a heatmap.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        self.heatmap = 'No'
+        if ((self.n_metrics == 1) and (self.group_function != 'Median') and
+            ((self.group_by in ['Day of week + time', 'Day of month + time', 'Month + time']) or
+             ((self.group_by == 'Time') and (self.split_in_periods not in ['No', 'Rolling years'])))):
+            self.heatmap = self.sidebar.radio(label = 'Heatmap:', options = ['No', 'Yes'], horizontal = True)
+            if self.heatmap == 'Yes':
+                self.percentiles = []
+
+    def _select_confidence_intervals(self):
+        '''
+        Function to decide whether to compute bootstrap confidence intervals (resampling sessions) of the grouped metric.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        self.confidence = 'No'
+        self.n_boot = 0
+        if ((self.n_metrics == 1) and (self.group_by is not None) and ('time' in self.group_by.lower()) and
+            (self.group_function in ['Mean', 'Sum', 'Cumsum']) and (self.heatmap == 'No') and (self.split_in_periods != 'Rolling years')):
+            self.confidence = self.sidebar.radio(label = 'Confidence intervals (bootstrap):', options = ['No', '90%', '95%', '99%'], horizontal = True)
+            if self.confidence != 'No':
+                self.n_boot = self.sidebar.number_input(label = 'Number of replicates:', min_value = 100, max_value = 10000, value = 1000, step = 100)
 
     def _select_unit(self):
         '''
@@ -309,7 +444,7 @@ class Dashboard:
 
         Returns: None.
         '''
-        unit = st.sidebar.radio(label = 'Unit:', options = ['Points', '$'], horizontal = True)
+        unit = self.sidebar.radio(label = 'Unit:', options = ['Points', '$'], horizontal = True)
         self.unit = unit.lower()
                 
     def _highlight_trading_sessions_rth(self):
@@ -324,12 +459,10 @@ class Dashboard:
         self._plot_rth = None
         #
         if self.timeframe in ['1m', '5m', '15m', '30m', '60m', '120m', '240m', '480m']:
-            sess_start, sess_end = self.dict_sess[self.instrument]
-            if (((sess_start == '17:00:00') and (sess_end == '16:00:00')) or ((sess_start == '18:00:00') and (sess_end == '17:00:00')) or
-                (self.instrument == 'FDAX')) and (self.timeframe in ['1m', '5m', '15m', '30m', '60m']):
-                self._plot_trading_sessions = st.sidebar.radio(label = 'Highlight trading sessions', options = ['Yes', 'No'], horizontal = True)
-            if self.instrument in self.dict_rth.keys():
-                self._plot_rth = st.sidebar.radio(label = 'Highlight regular trading hours', options = ['No', 'Yes'], horizontal = True)
+            if (len(self.session.regions) > 0) and (self.timeframe in ['1m', '5m', '15m', '30m', '60m']):
+                self._plot_trading_sessions = self.sidebar.radio(label = 'Highlight trading sessions', options = ['Yes', 'No'], horizontal = True)
+            if self.session.rth is not None:
+                self._plot_rth = self.sidebar.radio(label = 'Highlight regular trading hours', options = ['No', 'Yes'], horizontal = True)
             if self._plot_trading_sessions == 'Yes':
                 self._plot_rth = 'No'
 
@@ -342,8 +475,452 @@ class Dashboard:
         Returns: None.
         '''
         self.plot_tops_bottoms = 'No'
-        if self.timeframe in ['1m', '5m', '15m', '30m', '60m', '120m', '240m', '480m']:
-            self.plot_tops_bottoms = st.sidebar.radio(label = 'Plot tops and bottoms', options = ['No', 'Yes'], horizontal = True)
+        self.n_tops = 15
+        if (self.timeframe in ['1m', '5m', '15m', '30m', '60m', '120m', '240m', '480m']) and (self.heatmap == 'No'):
+            self.plot_tops_bottoms = self.sidebar.radio(label = 'Plot tops and bottoms', options = ['No', 'Yes'], horizontal = True)
+            if self.plot_tops_bottoms == 'Yes':
+                self.n_tops = self.sidebar.number_input(label = 'Number of tops and bottoms:', min_value = 1, max_value = 100, value = 15)
+
+    def _select_live_mode(self):
+        '''
+        Function to decide whether to overlay the current session, read from a live bar feed, on the 'Time' profile.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        self.live_mode = 'No'
+        if ((self.timeframe in ['1m', '5m', '15m', '30m', '60m', '120m', '240m', '480m']) and (self.group_by == 'Time') and
+            (self.split_in_periods == 'No') and (self.n_metrics == 1) and (self.plot_tops_bottoms == 'No')):
+            self.live_mode = self.sidebar.radio(label = 'Live session:', options = ['No', 'Yes'], horizontal = True)
+            if self.live_mode == 'Yes':
+                self.live_feed = self.sidebar.text_input(label = 'Live feed:', value = f'./data/live/live_{self.instrument}.csv')
+                self.live_refresh = self.sidebar.number_input(label = 'Refresh interval [s]:', min_value = 1, value = 5)
+
+    def _select_comparison(self):
+        '''
+        Function to select other instruments to compare with the chosen one, and how to normalize their results.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        self.compare_instruments = []
+        self.normalization = 'No'
+        if ((self.n_metrics == 1) and (self.group_by in [None, 'Time', 'History']) and (self.split_in_periods == 'No') and
+            (self.plot_tops_bottoms == 'No') and (self.live_mode == 'No')):
+            list_instr = [i for i in self.list_instr if i != self.instrument]
+            self.compare_instruments = self.sidebar.multiselect(label = 'Compare with:', options = list_instr)
+            if len(self.compare_instruments) > 0:
+                self.normalization = self.sidebar.radio(label = 'Normalization:', options = ['No', 'Z-score'], horizontal = True)
+
+    def _select_correlation(self):
+        '''
+        Function to select whether to compute the correlation between the profiles of all the instruments.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        self.correlation = 'No'
+        if ((self.n_metrics == 1) and (self.group_by is not None) and ('history' not in self.group_by.lower()) and (self.heatmap == 'No') and
+            (self.live_mode == 'No') and (len(self.compare_instruments) == 0) and (self.group_by != 'Profile')):
+            self.correlation = self.sidebar.radio(label = 'Correlation of instruments:', options = ['No', 'Yes'], horizontal = True)
+
+    def _select_zoom_window(self):
+        '''
+        Function to select a window of dates to zoom in, for 'History' grouping: the whole date range is shown with coarse bars, while the
+        window is shown with the finest bars fitting in `max_rows` points.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        self.zoom_window = None
+        if (self.n_metrics != 1) or (self.group_by != 'History') or (self.split_in_periods != 'No') or (self.plot_tops_bottoms != 'No'):
+            return
+        self._get_metadata()
+        if self.metadata['n_rows'] > 0:
+            # dates of the data in the date range
+            date_min = max(pd.Timestamp(self.metadata['date_first']), pd.Timestamp(self.date_start)).date()
+            date_max = min(pd.Timestamp(self.metadata['date_last']), pd.Timestamp(self.date_end)).date()
+            if date_min < date_max:
+                window = self.sidebar.slider(label = 'Zoom window:', min_value = date_min, max_value = date_max, value = (date_min, date_max))
+                if tuple(window) != (date_min, date_max):
+                    self.zoom_window = [i.strftime('%Y-%m-%d') for i in window]
+                    # finest timeframe of the window (the one of the whole range may be made coarser)
+                    self.timeframe_zoom = self.timeframe
+
+    def _write(self, text):
+        '''
+        Function to write a message about the results; messages are kept, so that they can be shown again when results are read from the store.
+
+        Args:
+            text: Message.
+
+        Returns: None.
+        '''
+        self.messages.append(text)
+        self._show(text)
+
+    def _show(self, text, error = False):
+        '''
+        Function to show a message; if `shown` is a list (e.g., when the request is computed in a worker process), messages are collected in it
+        instead, so that they can be shown by the main process.
+
+        Args:
+            text: Message.
+            error: Whether the message is an error.
+
+        Returns: None.
+        '''
+        if self.shown is not None:
+            self.shown.append(text)
+        elif error:
+            st.error(text)
+        else:
+            st.write(text)
+
+    def _compute(self):
+        '''
+        Function to compute the aggregated results of the request.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        # aggregated results are computed only if they are not in the result store
+        if self._load_result():
+            return
+        # bars and metric matrix are computed only if metric or unit are the only changes since a previous request
+        if not self._load_metric_matrix():
+            self._filter_dates()
+            self._filter_times()
+            self._filter_month()
+            self._filter_day_of_month()
+            self._filter_day_of_week()
+            self._filter_sessions()
+            #
+            self._group_to_timeframe()
+            self._compute_metric_matrix()
+        #
+        self._compute_metric()
+        self._add_split_period()
+        self._group_data()
+        #
+        self._fix_missing_dates()
+        self._downsample()
+        #
+        self._store_result()
+
+    def _compute_comparison(self):
+        '''
+        Function to compute the aggregated results of the request for the chosen instrument and the ones to compare with, concurrently on a pool
+        of worker processes.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        time_start = time.perf_counter()
+        dict_results = compare.compare_instruments(self._get_request_state(), [self.instrument] + self.compare_instruments)
+        #
+        self.comparison = {}
+        for instrument, (df, attrs, elapsed) in dict_results.items():
+            for text in attrs['messages']:
+                st.write(text)
+            if df is not None:
+                self.comparison[instrument] = (df, attrs)
+        st.write(f'{len(dict_results)} instruments computed in {time.perf_counter() - time_start:.1f} s (slowest instrument: '
+                 f'{max([result[2] for result in dict_results.values()]):.1f} s).')
+
+    def _compute_correlation(self):
+        '''
+        Function to compute the correlation between the profiles (aggregated metric) of all the instruments, on the grid of the chosen grouping.
+        Profiles in the result store are reused; the others are computed concurrently on a pool of worker processes.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        time_start = time.perf_counter()
+        dict_results = compare.compare_instruments(self._get_request_state(), self.list_instr)
+        dict_profiles = {}
+        for instrument, (df, attrs, elapsed) in dict_results.items():
+            if df is None:
+                for text in attrs['messages']:
+                    st.write(text)
+            else:
+                dict_profiles[instrument] = compare.get_profile(df, attrs)
+        corr, n_points = compare.correlation_matrix(dict_profiles)
+        order = compare.cluster_order(corr)
+        list_instr = np.array(list(dict_profiles.keys()))[order]
+        self.df_correlation = pd.DataFrame(corr[np.ix_(order, order)], index = list_instr, columns = list_instr)
+        st.write(f'{len(dict_profiles)} profiles ({int(n_points.diagonal().mean())} points each, on average) computed in '
+                 f'{time.perf_counter() - time_start:.1f} s.')
+
+    def _compute_zoom(self):
+        '''
+        Function to compute the results in the zoom window, with the chosen timeframe or, if the series would be too long, the finest coarser one
+        fitting in `max_rows` points. The window is sliced from the data with the time index, so only its bars are aggregated.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        state = self._get_request_state()
+        # the last day of the window is included
+        state.update({'date_start': self.zoom_window[0], 'timeframe': self.timeframe_zoom,
+                      'date_end': (pd.Timestamp(self.zoom_window[1]) + pd.Timedelta(1, unit = 'D')).strftime('%Y-%m-%d')})
+        self.df_zoom, attrs, _ = compare.run_instrument(state, self.instrument)
+        for text in attrs['messages']:
+            st.write(text.replace(f'{self.instrument}: ', 'Zoom window: ', 1))
+        self.timeframe_zoom = attrs.get('timeframe')
+
+    def _get_request_state(self):
+        '''
+        Function to get the attributes of the dashboard defining the request (data excluded), to compute it for other instruments.
+
+        Args: None.
+
+        Returns:
+            state: Dictionary of attributes.
+        '''
+        state = {key: value for key, value in self.__dict__.items() if key not in ['df', 'index', 'metadata', 'metric_matrix', 'sidebar']}
+        state.update({'percentiles': [], 'confidence': 'No', 'n_boot': 0})
+        return state
+
+    def _get_result_key(self):
+        '''
+        Function to build the key of the aggregated results in the result store, from all the parameters they depend on and the data version.
+
+        Args: None.
+
+        Returns:
+            key: Key of the results.
+        '''
+        params = {'instrument': self.instrument, 'timeframe': self.timeframe, 'bars_alignment': self.bars_alignment, 'date_start': self.date_start,
+                  'date_end': self.date_end,
+                  'filt_month': sorted(self.filt_month), 'filt_day_month': sorted(self.filt_day_month), 'filt_day_week': sorted(self.filt_day_week),
+                  'session_conditions': self.session_conditions, 'filter_time': list(self.filter_time), 'metric': self.metric, 'group_by': self.group_by,
+                  'split_in_periods': self.split_in_periods, 'period_window': self.period_window, 'group_function': self.group_function,
+                  'rolling': self.rolling, 'event': self.event, 'profile': self.profile,
+                  'percentiles': sorted(self.percentiles), 'confidence': self.confidence, 'n_boot': self.n_boot, 'heatmap': self.heatmap, 'unit': self.unit,
+                  'max_rows': self.max_rows, 'tops_bottoms': self._is_ranking()}
+        return self.result_store.make_key(self.instrument, data_store.data_version(self.instrument), params)
+
+    def _load_result(self):
+        '''
+        Function to read the aggregated results from the result store.
+
+        Args: None.
+
+        Returns:
+            found: Whether the results were found.
+        '''
+        if self.result_key is None:
+            self.result_key = self._get_result_key()
+        df, attrs = self.result_store.get(self.result_key)
+        if df is None:
+            return False
+        #
+        for key, value in attrs.items():
+            setattr(self, key, value)
+        for text in self.messages:
+            self._show(text)
+        self.df = df
+        return True
+
+    def _store_result(self):
+        '''
+        Function to write the aggregated results (and the attributes needed to plot them) to the result store.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        attrs = {'col_x': self.col_x, 'col_color': self.col_color, 'format_x': self.format_x, 'metric': self.metric,
+                 'group_function': self.group_function, 'timeframe': self.timeframe, 'messages': self.messages}
+        self.result_store.put(self.result_key, self.df, attrs)
+
+    def _estimate_cost(self, timeframe):
+        '''
+        Function to estimate, from the time index only (i.e., before any computation), the cost of the request with a given timeframe.
+
+        Args:
+            timeframe: Timeframe to use.
+
+        Returns:
+            estimate: Dictionary with the estimated number of input rows (`rows`), number of bars (`bars`), number of breakdowns (`breakdowns`),
+                number of points of each plotted series (`points`), number of points of all the series (`total_points`) and peak memory in bytes
+                (`memory`).
+        '''
+        dict_timeframe = {'1m': 1, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '120m': 120, '240m': 240, '480m': 480}
+        i_start, i_end = self.index.locate(self.date_start, self.date_end)
+        index = self.index.slice(i_start, i_end)
+        # rows and calendar attributes of each day in the date range
+        n_rows_day = np.diff(index.day_offsets)
+        dates_day = pd.DatetimeIndex(index.timestamps[index.day_offsets[:-1]].astype('datetime64[ns]'))
+        mask_day = ((~dates_day.month.isin([self.dict_month[i] for i in self.filt_month])) & (~dates_day.day.isin(self.filt_day_month)) &
+                    (~dates_day.weekday.isin([self.dict_day_of_week[i] for i in self.filt_day_week])))
+        n_rows_day = n_rows_day[mask_day]
+        dates_day = dates_day[mask_day]
+        # fraction of the session kept by the time filter
+        fraction_time = 1
+        minutes_sess = 1440
+        if timeframe in dict_timeframe.keys():
+            minutes_sess = (self.session.minutes_close - self.session.minutes_open)%1440 + 1
+            if (self.filter_time[0] is not None) and (self.filter_time[1] is not None):
+                minutes_start, minutes_end = [pd.Timedelta(i).value//(60*10**9) for i in self.filter_time]
+                fraction_time = min(((minutes_end - minutes_start)%1440 + 1)/minutes_sess, 1)
+        n_rows = int(n_rows_day.sum()*fraction_time)
+        # number of bars
+        if timeframe in dict_timeframe.keys():
+            n_bars = n_rows//dict_timeframe[timeframe]
+            n_slots = int(minutes_sess*fraction_time)//dict_timeframe[timeframe] + 1
+        elif timeframe == 'Daily':
+            n_bars = n_rows_day.shape[0]
+        else:
+            n_bars = n_rows_day.shape[0]//5 + 1
+        # number of breakdowns
+        n_breakdowns = 1
+        if self.group_by is not None:
+            if self.group_by.startswith('Day of week'):
+                n_breakdowns = np.unique(dates_day.weekday).shape[0]
+            elif self.group_by.startswith('Day of month'):
+                n_breakdowns = np.unique(dates_day.day).shape[0]
+            elif self.group_by.startswith('Month'):
+                n_breakdowns = np.unique(dates_day.month).shape[0]
+            if self._is_session_profile():
+                n_breakdowns = n_rows_day.shape[0]
+            elif self.split_in_periods == 'Rolling years':
+                n_breakdowns *= max(np.unique(dates_day.year).shape[0] - self.period_window + 1, 1)
+            elif self.split_in_periods != 'No':
+                dim_split = {'By year': 1, 'By two years': 2, 'By three years': 3}[self.split_in_periods]
+                n_breakdowns *= max(np.unique(dates_day.year).shape[0]//dim_split, 1)
+        # points of each series (after missing dates have been added)
+        n_points_total = None
+        if (self.group_by is None) or ('history' in self.group_by.lower()):
+            n_points = n_bars
+        elif self.group_by == 'Month + day of month + time':
+            n_points = 31*n_slots
+        elif self.group_by == 'Around event':
+            n_points = (self.event[2] + self.event[3])//dict_timeframe[timeframe] + 1
+        elif self.group_by == 'Profile':
+            # price levels in the date range (the data is attached, so the extreme prices are read without any computation)
+            n_points = 1
+            if i_end > i_start:
+                tick = self._get_tick(self.df['close'].values[i_start:i_end])
+                high, low = self.df['high'].values[i_start:i_end], self.df['low'].values[i_start:i_end]
+                n_points = int((np.nanmax(high) - np.nanmin(low))/tick) + 1
+                if self._is_session_profile():
+                    # each session keeps only the levels of its own range
+                    starts = index.day_offsets[:-1]
+                    n_levels = ((np.fmax.reduceat(high, starts) - np.fmin.reduceat(low, starts))/tick + 1)[mask_day]
+                    n_levels = n_levels[~np.isnan(n_levels)]
+                    n_points = int(n_levels.max()) if n_levels.shape[0] > 0 else 1
+                    n_points_total = int(n_levels.sum())
+        else:
+            n_points = n_slots
+        if n_points_total is None:
+            n_points_total = n_points*n_breakdowns
+        # peak memory: copies of the input data, string keys used in grouping and output grid
+        memory_input = (i_end - i_start)*BYTES_PER_ROW*N_COPIES_INPUT
+        memory_group = n_bars*(BYTES_PER_BAR_GROUPED if self.group_by is not None else BYTES_PER_BAR)
+        memory_output = n_points_total*BYTES_PER_POINT
+        #
+        return {'rows': n_rows, 'bars': n_bars, 'breakdowns': n_breakdowns, 'points': n_points, 'total_points': n_points_total,
+                'memory': max(memory_input, memory_group, memory_output)}
+
+    def _plan_query(self):
+        '''
+        Function to estimate the cost of the request and choose how to serve it, before any computation:
+            - 'Precomputed aggregate': results are read from the result store;
+            - 'Coarser timeframe': the series would be longer than `max_rows` (for per-session profiles, all the series together), so a coarser
+              timeframe is used;
+            - 'Downsampled plot': even the coarsest timeframe gives too long a series, so only part of the points are plotted;
+            - 'Refuse': the estimated peak memory exceeds `max_memory`;
+            - 'Full computation': otherwise.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        self.result_key = self._get_result_key()
+        timeframe = self.timeframe
+        estimate = self._estimate_cost(timeframe)
+        # sessions of per-session profiles have their own price levels, so all their points are plotted
+        key_points = 'total_points' if self._is_session_profile() else 'points'
+        #
+        if self.result_store.contains(self.result_key):
+            strategy = 'Precomputed aggregate'
+        else:
+            strategy = 'Full computation'
+            # only the highest and lowest values are plotted, so the length of the series does not matter
+            if (estimate[key_points] > self.max_rows) and (not self._is_ranking()):
+                # look for the finest timeframe (up to 60 minutes) giving a short enough series; if there is no coarser timeframe, the plot is
+                # downsampled (price levels of profiles do not depend on the timeframe)
+                list_timeframes = ['1m', '5m', '15m', '30m', '60m']
+                if (timeframe in list_timeframes[:-1]) and (self.group_by != 'Profile'):
+                    for timeframe in list_timeframes[list_timeframes.index(timeframe) + 1:]:
+                        estimate = self._estimate_cost(timeframe)
+                        if estimate['points'] <= self.max_rows:
+                            break
+                    strategy = 'Coarser timeframe'
+                    self._write('Warning: the series was too long; the timeframe has been automatically changed to '
+                                f'{timeframe.replace("m", "")} minutes.')
+                    self.timeframe = timeframe
+                if estimate[key_points] > self.max_rows:
+                    strategy = 'Downsampled plot'
+            if estimate['memory'] > self.max_memory:
+                strategy = 'Refuse'
+        #
+        text_total = f' ({estimate["total_points"]:,} in total)' if self._is_session_profile() else ''
+        self._show(f'Estimated cost: {estimate["rows"]:,} rows, {estimate["breakdowns"]} breakdowns, {estimate["points"]:,} points per series'
+                 f'{text_total}, {estimate["memory"]/1024**2:,.0f} MB peak memory. Strategy: {strategy}.')
+        if strategy == 'Refuse':
+            self._show('The request is too expensive: please reduce the date range, choose a coarser timeframe or a grouping with fewer breakdowns.',
+                       error = True)
+        self.plan = {**estimate, 'strategy': strategy, 'timeframe': timeframe}
+
+    def _downsample(self):
+        '''
+        Function to keep only part of the points of each series, if they are more than `max_rows` (for per-session profiles, if the points of all
+        the series are): one value of the x-axis variable every `step` is kept, so that all the breakdowns keep the same points.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        df = self.df
+        values_x = np.sort(df[self.col_x].unique())
+        n_points = df.shape[0] if self._is_session_profile() else values_x.shape[0]
+        step = int(np.ceil(n_points/self.max_rows))
+        if (step > 1) and (not self._is_ranking()):
+            self._write(f'Warning: the series was too long; one point every {step} is shown.')
+            self.df = df[df[self.col_x].isin(values_x[::step])].reset_index(drop = True)
+
+    def _is_ranking(self):
+        '''
+        Function to tell whether only the highest and lowest values of the results are plotted.
+
+        Args: None.
+
+        Returns:
+            is_ranking: Boolean.
+        '''
+        return (self.n_metrics == 1) and (self.plot_tops_bottoms == 'Yes')
+
+    def _is_session_profile(self):
+        '''
+        Function to tell whether a profile is built for each session, in which case each series has only the price levels of its session.
+
+        Args: None.
+
+        Returns:
+            is_session_profile: Boolean.
+        '''
+        return (self.group_by == 'Profile') and (self.profile[2] == 'Session')
 
     def _filter_dates(self):
         '''
@@ -353,11 +930,15 @@ class Dashboard:
 
         Returns: None.
         '''
-        df = self.df.copy()
-        date_start = self.date_start
-        date_end = self.date_end
+        # data is time-ordered: the date range is a contiguous (zero-copy) slice
+        i_start, i_end = self.index.locate(self.date_start, self.date_end)
+        df = self.df.iloc[i_start:i_end]
+        df.index = pd.RangeIndex(df.shape[0])
         #
-        self.df = df[(df['date'] >= date_start) & (df['date'] <= date_end)].reset_index(drop = True)
+        self.df = df
+        self.index = self.index.slice(i_start, i_end)
+        # whether the bars are still the ones of the data (only sliced by date)
+        self.is_date_slice = True
 
     def _filter_month(self):
         '''
@@ -375,6 +956,7 @@ class Dashboard:
             df['month'] = df['date'].dt.month
             #
             self.df = df[~df['month'].isin(self.filt_month)].reset_index(drop = True)
+            self.is_date_slice = False
 
     def _filter_day_of_month(self):
         '''
@@ -390,6 +972,7 @@ class Dashboard:
             df['day_of_month'] = df['date'].dt.day
             #
             self.df = df[~df['day_of_month'].isin(self.filt_day_month)].reset_index(drop = True)
+            self.is_date_slice = False
 
     def _filter_day_of_week(self):
         '''
@@ -404,12 +987,30 @@ class Dashboard:
             dict_day_of_week = self.dict_day_of_week
             self.filt_day_week = [dict_day_of_week[i] for i in self.filt_day_week]
             # the weekday indicates the day of the week when the session starts
-            df['weekday'] = df['date'].dt.weekday
-            df = df.drop('weekday', axis = 1).merge(df.loc[df['session_start'] == True, ['date', 'weekday']], on = 'date', how = 'left')
-            df['weekday'] = df['weekday'].ffill()
+            df['weekday'] = session_start_weekday(df)
             df = df[~df['weekday'].isnull()].reset_index(drop = True)
             #
             self.df = df[~df['weekday'].isin(self.filt_day_week)].reset_index(drop = True)
+            self.is_date_slice = False
+
+    def _filter_sessions(self):
+        '''
+        Function to filter sessions by conditions on their features.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        if len(self.session_conditions) > 0:
+            table = session_features.get_features(self.instrument)
+            mask = session_features.get_mask(table, self.session_conditions)
+            df = self.df
+            keep = session_features.select_bars(df['n_sess'].values, table, mask)
+            n_sess = np.unique(df['n_sess'].values)
+            self._write(f'Sessions satisfying the conditions: {np.unique(df["n_sess"].values[keep]).shape[0]:,} of {n_sess.shape[0]:,}.')
+            #
+            self.df = df[keep].reset_index(drop = True)
+            self.is_date_slice = False
 
     def _filter_times(self):
         '''
@@ -419,27 +1020,31 @@ class Dashboard:
 
         Returns: None.
         '''
-        df = self.df.copy()
+        df = self.df
         #
         if (self.filter_time[0] is not None) and (self.filter_time[1] is not None):
-            df['time'] = df['date'].dt.time
-            # define a fake start session as the first time after the initial filtering time
-            df['date_only'] = df['date'].dt.date
-            df_temp = df[df['time'] >= pd.to_datetime(self.filter_time[0]).time()].groupby('date_only').agg({'date': 'first'}).reset_index()
-            df_temp['session_start_fake'] = 1
-            df = df.merge(df_temp, on = ['date_only', 'date'], how = 'left')
+            index = self.index
+            time = index.time_of_day()
+            time_start = pd.Timedelta(self.filter_time[0]).value
+            time_end = pd.Timedelta(self.filter_time[1]).value
+            # define a fake start session as the first time after the initial filtering time, for each calendar day
+            rows_start = segment_first_true(time >= time_start, index.day_offsets)
+            session_start_fake = np.zeros(df.shape[0], dtype = bool)
+            session_start_fake[rows_start[rows_start >= 0]] = True
             #
             if self.filter_time[0] < self.filter_time[1]:
-                df = df[(df['time'] >= pd.to_datetime(self.filter_time[0]).time()) &
-                        (df['time'] <= pd.to_datetime(self.filter_time[1]).time())].drop('time', axis = 1).reset_index(drop = True)
+                mask = (time >= time_start) & (time <= time_end)
             else:
-                df = df[(df['time'] >= pd.to_datetime(self.filter_time[0]).time()) |
-                        (df['time'] <= pd.to_datetime(self.filter_time[1]).time())].drop('time', axis = 1).reset_index(drop = True)
+                mask = (time >= time_start) | (time <= time_end)
+            # nothing to change (e.g., the filter spans the whole session)
+            if mask.all() and np.array_equal(session_start_fake, df['session_start'].values == True):
+                return
             #
-            df['session_start_fake'] = df['session_start_fake'].fillna(0).astype(bool)
-            df = df.drop(['date_only', 'session_start'], axis = 1).rename(columns = {'session_start_fake': 'session_start'})
+            df = df.drop('session_start', axis = 1)
+            df['session_start'] = session_start_fake
             #
-            self.df = df
+            self.df = df[mask].reset_index(drop = True)
+            self.is_date_slice = False
 
     def _group_to_timeframe(self):
         '''
@@ -449,6 +1054,14 @@ class Dashboard:
 
         Returns: None.
         '''
+        # bars of the timeframes kept up to date by the ingestion are read, unless filters changed the 1-minute bars
+        if self.is_date_slice and (self.timeframe in ingest.LIST_TIMEFRAMES):
+            self.df = self._read_derived_bars()
+            return
+        # daily and weekly bars of sessions
+        if (self.timeframe in ['Daily', 'Weekly']) and (self.bars_alignment == 'Session'):
+            self.df = self._group_to_sessions()
+            return
         df = self.df.copy()
         timeframe = self.timeframe
         # intraday timeframe
@@ -472,9 +1085,107 @@ class Dashboard:
         #
         self.df = df
         
+    def _group_to_sessions(self):
+        '''
+        Function to build daily bars from sessions (e.g., the 17:00-16:00 session of ES is a single bar, instead of being split across two calendar
+        days) and weekly bars from the sessions of each trading week. Sessions and trading weeks are contiguous segments of the time-ordered bars,
+        so bars are reductions of integer segments, without grouping keys.
+
+        Args: None.
+
+        Returns:
+            df: Bars. Daily bars are dated by the trading day of the session (the calendar day of its last bar); weekly bars have the ISO year and
+                week of their last trading day, and the date of their last bar, as calendar weekly bars.
+        '''
+        df = self.df
+        dict_agg = {'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'bpv': 'first', 'vol': 'sum',
+                    'n_sess': 'last'}
+        ts = to_ns(df['date'])
+        offsets = segment_offsets(df['n_sess'].values)
+        # trading day of each session
+        days = ts[offsets[1:] - 1]//NS_PER_DAY
+        if self.timeframe == 'Daily':
+            df_bars = reduce_segments(df, offsets, dict_agg)
+            df_bars.insert(0, 'date', (days*NS_PER_DAY).astype('datetime64[ns]'))
+            return df_bars
+        # sessions of each trading week (weeks begin on Monday, and 1970-01-01 is a Thursday)
+        offsets = offsets[segment_offsets((days + 3)//7)]
+        df_bars = reduce_segments(df, offsets, {'date': 'last', **dict_agg}).drop(columns = 'n_sess')
+        calendar = pd.DatetimeIndex(df_bars['date']).isocalendar()
+        df_bars.insert(0, 'year', calendar['year'].values)
+        df_bars.insert(1, 'week', calendar['week'].values)
+        return df_bars
+
+    def _read_derived_bars(self):
+        '''
+        Function to read the bars of the chosen timeframe in the date range from the derived data of the instrument. The bar lying across the
+        start of the range also contains 1-minute bars preceding it, so it is aggregated from the 1-minute bars of the range.
+
+        Args: None.
+
+        Returns:
+            df: Bars.
+        '''
+        df_bars = ingest.read_derived(self.instrument)[self.timeframe]
+        date_edge = pd.Timestamp(self.date_start).ceil(self.timeframe.replace('m', 'min'))
+        # first bar, from 1-minute bars
+        i_edge = np.searchsorted(self.index.timestamps, date_edge.value, side = 'right')
+        df_edge = ingest.aggregate_bars(self.df.iloc[:i_edge], self.timeframe)
+        # following bars, from derived data
+        i_start, i_end = np.searchsorted(to_ns(df_bars['date']), [date_edge.value, pd.Timestamp(self.date_end).value], side = 'right')
+        if df_edge.shape[0] == 0:
+            return df_bars.iloc[i_start:i_end].reset_index(drop = True)
+        return pd.concat((df_edge, df_bars.iloc[i_start:i_end]), ignore_index = True)
+
+    def _get_metric_matrix_key(self):
+        '''
+        Function to build the key of the bars of the chosen timeframe (and of their metric matrix), from all the parameters they depend on and the
+        data version.
+
+        Args: None.
+
+        Returns:
+            key: Key of the bars.
+        '''
+        params = {'instrument': self.instrument, 'timeframe': self.timeframe, 'bars_alignment': self.bars_alignment, 'date_start': self.date_start,
+                  'date_end': self.date_end,
+                  'filt_month': sorted(self.filt_month), 'filt_day_month': sorted(self.filt_day_month), 'filt_day_week': sorted(self.filt_day_week),
+                  'session_conditions': self.session_conditions, 'filter_time': list(self.filter_time)}
+        return self.result_store.make_key(self.instrument, data_store.data_version(self.instrument), params)
+
+    def _load_metric_matrix(self):
+        '''
+        Function to get the bars of the chosen timeframe, and their metric matrix, computed by a previous request with the same data filters and
+        timeframe (e.g., when only metric or unit changed).
+
+        Args: None.
+
+        Returns:
+            found: Whether bars and metric matrix were found.
+        '''
+        self.metric_matrix_key = self._get_metric_matrix_key()
+        df, matrix = metric_matrix.get_cached(self.metric_matrix_key)
+        if df is None:
+            return False
+        self.df = df
+        self.metric_matrix = matrix
+        return True
+
+    def _compute_metric_matrix(self):
+        '''
+        Function to compute all the metrics of the bars of the chosen timeframe, keeping them for the next requests.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        self.metric_matrix = metric_matrix.compute_metric_matrix(self.df, self.timeframe in ['1m', '5m', '15m', '30m', '60m', '120m', '240m', '480m'])
+        if self.metric_matrix_key is not None:
+            metric_matrix.put_cached(self.metric_matrix_key, self.df, self.metric_matrix)
+
     def _compute_metric(self):
         '''
-        Function to compute the metric.
+        Function to compute the metric, picking its column from the metric matrix.
 
         Args: None.
 
@@ -482,69 +1193,11 @@ class Dashboard:
         '''
         df = self.df.copy()
         #
-        def _define_metric(df, metric):
-            # close
-            if metric == 'Close':
-                df['metric'] = df['close']
-            # difference between consecutive closes
-            elif metric == 'Delta close':
-                df['metric'] = df['close'] - df['close'].shift(1)
-                # set `delta` to 0 when the session changes
-                if self.timeframe in ['1m', '5m', '15m', '30m', '60m', '120m', '240m', '480m']:
-                    df.loc[df['n_sess'] != df['n_sess'].shift(1), 'metric'] = 0
-            # body
-            elif metric == 'Body':
-                df['metric'] = df['close'] - df['open']
-            # range
-            elif metric == 'Range':
-                df['metric'] = df['high'] - df['low']
-            # difference open-high
-            elif metric == 'Open-high':
-                df['metric'] = df['high'] - df['open']
-            # difference open-low
-            elif metric == 'Open-low':
-                df['metric'] = df['open'] - df['low']
-            # number of times there is a maximum
-            elif metric == 'Num highs':
-                df['date_temp'] = df['date'].dt.date
-                df.loc[df.groupby('date_temp').agg({'high': 'idxmax'})['high'].values, 'high_sess'] = 1
-                df['high_sess'] = df['high_sess'].fillna(0).astype(int)
-                df['metric'] = df['high_sess']
-            # number of times there is a minimum
-            elif metric == 'Num lows':
-                df['date_temp'] = df['date'].dt.date
-                df.loc[df.groupby('date_temp').agg({'low': 'idxmin'})['low'].values, 'low_sess'] = 1
-                df['low_sess'] = df['low_sess'].fillna(0).astype(int)
-                df['metric'] = df['low_sess']
-            # number of times there is a maximum/minimum
-            elif metric == 'Num highs or lows':
-                df['date_temp'] = df['date'].dt.date
-                df.loc[df.groupby('date_temp').agg({'high': 'idxmax'})['high'].values, 'high_sess'] = 1
-                df.loc[df.groupby('date_temp').agg({'low': 'idxmin'})['low'].values, 'low_sess'] = 1
-                df['high_sess'] = df['high_sess'].fillna(0).astype(int)
-                df['low_sess'] = df['low_sess'].fillna(0).astype(int)
-                df['metric'] = df['high_sess'] + df['low_sess']
-            # volume
-            elif metric == 'Volume':
-                df['metric'] = df['vol']
-            #
-            return df['metric'].values
-        
-        # get metric
         if type(self.metric) == str:
-            df['metric'] = _define_metric(df, self.metric)
+            df['metric'] = self.metric_matrix[:, metric_matrix.get_column(self.metric, self.unit)].astype(float)
         else:
-            df['metric_1'] = _define_metric(df, self.metric[0])
-            df['metric_2'] = _define_metric(df, self.metric[1])
-        # rescale metric by BPV
-        if self.unit == '$':
-            if (type(self.metric) == str) and (self.metric in ['Close', 'Delta close', 'Body', 'Range', 'Open-high', 'Open-low']):
-                df['metric'] *= df['bpv']
-            if type(self.metric) == list:
-                if self.metric[0] in ['Close', 'Delta close', 'Body', 'Range', 'Open-high', 'Open-low']:
-                    df['metric_1'] *= df['bpv']
-                if self.metric[1] in ['Close', 'Delta close', 'Body', 'Range', 'Open-high', 'Open-low']:
-                    df['metric_2'] *= df['bpv']
+            df['metric_1'] = self.metric_matrix[:, metric_matrix.get_column(self.metric[0], self.unit)].astype(float)
+            df['metric_2'] = self.metric_matrix[:, metric_matrix.get_column(self.metric[1], self.unit)].astype(float)
         #
         self.df = df
 
@@ -558,14 +1211,21 @@ class Dashboard:
         '''
         df = self.df.copy()
         df['period'] = ''
+        self.dict_period = {}
         #
         if self.split_in_periods != 'No':
             df['year'] = df['date'].dt.year
             list_years = np.arange(df['year'].min(), df['year'].max() + 1)
             #
-            if self.split_in_periods == 'By year':
-                st.write('The results are splitted by year.')
+            if self.split_in_periods == 'Rolling years':
+                # bars belong to several windows: windows are built when grouping, from per-year partial aggregates
+                window = min(self.period_window, list_years.shape[0])
+                list_labels = [f'{year}-{year + window - 1}' for year in list_years[:list_years.shape[0] - window + 1]]
+                self._write(f'The results are computed over rolling windows of {window} years: ' + ', '.join(list_labels) + '.')
+            elif self.split_in_periods == 'By year':
+                self._write('The results are splitted by year.')
                 df['period'] = df['year'].astype(str)
+                self.dict_period = {year: str(year) for year in list_years}
             else:
                 len_list_years = list_years.shape[0]
                 #
@@ -580,14 +1240,269 @@ class Dashboard:
                     list_years = list_years.reshape(-1, dim_split)
                 # new labels for groups
                 list_labels = [f'{i[0]}-{i[-1]}' for i in list_years]
-                st.write('The selected periods are: ' + ', '.join(list_labels) + '.')
+                self._write('The selected periods are: ' + ', '.join(list_labels) + '.')
                 # apply grouping label
                 dict_repl = {list_years[i][j]: list_labels[i] for i in range(list_years.shape[0]) for j in range(list_years.shape[1])}
                 df['period'] = df['year'].replace(dict_repl)
+                self.dict_period = dict_repl
             # remove years which are not in the list
             df = df[df['year'] >= list_years.min()].reset_index(drop = True)
         self.df = df
-        
+
+    def _group_data_heatmap(self):
+        '''
+        Function to group data by breakdown (day of week, day of month, month or period) and time, as the cells of a heatmap: each bar is
+        assigned the integer row and column of its cell, and all cells are reduced in a single pass by `grid_reduce`.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        df = self.df
+        # weekday. notice: the weekday indicates the day of the week when the session starts
+        weekday = session_start_weekday(df)
+        df = df[~np.isnan(weekday)].reset_index(drop = True)
+        weekday = weekday[~np.isnan(weekday)].astype(int)
+        # breakdown of each bar, as an integer code, and label of each code
+        if self.group_by == 'Day of week + time':
+            col_color, code, dict_label = 'weekday', weekday, {value: key for key, value in self.dict_day_of_week.items()}
+            self._write('Notice: the day of week has to be interpreted as the day of the week when the session starts.')
+        if self.group_by == 'Day of month + time':
+            col_color, code, dict_label = 'day_of_month', df['date'].dt.day.values, {i: str(i) for i in range(1, 32)}
+        if self.group_by == 'Month + time':
+            col_color, code, dict_label = 'month', df['date'].dt.month.values, {value: key for key, value in self.dict_month.items()}
+        if self.group_by == 'Time':
+            col_color, code, dict_label = 'period', np.zeros(df.shape[0], dtype = int), {0: ''}
+        # split in periods
+        period, list_periods = np.zeros(df.shape[0], dtype = int), np.array([''])
+        if self.split_in_periods != 'No':
+            period, list_periods = pd.factorize(df['period'], sort = True)
+        codes, rows = np.unique(code*len(list_periods) + period, return_inverse = True)
+        list_labels = []
+        for i in codes:
+            label, label_period = dict_label[i//len(list_periods)], list_periods[i%len(list_periods)]
+            if self.split_in_periods != 'No':
+                label = label_period if self.group_by == 'Time' else f'{label} - {label_period}'
+            list_labels.append(label)
+        list_labels = np.array(list_labels, dtype = object)
+        # time slot of each bar (time shifted so that session begin corresponds to 00:00:00)
+        time = (to_ns(df['date']) - self.session.minutes_shift*60*10**9)%NS_PER_DAY
+        slots, cols = np.unique(time, return_inverse = True)
+        # for counts of highs/lows, use 'sum' instead of 'mean'
+        if (self.metric in ['Num highs', 'Num lows', 'Num highs or lows']) and (self.group_function == 'Mean'):
+            self.group_function = 'Sum'
+        result, count = grid_reduce(rows, cols, df['metric'].values.astype(float), (codes.shape[0], slots.shape[0]), self.group_function)
+        #
+        rows, cols = np.nonzero(count > 0)
+        col_color = 'period' if self.split_in_periods != 'No' else col_color
+        df = pd.DataFrame({col_color: list_labels[rows], 'time': pd.to_datetime(slots[cols]).strftime('%H:%M:%S'), 'metric': result[rows, cols]})
+        self.group_cols = [col_color, 'time']
+        self.col_color = col_color
+        self.col_x = 'time'
+        self.format_x = '%H:%M:%S'
+        self.df = df
+
+    def _group_data_matrix(self):
+        '''
+        Function to group data by time (possibly together with day of week, day of month, month and period) using the dense session x time slot
+        layout of `SessionMatrix`: groups are reductions of blocks of sessions along axis 0, and cumulative sums are taken along axis 1. It gives
+        the same result as the generic grouping of `_group_data`, which is used when the layout does not apply (several bars in a cell, day of week
+        changing within a session, too sparse matrix).
+
+        Args: None.
+
+        Returns:
+            done: Whether data has been grouped.
+        '''
+        df = self.df
+        # grouping keys (besides period and time) of each grouping strategy
+        dict_keys = {'Time': [], 'Day of week + time': ['weekday'], 'Day of month + time': ['day_of_month'], 'Month + time': ['month'],
+                     'Month + day of month + time': ['month', 'day_of_month']}
+        if (self.group_by not in dict_keys.keys()) or (df.shape[0] == 0):
+            return False
+        # the cumulative sum follows the order of the days of month as strings
+        if (self.group_by == 'Month + day of month + time') and (self.group_function == 'Cumsum'):
+            return False
+        #
+        layout = self._get_session_layout()
+        if layout is None:
+            return False
+        list_metrics = ['metric'] if type(self.metric) == str else ['metric_1', 'metric_2']
+        matrix = layout.with_fields({col: df[col].values[layout.keep] for col in list_metrics})
+        weekday = matrix.attributes['weekday']
+        # integer label of the group of each session, before and after midnight
+        keys = dict_keys[self.group_by]
+        list_periods = sorted(set(self.dict_period.values()))
+        labels = []
+        for cross in [0, 1]:
+            dates = matrix.row_dates(cross)
+            period = np.full(dates.shape[0], len(list_periods))
+            if self.split_in_periods != 'No':
+                dict_code = {year: list_periods.index(label) for year, label in self.dict_period.items()}
+                period = np.array([dict_code.get(year, len(list_periods)) for year in dates.year])
+            labels.append(np.ravel_multi_index((weekday*('weekday' in keys), dates.day.values*('day_of_month' in keys),
+                                                dates.month.values*('month' in keys), period), (7, 32, 13, len(list_periods) + 1)))
+        # group function of each metric: for counts of highs/lows, use 'sum' instead of 'mean'
+        list_num = ['Num highs', 'Num lows', 'Num highs or lows']
+        if len(list_metrics) == 1:
+            if (self.metric in list_num) and (self.group_function == 'Mean'):
+                self.group_function = 'Sum'
+            dict_function = {'metric': self.group_function}
+        else:
+            if (self.group_function == 'Mean') and (self.metric[0] in list_num) and (self.metric[1] in list_num):
+                self.group_function = 'Sum'
+            if (self.group_function != 'Cumsum') and (self.metric[0] in list_num):
+                matrix.values['metric_1'], matrix.values['metric_2'] = matrix.values['metric_2'], matrix.values['metric_1']
+                self.metric = self.metric[::-1]
+            dict_function = {'metric_1': self.group_function}
+            if (self.metric[1] in list_num) and (self.group_function == 'Mean'):
+                self.group_function = 'Sum'
+            dict_function['metric_2'] = self.group_function
+        # reduce, keeping the cells containing at least one bar
+        dict_values = {}
+        for col, function in dict_function.items():
+            groups, result, count = matrix.reduce(col, labels, function)
+            dict_values[col] = result[count > 0]
+        if (len(list_metrics) == 1) and (len(self.percentiles) > 0):
+            _, quantiles = matrix.quantile('metric', labels, [p/100 for p in self.percentiles])
+            for i, p in enumerate(self.percentiles):
+                dict_values[f'p{p}'] = quantiles[:, :, i][count > 0]
+        if (len(list_metrics) == 1) and (self.confidence != 'No'):
+            _, lower, upper = matrix.bootstrap('metric', labels, self.group_function, int(self.confidence.strip('%'))/100, self.n_boot)
+            dict_values['ci_low'], dict_values['ci_high'] = lower[count > 0], upper[count > 0]
+            self._write(f'Confidence intervals ({self.confidence}) are estimated from {self.n_boot} bootstrap replicates of the sessions.')
+        rows, cols = np.nonzero(count > 0)
+        weekday, day_of_month, month, period = np.unravel_index(groups[rows], (7, 32, 13, len(list_periods) + 1))
+        df = pd.DataFrame({'weekday': pd.Series(weekday).replace({value: key for key, value in self.dict_day_of_week.items()}),
+                           'day_of_month': day_of_month.astype(str), 'month': pd.Series(month).replace({value: key for key, value in self.dict_month.items()}),
+                           'period': np.array(list_periods + [''])[period], 'time': matrix.slot_labels()[cols], **dict_values})
+        # define grouping criterion and breakdown, as `_group_data` does
+        if self.split_in_periods == 'No':
+            self.group_cols = keys + ['time'] if len(keys) > 0 else 'time'
+            self.col_color = keys[0] if len(keys) > 0 else None
+        else:
+            self.group_cols = keys[:1] + ['period'] + keys[1:] + ['time']
+            self.col_color = 'period'
+            if len(keys) > 0:
+                df['period'] = df[keys[0]] + ' - ' + df['period']
+        self.col_x = 'time'
+        self.format_x = '%H:%M:%S'
+        if self.group_by == 'Day of week + time':
+            self._write('Notice: the day of week has to be interpreted as the day of the week when the session starts.')
+        df = df[(self.group_cols if type(self.group_cols) == list else [self.group_cols]) + list(dict_values.keys())]
+        df = df.sort_values(by = self.group_cols).reset_index(drop = True)
+        # group by month, day of month and time (i.e., to study seasonalities)
+        if self.group_by == 'Month + day of month + time':
+            df['day of month'] = pd.to_datetime('2000-01-' + df['day_of_month'].str.zfill(2) + ' ' + df['time'])
+            df = df.drop('time', axis = 1)
+            self.col_x = 'day of month'
+            self.format_x = '%Y-%m-%d %H:%M:%S'
+        #
+        self.df = df
+        return True
+
+    def _group_data_periods(self):
+        '''
+        Function to group data by time (possibly together with day of week, day of month and month) over rolling windows of years, stepping by
+        one year: each window is a series. Counts, sums and sums of squares of each year and cell are computed in a single pass, then adjacent
+        years are merged, so that overlapping windows do not multiply the grouping work. Likewise, percentiles merge the quantile sketches of each
+        year and cell.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        df = self.df
+        # weekday. notice: the weekday indicates the day of the week when the session starts
+        weekday = session_start_weekday(df)
+        df = df[~np.isnan(weekday)].reset_index(drop = True)
+        weekday = weekday[~np.isnan(weekday)].astype(int)
+        # grouping keys (besides period and time) of each grouping strategy, and integer code of the breakdown of each bar
+        keys = {'Time': [], 'Day of week + time': ['weekday'], 'Day of month + time': ['day_of_month'], 'Month + time': ['month'],
+                'Month + day of month + time': ['month', 'day_of_month']}[self.group_by]
+        codes, rows = np.unique(np.ravel_multi_index((weekday*('weekday' in keys), df['date'].dt.day.values*('day_of_month' in keys),
+                                                      df['date'].dt.month.values*('month' in keys)), (7, 32, 13)), return_inverse = True)
+        # time slot of each bar (time shifted so that session begin corresponds to 00:00:00)
+        time = (to_ns(df['date']) - self.session.minutes_shift*60*10**9)%NS_PER_DAY
+        slots, cols = np.unique(time, return_inverse = True)
+        years = df['date'].dt.year.values
+        year_first = years.min() if years.shape[0] > 0 else 0
+        n_years = years.max() - year_first + 1 if years.shape[0] > 0 else 0
+        # for counts of highs/lows, use 'sum' instead of 'mean'
+        if (self.metric in ['Num highs', 'Num lows', 'Num highs or lows']) and (self.group_function == 'Mean'):
+            self.group_function = 'Sum'
+        # for cumulative sums, means are cumulated along the grouping of each series, as `_group_data` does
+        function = 'Mean' if self.group_function == 'Cumsum' else self.group_function
+        result, count = window_reduce(years - year_first, rows, cols, df['metric'].values.astype(float), (codes.shape[0], slots.shape[0]), n_years,
+                                      self.period_window, function)
+        # percentiles: sketches of each year and cell, merged over the years of each window
+        quantiles = None
+        if len(self.percentiles) > 0:
+            quantiles = window_quantile(years - year_first, rows*slots.shape[0] + cols, df['metric'].values, n_years, codes.shape[0]*slots.shape[0],
+                                        self.period_window, [p/100 for p in self.percentiles])
+            quantiles = quantiles.reshape(*result.shape, len(self.percentiles))
+        # keep the cells containing at least one bar
+        window = min(self.period_window, n_years)
+        windows, rows, cols = np.nonzero(count > 0)
+        weekday, day_of_month, month = np.unravel_index(codes[rows], (7, 32, 13))
+        df = pd.DataFrame({'weekday': pd.Series(weekday).replace({value: key for key, value in self.dict_day_of_week.items()}),
+                           'day_of_month': day_of_month.astype(str), 'month': pd.Series(month).replace({value: key for key, value in self.dict_month.items()}),
+                           'period': [f'{year}-{year + window - 1}' for year in windows + year_first],
+                           'time': pd.to_datetime(slots[cols]).strftime('%H:%M:%S'), 'metric': result[windows, rows, cols]})
+        for i, p in enumerate(self.percentiles):
+            df[f'p{p}'] = quantiles[windows, rows, cols, i]
+        # define grouping criterion and breakdown, as `_group_data` does
+        self.group_cols = keys[:1] + ['period'] + keys[1:] + ['time']
+        self.col_color = 'period'
+        if len(keys) > 0:
+            df['period'] = df[keys[0]] + ' - ' + df['period']
+        self.col_x = 'time'
+        self.format_x = '%H:%M:%S'
+        if self.group_by == 'Day of week + time':
+            self._write('Notice: the day of week has to be interpreted as the day of the week when the session starts.')
+        df = df[self.group_cols + ['metric'] + [f'p{p}' for p in self.percentiles]].sort_values(by = self.group_cols).reset_index(drop = True)
+        if self.group_function == 'Cumsum':
+            df['metric'] = df.groupby('period')['metric'].cumsum()
+        # group by month, day of month and time (i.e., to study seasonalities)
+        if self.group_by == 'Month + day of month + time':
+            df['day of month'] = pd.to_datetime('2000-01-' + df['day_of_month'].str.zfill(2) + ' ' + df['time'])
+            df = df.drop('time', axis = 1)
+            self.col_x = 'day of month'
+            self.format_x = '%Y-%m-%d %H:%M:%S'
+        #
+        self.df = df
+
+    def _get_session_layout(self):
+        '''
+        Function to get the session x time slot layout of the bars, reusing the one computed by a previous request with the same bars (e.g., when
+        only metric or grouping changed).
+
+        Args: None.
+
+        Returns:
+            layout: Instance of `SessionMatrix` without fields, with the rows of the bars it contains (`keep`) and the weekday of each session
+                (`None` if the layout does not apply).
+        '''
+        df = self.df
+        # periods may drop the first years: the number of bars identifies the remaining ones
+        key = None if self.metric_matrix_key is None else f'{self.metric_matrix_key}-{df.shape[0]}'
+        layout = session_matrix.get_cached(key)
+        if layout is not None:
+            return layout
+        #
+        weekday = session_start_weekday(df)
+        keep = ~np.isnan(weekday)
+        if not keep.any():
+            return None
+        layout = SessionMatrix(df[['date']][keep], self.session.minutes_shift*60*10**9, [])
+        layout.keep = keep
+        weekday = layout.add_attribute('weekday', weekday[keep].astype(int))
+        if (not layout.is_dense) or (weekday is None) or (layout.shape[0]*layout.shape[1] > 4*keep.sum()):
+            return None
+        if key is not None:
+            session_matrix.put_cached(key, layout)
+        return layout
+
     def _group_data(self):
         '''
         Function to group data according to chosen strategy.
@@ -602,20 +1517,45 @@ class Dashboard:
         self.col_color = None
         #
         if self.group_by is not None:
-            # shift time so that session begin corresponds to 00:00:00. It will be fixed later in the code
-            df['time'] = (df['date'] - pd.Timedelta(eval(self.sess_start.split(':')[0].lstrip('0')), unit = 'h')).dt.time.astype(str)
+            if self.heatmap == 'Yes':
+                self._group_data_heatmap()
+                return
+            if self.group_function in rolling.LIST_ROLLING:
+                self._group_data_rolling()
+                return
+            if self.group_by == 'Around event':
+                self._group_data_event()
+                return
+            if self.group_by == 'Profile':
+                self._group_data_profile()
+                return
+            if self.split_in_periods == 'Rolling years':
+                self._group_data_periods()
+                return
+            if self._group_data_matrix():
+                return
+            if self.confidence != 'No':
+                self._write('Confidence intervals are not available for the selected data.')
             # weekday. notice: the weekday indicates the day of the week when the session starts
-            df['weekday'] = df['date'].dt.weekday
-            df = df.drop('weekday', axis = 1).merge(df.loc[df['session_start'] == True, ['date', 'weekday']], on = 'date', how = 'left')
-            df['weekday'] = df['weekday'].ffill()
-            df = df[~df['weekday'].isnull()].reset_index(drop = True)
-            df['weekday'] = df['weekday'].astype(int).replace({value: key for key, value in self.dict_day_of_week.items()})
-            # day of month
-            df['day_of_month'] = df['date'].dt.day.astype(str)
-            # month
-            df['month'] = df['date'].dt.month.replace({value: key for key, value in self.dict_month.items()})
-            # all history
-            df['history'] = df['date'].astype(str)
+            weekday = session_start_weekday(df)
+            df = df[~np.isnan(weekday)].reset_index(drop = True)
+            weekday = weekday[~np.isnan(weekday)].astype(int)
+            # only the keys of the chosen grouping are built
+            group_by = self.group_by.lower()
+            if 'time' in group_by:
+                # shift time so that session begin corresponds to 00:00:00. It will be fixed later in the code
+                df['time'] = format_times(to_ns(df['date']) - self.session.minutes_shift*60*10**9)
+            # names are looked up in tables indexed by number, instead of formatting each row
+            if 'day of week' in group_by:
+                names = {value: key for key, value in self.dict_day_of_week.items()}
+                df['weekday'] = np.array([names[i] for i in range(7)], dtype = object)[weekday]
+            if 'day of month' in group_by:
+                df['day_of_month'] = np.array([str(i) for i in range(32)], dtype = object)[df['date'].dt.day.values]
+            if group_by.startswith('month'):
+                names = {value: key for key, value in self.dict_month.items()}
+                df['month'] = np.array([names.get(i) for i in range(13)], dtype = object)[df['date'].dt.month.values]
+            if 'history' in group_by:
+                df['history'] = format_dates(df['date'])
             # define grouping criterion
             if self.group_by == 'Time':
                 # df.to_pickle('./aa.pickle.gz')
@@ -637,7 +1577,7 @@ class Dashboard:
                     self.col_color = 'period'
                 self.col_x = 'time'
                 self.format_x = '%H:%M:%S'
-                st.write('Notice: the day of week has to be interpreted as the day of the week when the session starts.')
+                self._write('Notice: the day of week has to be interpreted as the day of the week when the session starts.')
             if self.group_by == 'Day of month + time':
                 if self.split_in_periods == 'No':
                     self.group_cols = ['day_of_month', 'time']
@@ -687,7 +1627,7 @@ class Dashboard:
                     self.col_color = 'period'
                 self.col_x = 'history'
                 self.format_x = '%Y-%m-%d %H:%M:%S'
-                st.write('Notice: the day of week has to be interpreted as the day of the week when the session starts.')
+                self._write('Notice: the day of week has to be interpreted as the day of the week when the session starts.')
             if self.group_by == 'Day of month + history':
                 if self.split_in_periods == 'No':
                     self.group_cols = ['day_of_month', 'history']
@@ -716,22 +1656,25 @@ class Dashboard:
                     if (self.metric in ['Num highs', 'Num lows', 'Num highs or lows']) and (self.group_function == 'Mean'):
                         self.group_function = 'Sum'
                     #
-                    df = df.groupby(self.group_cols).agg({**{'metric': self.group_function.lower()},
-                                                          **{'date': 'max', 'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min',
-                                                             'close': 'last', 'bpv': 'first', 'vol': 'sum'}}).reset_index()
+                    dict_percentiles = self._group_percentiles(df)
+                    df = self._aggregate(df, {**{'metric': self.group_function.lower()},
+                                              **{'date': 'max', 'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+                                                 'bpv': 'first', 'vol': 'sum'}})
+                    for col, values in dict_percentiles.items():
+                        df[col] = values
                 # the function is 'cumsum'
                 else:
                     # no multiple breakdown
                     if self.col_color is None:
-                        df = df.groupby(self.group_cols).agg({**{'metric': 'mean'},
-                                                              **{'date': 'max', 'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min',
-                                                                 'close': 'last', 'bpv': 'first', 'vol': 'sum'}}).reset_index()
+                        df = self._aggregate(df, {**{'metric': 'mean'},
+                                                  **{'date': 'max', 'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+                                                     'bpv': 'first', 'vol': 'sum'}})
                         df['metric'] = df['metric'].cumsum()
                     # multiple breakdown
                     else:
-                        df = df.groupby(self.group_cols).agg({**{'metric': 'mean'},
-                                                              **{'date': 'max', 'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min',
-                                                                 'close': 'last', 'bpv': 'first', 'vol': 'sum'}})
+                        df = self._aggregate(df, {**{'metric': 'mean'},
+                                                  **{'date': 'max', 'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+                                                     'bpv': 'first', 'vol': 'sum'}}).set_index(self.group_cols)
                         df = df.drop('metric', axis = 1).merge(df.groupby(self.col_color).agg({'metric': 'cumsum'}), left_index = True,
                                                                right_index = True).reset_index()
             # group data: 2 metrics
@@ -747,32 +1690,32 @@ class Dashboard:
                         df['metric_1'], df['metric_2'] = df['metric_2'], df['metric_1']
                         self.metric = self.metric[::-1]
                     #
-                    df_temp = df.groupby(self.group_cols).agg({**{'metric_1': self.group_function.lower()},
-                                                               **{'date': 'max', 'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min',
-                                                                  'close': 'last', 'bpv': 'first', 'vol': 'sum'}}).reset_index()
+                    df_temp = self._aggregate(df, {**{'metric_1': self.group_function.lower()},
+                                                   **{'date': 'max', 'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+                                                      'bpv': 'first', 'vol': 'sum'}})
                     # for counts of highs/lows, use 'sum' instead of 'mean'
                     if (self.metric[1] in ['Num highs', 'Num lows', 'Num highs or lows']) and (self.group_function == 'Mean'):
                         self.group_function = 'Sum'
                     #
-                    df = df.groupby(self.group_cols).agg({'metric_2': self.group_function.lower()}).reset_index()
+                    df = self._aggregate(df, {'metric_2': self.group_function.lower()})
                     df = df.merge(df_temp, on = self.group_cols, how = 'left')
                 # the function is 'cumsum'
                 else:
                     # no multiple breakdown
                     if self.col_color is None:
-                        df_temp = df.groupby(self.group_cols).agg({**{'metric_1': 'mean'},
-                                                                   **{'date': 'max', 'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min',
-                                                                      'close': 'last', 'bpv': 'first', 'vol': 'sum'}}).reset_index()
-                        df = df.groupby(self.group_cols).agg({'metric_2': 'mean'}).reset_index()
+                        df_temp = self._aggregate(df, {**{'metric_1': 'mean'},
+                                                       **{'date': 'max', 'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min',
+                                                          'close': 'last', 'bpv': 'first', 'vol': 'sum'}})
+                        df = self._aggregate(df, {'metric_2': 'mean'})
                         df = df.merge(df_temp, on = self.group_cols, how = 'left')
                         df['metric_1'] = df['metric_1'].cumsum()
                         df['metric_2'] = df['metric_2'].cumsum()
                     # multiple breakdown
                     else:
-                        df_temp = df.groupby(self.group_cols).agg({**{'metric_1': 'mean'},
-                                                                   **{'date': 'max', 'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min',
-                                                                      'close': 'last', 'bpv': 'first', 'vol': 'sum'}})
-                        df = df.groupby(self.group_cols).agg({'metric_2': 'mean'})
+                        df_temp = self._aggregate(df, {**{'metric_1': 'mean'},
+                                                       **{'date': 'max', 'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min',
+                                                          'close': 'last', 'bpv': 'first', 'vol': 'sum'}}).set_index(self.group_cols)
+                        df = self._aggregate(df, {'metric_2': 'mean'}).set_index(self.group_cols)
                         df = df.merge(df_temp, how = 'left', left_index = True, right_index = True)
                         df = df.drop('metric_1', axis = 1).merge(df.groupby(self.col_color).agg({'metric_1': 'cumsum'}), left_index = True,
                                                                  right_index = True).reset_index()
@@ -793,65 +1736,178 @@ class Dashboard:
             #
             self.df = df
 
-    def _adjust_timeframe(self):
+    def _group_data_rolling(self):
         '''
-        Function to adjust the timeframe is the time series is too long (controlled by the `max_rows` class input parameter).
+        Function to compute a rolling statistic (mean, standard deviation or z-score) of the metric of each bar, over the bars of the last sessions
+        (or days), or over the bars of the same time slot in the last sessions. Statistics are computed from prefix sums, so that their cost does
+        not depend on the length of the window.
 
         Args: None.
 
         Returns: None.
         '''
-        df = self.df.copy()
-        if self.col_color is None:
-            n_rows = df.shape[0]
-        else:
-            n_rows = df.groupby(self.col_color).agg({'close': 'count'})['close'].max()
+        df = self.df
+        window, unit, by_slot = self.rolling
+        offsets = segment_offsets(df['n_sess'].values)
+        dates_session = df['date'].values[offsets[:-1]]
+        starts = rolling.get_window_starts(dates_session, window, unit)
+        slots = None
+        if by_slot == 'Yes':
+            time = (to_ns(df['date']) - self.session.minutes_shift*60*10**9)%NS_PER_DAY
+            slots = np.unique(time, return_inverse = True)[1]
+        values = rolling.rolling_statistic(df['metric'].values, offsets, starts, self.group_function, slots)
+        self._write(f'{self.group_function} over the last {window} {unit.lower()}' + (' by time slot.' if by_slot == 'Yes' else '.'))
         #
-        if n_rows > self.max_rows:
-            # original timeframe is 1 minute
-            if self.timeframe == '1m':
-                if self.max_rows > n_rows/5:
-                    new_timeframe = 5
-                elif (n_rows/15 < self.max_rows < n_rows/5):
-                    new_timeframe = 15
-                elif (n_rows/30 < self.max_rows < n_rows/15):
-                    new_timeframe = 30
-                else:
-                    new_timeframe = 60
-            # original timeframe is 5 minutes
-            if self.timeframe == '5m':
-                if self.max_rows > n_rows/3:
-                    new_timeframe = 15
-                elif (n_rows/6 < self.max_rows < n_rows/3):
-                    new_timeframe = 30
-                else:
-                    new_timeframe = 60
-            # original timeframe is 15 minutes
-            if self.timeframe == '15m':
-                if self.max_rows > n_rows/2:
-                    new_timeframe = 30
-                else:
-                    new_timeframe = 60
-            # original timeframe is 30 minutes
-            if self.timeframe == '30m':
-                if self.max_rows > n_rows/2:
-                    new_timeframe = 60
-            # round dates and times to the new timeframe
-            if new_timeframe == 5:
-                df['date'] = df['date'].dt.ceil('5min')
-            if new_timeframe == 15:
-                df['date'] = df['date'].dt.ceil('15min')
-            if new_timeframe == 30:
-                df['date'] = df['date'].dt.ceil('30min')
-            if new_timeframe == 60:
-                df['date'] = df['date'].dt.ceil('1h')
-            # group data according to the new timeframe
-            st.write(f'Warning: the series was too long; the timeframe has been automatically changed to {new_timeframe} minutes.')
-            df = df.groupby('date').agg({'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'bpv': 'first',
-                                         'vol': 'sum'}).reset_index()
-            self.df = df
-            self._compute_metric()
-            self._group_data()
+        df = df.assign(metric = values, history = df['date'].astype(str))
+        df = df[~np.isnan(values)].reset_index(drop = True)
+        self.group_cols = 'history' if self.split_in_periods == 'No' else ['period', 'history']
+        self.col_color = None if self.split_in_periods == 'No' else 'period'
+        self.col_x = 'history'
+        self.format_x = '%Y-%m-%d %H:%M:%S'
+        self.df = df[([] if self.col_color is None else ['period']) + ['history', 'metric', 'date', 'session_start', 'open', 'high', 'low', 'close',
+                                                                      'bpv', 'vol']]
+
+    def _group_data_event(self):
+        '''
+        Function to align the sessions on an event (e.g., settlement): the bars in a window around the event of each session are gathered into a
+        sessions x window matrix, through `searchsorted` on the time-ordered bars and fancy indexing, then the matrix is reduced along sessions with
+        the grouping function.
+
+        Args: None.
+
+        Returns: None.
+        '''
+        df = self.df
+        anchor, time_custom, minutes_before, minutes_after = self.event
+        minutes_anchor = event_study.get_anchor_minutes(self.session, anchor, time_custom)
+        list_metrics = ['metric'] if type(self.metric) == str else ['metric_1', 'metric_2']
+        self.group_cols = 'minutes' if self.split_in_periods == 'No' else ['period', 'minutes']
+        self.col_color = None if self.split_in_periods == 'No' else 'period'
+        self.col_x = 'minutes'
+        self.format_x = None
+        if (minutes_anchor is None) or (df.shape[0] == 0):
+            self._write(f'Event {anchor} is not defined for {self.instrument}.' if minutes_anchor is None else 'No data.')
+            self.df = pd.DataFrame(columns = ([] if self.col_color is None else ['period']) + ['minutes'] + list_metrics)
+            return
+        # event of each session, and period of the session
+        ts = to_ns(df['date'])
+        offsets = segment_offsets(df['n_sess'].values)
+        ts_anchor = event_study.get_anchor_times(ts[offsets[:-1]], self.session.minutes_shift, minutes_anchor)
+        labels, periods = pd.factorize(df['period'].values[offsets[:-1]], sort = True)
+        minutes_bar = int(self.timeframe.rstrip('m'))
+        list_matrices, minutes = event_study.gather_windows(ts, [df[col].values.astype(float) for col in list_metrics], ts_anchor,
+                                                            minutes_before//minutes_bar, minutes_after//minutes_bar, minutes_bar)
+        self._write(f'{ts_anchor.shape[0]} sessions aligned on {anchor.lower() if anchor != "Custom time" else time_custom}.')
+        # group function of each metric: for counts of highs/lows, use 'sum' instead of 'mean'
+        list_num = ['Num highs', 'Num lows', 'Num highs or lows']
+        list_names = [self.metric] if type(self.metric) == str else self.metric
+        dict_values = {}
+        for col, name, matrix in zip(list_metrics, list_names, list_matrices):
+            function = 'Sum' if (name in list_num) and (self.group_function == 'Mean') else self.group_function
+            result, count = event_study.reduce_windows(matrix, labels, periods.shape[0], function)
+            dict_values[col] = result[count > 0]
+        if (len(list_metrics) == 1) and (len(self.percentiles) > 0):
+            quantiles = event_study.quantile_windows(list_matrices[0], labels, periods.shape[0], [p/100 for p in self.percentiles])
+            for i, p in enumerate(self.percentiles):
+                dict_values[f'p{p}'] = quantiles[:, :, i][count > 0]
+        rows, cols = np.nonzero(count > 0)
+        df = pd.DataFrame({'period': np.asarray(periods)[rows], 'minutes': minutes[cols], **dict_values})
+        self.df = df if self.col_color is not None else df.drop('period', axis = 1)
+
+    def _group_data_profile(self):
+        '''
+        Function to build the market profile (volume or time at price) of the bars: the volume of each bar is divided among the price levels
+        (ticks) of its low-high range, while its duration is added to each of them. Profiles are summed over the sessions of the date range (by
+        period, if split) or built for each session, with vectorized weighted histograms (see `market_profile.bin_profile`).
+
+        Args: None.
+
+        Returns: None.
+        '''
+        df = self.df
+        quantity, prices, profile_by = self.profile
+        col_color = 'session' if profile_by == 'Session' else ('period' if self.split_in_periods != 'No' else None)
+        self.col_x = 'price' if prices == 'Absolute' else 'distance from open'
+        self.format_x = None
+        self.group_cols = self.col_x if col_color is None else [col_color, self.col_x]
+        self.col_color = col_color
+        self.metric = f'{quantity} at price' if quantity == 'Volume' else f'{quantity} at price [min]'
+        if df.shape[0] == 0:
+            self._write('No data.')
+            self.df = pd.DataFrame(columns = ([] if col_color is None else [col_color]) + [self.col_x, 'metric'])
+            return
+        # price level of the range of each bar, possibly from the open of its session
+        tick = self._get_tick(df['close'].values)
+        offsets = segment_offsets(df['n_sess'].values)
+        sessions = segment_labels(offsets)
+        low, high = market_profile.price_levels(df['low'].values, tick), market_profile.price_levels(df['high'].values, tick)
+        if prices == 'From session open':
+            level_open = market_profile.price_levels(df['open'].values[offsets[:-1]], tick)[sessions]
+            low, high = low - level_open, high - level_open
+        # profile of each session, or of each period (bars of a session may belong to two periods)
+        if profile_by == 'Session':
+            labels, names = sessions, format_dates(df['date'].values[offsets[1:] - 1].astype('datetime64[D]'))
+        else:
+            labels, names = pd.factorize(df['period'].values, sort = True)
+        n_sessions = np.bincount(np.unique(sessions*len(names) + labels)%len(names), minlength = len(names))
+        weights = df['vol'].values.astype(float) if quantity == 'Volume' else np.full(df.shape[0], float(self.timeframe.rstrip('m')))
+        levels, groups, profile = market_profile.bin_profile(low, high, labels, len(names), weights, spread = quantity == 'Volume')
+        if self.group_function == 'Mean':
+            profile = profile/n_sessions[groups]
+        self._write(f'Profiles of {offsets.shape[0] - 1} sessions, with a tick size of {tick:g}.')
+        df = pd.DataFrame({'group': np.asarray(names, dtype = object)[groups], self.col_x: np.round(levels*tick, 10), 'metric': profile})
+        self.df = df.drop('group', axis = 1) if col_color is None else df.rename(columns = {'group': col_color})
+
+    def _get_tick(self, prices):
+        '''
+        Function to get the tick size of the instrument, from the session registry or, if not defined there, from its prices.
+
+        Args:
+            prices: Array of prices.
+
+        Returns:
+            tick: Tick size (1 if prices never change).
+        '''
+        if self.session.tick is not None:
+            return self.session.tick
+        return market_profile.infer_tick(prices) or 1
+
+    def _aggregate(self, df, dict_agg):
+        '''
+        Function to aggregate data by the grouping columns. Identity groupings (e.g., 'History') and simple aggregations over small sets of keys use
+        the fast paths of `fast_groupby`, with the same output as `pandas`, which is used otherwise.
+
+        Args:
+            df: Frame to group.
+            dict_agg: Dictionary with the aggregation of each column.
+
+        Returns:
+            df: Aggregated frame, with the grouping columns as columns.
+        '''
+        df_result = fast_groupby.aggregate(df, self.group_cols, dict_agg)
+        if df_result is None:
+            df_result = df.groupby(self.group_cols).agg(dict_agg).reset_index()
+        return df_result
+
+    def _group_percentiles(self, df):
+        '''
+        Function to estimate the selected percentiles of the metric for each group, using mergeable quantile sketches.
+
+        Args:
+            df: Data to group.
+
+        Returns:
+            dict_percentiles: Dictionary with the percentiles of each group (in the order of `groupby`), by column name.
+        '''
+        dict_percentiles = {}
+        if (len(self.percentiles) == 0) or (df.shape[0] == 0):
+            return dict_percentiles
+        labels = df.groupby(self.group_cols).ngroup().values
+        groups, quantiles = QuantileSketch.from_values(labels, df['metric'].values).quantile([p/100 for p in self.percentiles])
+        for i, p in enumerate(self.percentiles):
+            dict_percentiles[f'p{p}'] = np.full(labels.max() + 1, np.nan)
+            dict_percentiles[f'p{p}'][groups] = quantiles[:, i]
+        return dict_percentiles
 
     def _fix_missing_dates(self):
         '''
@@ -863,7 +1919,11 @@ class Dashboard:
         '''
         df = self.df.copy()
         #
-        if self.col_color is None:
+        if self.group_by == 'Profile':
+            # profiles keep only the price levels of their sessions, which are not missing dates
+            sort_cols = self.col_x if self.col_color is None else [self.col_x, self.col_color]
+            df = df.sort_values(by = sort_cols).reset_index(drop = True)
+        elif self.col_color is None:
             df = df.sort_values(by = self.col_x).reset_index(drop = True)
         else:
             combinations = np.meshgrid(df[self.col_x].unique(), df[self.col_color].unique())
@@ -873,6 +1933,38 @@ class Dashboard:
         #
         self.df = df
 
+    def _plot(self):
+        '''
+        Function to plot the results of the request, with the chart of the chosen options.
+
+        Args: None.
+
+        Returns:
+            figure: Figure.
+        '''
+        df = self.df
+        df.columns = df.columns.str.capitalize()
+        self.col_x = self.col_x.capitalize()
+        if self.col_color is not None:
+            self.col_color = self.col_color.capitalize()
+        #
+        if self.n_metrics == 1:
+            if self.heatmap == 'Yes':
+                figure = self._plot_heatmap()
+            elif self.plot_tops_bottoms == 'No':
+                figure = self._plot_1_metric()
+                figure = self._plot_zoom_1_metric(figure)
+                figure = self._plot_percentiles_1_metric(figure)
+                figure = self._plot_confidence_1_metric(figure)
+                figure = self._plot_time_1_metric(figure)
+            else:
+                figure = self._plot_tops_bottoms()
+        else:
+            figure = self._plot_2_metrics()
+            figure = self._plot_time_2_metrics(figure)
+        figure.update_layout(xaxis_rangeslider_visible = False)
+        return figure
+
     def _plot_1_metric(self):
         '''
         Function to plot the main chart.
@@ -891,9 +1983,9 @@ class Dashboard:
         if label_y in ['Close', 'Delta close', 'Body', 'Range', 'Open-high', 'Open-low']:
             label_y += f' [{self.unit}]'
         # shift time back to original values: this way, the first row corresponds to session start
-        if dashboard.col_x == 'Time':
+        if self.col_x == 'Time':
             df['Time'] = (pd.to_datetime('2000-01-01 ' + df['Time']) +
-                          pd.Timedelta(eval(self.sess_start.split(':')[0].lstrip('0')), unit = 'h')).dt.time
+                          pd.Timedelta(self.session.minutes_shift, unit = 'min')).dt.time
         #
         figure = go.Figure()
         figure.update_layout(go.Layout(margin = dict(l = 20, r = 20, t = 20, b = 20), template = 'simple_white', showlegend = False,
@@ -902,40 +1994,212 @@ class Dashboard:
                                        yaxis = {'showgrid': True, 'showline': True, 'mirror': True, 'titlefont': {'size': 20}, 'tickfont': {'size': 16},
                                                 'tickformat': f'.{n_digits}f', 'title': label_y},
                                        font = {'size': 28}, autosize = False, width = 900, height = 500, hovermode = 'closest'))
-        if dashboard.col_x == 'Day of month':
+        if self.col_x == 'Day of month':
             figure.update_layout(go.Layout(xaxis = {'tickmode': 'array', 'tickvals': [f'2000-01-{str(i).zfill(2)} 00:00:00' for i in np.arange(1, 32, 2)],
                                                     'ticktext': [f'{i}' for i in np.arange(1, 32, 2)],'showgrid': True, 'showline': True, 'mirror': True,
                                                     'titlefont': {'size': 20}, 'tickfont': {'size': 16}, 'tickangle': 0}))
         #
-        if dashboard.plot_type == 'Lines':
-            if dashboard.col_color is None:
-                figure.add_trace(go.Scatter(x = df[dashboard.col_x], y = df['Metric'], mode = 'lines'))
+        if self.plot_type == 'Lines':
+            if self.col_color is None:
+                figure.add_trace(go.Scatter(x = df[self.col_x], y = df['Metric'], mode = 'lines'))
             else:
-                for breakdown in df[dashboard.col_color].unique():
-                    if dashboard.col_x != 'Day of month':
-                        figure.add_trace(go.Scatter(x = df.loc[df[dashboard.col_color] == breakdown, dashboard.col_x],
-                                                    y = df.loc[df[dashboard.col_color] == breakdown, 'Metric'],
+                for breakdown in df[self.col_color].unique():
+                    if self.col_x != 'Day of month':
+                        figure.add_trace(go.Scatter(x = df.loc[df[self.col_color] == breakdown, self.col_x],
+                                                    y = df.loc[df[self.col_color] == breakdown, 'Metric'],
                                                     name = f'{breakdown}', mode = 'lines'))
                     else:
-                        figure.add_trace(go.Scatter(x = df.loc[df[dashboard.col_color] == breakdown, dashboard.col_x],
-                                                    y = df.loc[df[dashboard.col_color] == breakdown, 'Metric'],
+                        figure.add_trace(go.Scatter(x = df.loc[df[self.col_color] == breakdown, self.col_x],
+                                                    y = df.loc[df[self.col_color] == breakdown, 'Metric'],
                                                     name = f'{breakdown}', mode = 'lines', hovertemplate = 'Day %{x|%d}: %{x|%H:%M:%S}'))
-        elif dashboard.plot_type == 'Bars':
-            if dashboard.col_color is None:
-                figure.add_trace(go.Bar(x = df[dashboard.col_x], y = df['Metric'], width = 0.5, offset = -0.5))
+        elif self.plot_type == 'Bars':
+            if self.col_color is None:
+                figure.add_trace(go.Bar(x = df[self.col_x], y = df['Metric'], width = 0.5, offset = -0.5))
             else:
-                for breakdown in df[dashboard.col_color].unique():
-                    if dashboard.col_x != 'Day of month':
-                        figure.add_trace(go.Bar(x = df.loc[df[dashboard.col_color] == breakdown, dashboard.col_x],
-                                                    y = df.loc[df[dashboard.col_color] == breakdown, 'Metric'],
+                for breakdown in df[self.col_color].unique():
+                    if self.col_x != 'Day of month':
+                        figure.add_trace(go.Bar(x = df.loc[df[self.col_color] == breakdown, self.col_x],
+                                                    y = df.loc[df[self.col_color] == breakdown, 'Metric'],
                                                     name = f'{breakdown}', width = 0.5, offset = -0.5))
                     else:
-                        figure.add_trace(go.Bar(x = df.loc[df[dashboard.col_color] == breakdown, dashboard.col_x],
-                                                    y = df.loc[df[dashboard.col_color] == breakdown, 'Metric'],
+                        figure.add_trace(go.Bar(x = df.loc[df[self.col_color] == breakdown, self.col_x],
+                                                    y = df.loc[df[self.col_color] == breakdown, 'Metric'],
                                                     name = f'{breakdown}', width = 0.5, offset = -0.5, hovertemplate = 'Day %{x|%d}: %{x|%H:%M:%S}'))
         self.df = df
         return figure
 
+    def _plot_zoom_1_metric(self, figure):
+        '''
+        Function to add the results in the zoom window to the chart of the whole date range, showing the window.
+
+        Args:
+            figure: Figure.
+
+        Returns:
+            figure: Figure.
+        '''
+        if (self.zoom_window is None) or (self.df_zoom is None):
+            return figure
+        df = self.df_zoom
+        figure.data[0].update(name = f'Overview ({self.timeframe})', opacity = 0.4)
+        if self.plot_type == 'Lines':
+            figure.add_trace(go.Scatter(x = df['history'], y = df['metric'], name = f'Zoom ({self.timeframe_zoom})', mode = 'lines'))
+        else:
+            figure.add_trace(go.Bar(x = df['history'], y = df['metric'], name = f'Zoom ({self.timeframe_zoom})', width = 0.5, offset = -0.5))
+        figure.update_layout(showlegend = True, xaxis = {'range': [df['history'].iloc[0], df['history'].iloc[-1]]})
+        return figure
+
+    def _plot_percentiles_1_metric(self, figure):
+        '''
+        Function to plot the selected percentiles of the metric: symmetric percentiles (e.g., 10 and 90) are drawn as bands, the others as dotted
+        lines.
+
+        Args:
+            figure: Figure built by the function `_plot_1_metric`.
+
+        Returns:
+            figure: Figure with percentiles.
+        '''
+        df = self.df.copy()
+        list_breakdowns = [None] if self.col_color is None else list(df[self.col_color].unique())
+        list_colors = plotly.colors.DEFAULT_PLOTLY_COLORS
+        for i, breakdown in enumerate(list_breakdowns):
+            df_temp = df if breakdown is None else df[df[self.col_color] == breakdown]
+            color = list_colors[i%len(list_colors)]
+            for p in sorted(self.percentiles):
+                if (p < 50) and (100 - p in self.percentiles):
+                    figure.add_trace(go.Scatter(x = df_temp[self.col_x], y = df_temp[f'P{p}'], mode = 'lines', line = {'width': 0, 'color': color},
+                                                showlegend = False, hoverinfo = 'skip'))
+                    figure.add_trace(go.Scatter(x = df_temp[self.col_x], y = df_temp[f'P{100 - p}'], mode = 'lines', fill = 'tonexty',
+                                                line = {'width': 0, 'color': color}, fillcolor = color.replace('rgb', 'rgba').replace(')', ', 0.15)'),
+                                                name = f'P{p}-P{100 - p}' + ('' if breakdown is None else f' {breakdown}'), showlegend = False))
+                elif (p > 50) and (100 - p in self.percentiles):
+                    continue
+                else:
+                    figure.add_trace(go.Scatter(x = df_temp[self.col_x], y = df_temp[f'P{p}'], mode = 'lines', line = {'dash': 'dot', 'color': color},
+                                                name = f'P{p}' + ('' if breakdown is None else f' {breakdown}'), showlegend = False))
+        return figure
+
+    def _plot_confidence_1_metric(self, figure):
+        '''
+        Function to plot the bootstrap confidence intervals of the metric as bands.
+
+        Args:
+            figure: Figure built by the function `_plot_1_metric`.
+
+        Returns:
+            figure: Figure with confidence intervals.
+        '''
+        df = self.df.copy()
+        if 'Ci_low' not in df.columns:
+            return figure
+        list_breakdowns = [None] if self.col_color is None else list(df[self.col_color].unique())
+        list_colors = plotly.colors.DEFAULT_PLOTLY_COLORS
+        for i, breakdown in enumerate(list_breakdowns):
+            df_temp = df if breakdown is None else df[df[self.col_color] == breakdown]
+            color = list_colors[i%len(list_colors)]
+            figure.add_trace(go.Scatter(x = df_temp[self.col_x], y = df_temp['Ci_low'], mode = 'lines', line = {'width': 1, 'dash': 'dash', 'color': color},
+                                        showlegend = False, hoverinfo = 'skip'))
+            figure.add_trace(go.Scatter(x = df_temp[self.col_x], y = df_temp['Ci_high'], mode = 'lines', fill = 'tonexty',
+                                        line = {'width': 1, 'dash': 'dash', 'color': color},
+                                        fillcolor = color.replace('rgb', 'rgba').replace(')', ', 0.25)'),
+                                        name = f'CI {self.confidence}' + ('' if breakdown is None else f' {breakdown}'), showlegend = False))
+        return figure
+
+    def _plot_heatmap(self):
+        '''
+        Function to plot the breakdowns of the grouping against time as a single heatmap.
+
+        Args: None.
+
+        Returns:
+            figure: Figure.
+        '''
+        df = self.df.copy()
+        # add unit to color bar label
+        label_z = self.metric
+        if label_z in ['Close', 'Delta close', 'Body', 'Range', 'Open-high', 'Open-low']:
+            label_z += f' [{self.unit}]'
+        # breakdowns in calendar order; times in session order
+        dict_order = {**self.dict_day_of_week, **self.dict_month}
+        def _sort_key(label):
+            return [dict_order.get(part, int(part) if part.isdigit() else part) for part in str(label).split(' - ')]
+        df_pivot = df.pivot(index = self.col_color, columns = self.col_x, values = 'Metric')
+        df_pivot = df_pivot.loc[sorted(df_pivot.index, key = _sort_key)]
+        # shift time back to original values
+        list_times = (pd.to_datetime('2000-01-01 ' + df_pivot.columns.astype(str)) +
+                      pd.Timedelta(self.session.minutes_shift, unit = 'min')).strftime('%H:%M:%S')
+        #
+        z = df_pivot.values
+        figure = go.Figure(go.Heatmap(x = list_times, y = df_pivot.index.astype(str), z = z, colorscale = 'RdBu_r',
+                                      zmid = 0 if (np.nanmin(z) < 0) and (np.nanmax(z) > 0) else None, colorbar = {'title': label_z},
+                                      hovertemplate = '%{y} %{x}: %{z}<extra></extra>'))
+        figure.update_layout(go.Layout(margin = dict(l = 20, r = 20, t = 20, b = 20), template = 'simple_white',
+                                       xaxis = {'type': 'category', 'showline': True, 'mirror': True, 'titlefont': {'size': 20},
+                                                'tickfont': {'size': 16}, 'tickangle': -90, 'title': self.col_x, 'nticks': 24},
+                                       yaxis = {'type': 'category', 'showline': True, 'mirror': True, 'titlefont': {'size': 20},
+                                                'tickfont': {'size': 16}, 'title': self.col_color},
+                                       font = {'size': 28}, autosize = False, width = 900, height = 500))
+        return figure
+
+    def _plot_comparison(self):
+        '''
+        Function to plot the results of the compared instruments on the same chart.
+
+        Args: None.
+
+        Returns:
+            figure: Figure.
+        '''
+        label_y = self.metric
+        if label_y in ['Close', 'Delta close', 'Body', 'Range', 'Open-high', 'Open-low']:
+            label_y += f' [{self.unit}]'
+        if self.normalization == 'Z-score':
+            label_y += ' (z-score)'
+        #
+        figure = go.Figure()
+        # union of the values of the x-axis variable, in order of appearance
+        dict_x = {}
+        for instrument, (df, attrs) in self.comparison.items():
+            x = df[attrs['col_x']]
+            # shift time back to original values, since sessions of different instruments may begin at different times
+            if attrs['col_x'] == 'time':
+                x = compare.to_clock_time(x, attrs['minutes_shift'])
+            dict_x.update(dict.fromkeys(x))
+            y = compare.normalize(df['metric'].values, self.normalization)
+            if self.plot_type == 'Lines':
+                figure.add_trace(go.Scatter(x = x, y = y, name = instrument, mode = 'lines'))
+            else:
+                figure.add_trace(go.Bar(x = x, y = y, name = instrument))
+        figure.update_layout(go.Layout(margin = dict(l = 20, r = 20, t = 20, b = 20), template = 'simple_white', showlegend = True,
+                                       xaxis = {'showgrid': True, 'showline': True, 'mirror': True, 'titlefont': {'size': 20}, 'tickfont': {'size': 16},
+                                                'tickangle': -90, 'title': attrs['col_x'] if self.group_by is None else self.group_by},
+                                       yaxis = {'showgrid': True, 'showline': True, 'mirror': True, 'titlefont': {'size': 20}, 'tickfont': {'size': 16},
+                                                'title': label_y},
+                                       font = {'size': 28}, autosize = False, width = 900, height = 500, hovermode = 'x unified'))
+        # times in the session order of the chosen instrument
+        if self.group_by == 'Time':
+            figure.update_layout(xaxis = {'type': 'category', 'categoryorder': 'array', 'categoryarray': list(dict_x)})
+        return figure
+
+    def _plot_correlation(self):
+        '''
+        Function to plot the correlation matrix of the profiles of the instruments, ordered so that similar instruments are close.
+
+        Args: None.
+
+        Returns:
+            figure: Figure.
+        '''
+        df = self.df_correlation
+        figure = go.Figure(go.Heatmap(z = df.values, x = df.columns, y = df.index, zmin = -1, zmax = 1, colorscale = 'RdBu_r',
+                                      texttemplate = '%{z:.2f}', textfont = {'size': 10}, colorbar = {'title': 'Correlation'}))
+        figure.update_layout(go.Layout(margin = dict(l = 20, r = 20, t = 20, b = 20), template = 'simple_white',
+                                       xaxis = {'showline': True, 'mirror': True, 'tickfont': {'size': 14}, 'tickangle': -90},
+                                       yaxis = {'showline': True, 'mirror': True, 'tickfont': {'size': 14}, 'autorange': 'reversed'},
+                                       font = {'size': 28}, autosize = False, width = 900, height = 900))
+        return figure
+
     def _plot_time_1_metric(self, figure):
         '''
         Function to plot vertical lines corresponding to end of session and settlement (when available), together with rectangles indicating Asian,
@@ -947,29 +2211,47 @@ class Dashboard:
         Returns: None.
         '''
         df = self.df.copy()
+        # add a vertical line at the event, if sessions are aligned on it
+        if 'Minutes' in df.columns:
+            figure.add_vline(x = 0, line_width = 2, line_dash = 'dash', line_color = 'orange')
+            figure.add_annotation(x = 0, y = df['Metric'].max() - 0.15*(df['Metric'].max() - df['Metric'].min()), text = self._get_event_label(),
+                                  font = {'size': 14, 'color': 'orange'}, textangle = -90, xshift = 0)
         # add vertical lines i `Time` is a column of `df`
         if 'Time' in df.columns:
-            if ((self._plot_trading_sessions == 'Yes') and (dashboard.filter_time[0] == dashboard.sess_start) and
-                (dashboard.filter_time[1] == dashboard.sess_end)):
+            if ((self._plot_trading_sessions == 'Yes') and (self.filter_time[0] == self.sess_start) and
+                (self.filter_time[1] == self.sess_end)):
                 figure = self._plot_rect_session_1_metric(figure)
-            if (self._plot_rth == 'Yes') and (dashboard.filter_time[0] == dashboard.sess_start) and (dashboard.filter_time[1] == dashboard.sess_end):
+            if (self._plot_rth == 'Yes') and (self.filter_time[0] == self.sess_start) and (self.filter_time[1] == self.sess_end):
                 figure = self._plot_rect_rth_1_metric(figure)
             #
-            if (dashboard.filter_time[0] == dashboard.sess_start) and (dashboard.filter_time[1] == dashboard.sess_end):
+            if (self.filter_time[0] == self.sess_start) and (self.filter_time[1] == self.sess_end):
                 df_temp = pd.DataFrame({'sess_end': [self.sess_end], 'label': ['End of session'],
                                         'y': [df['Metric'].max() - 0.12*(df['Metric'].max() - df['Metric'].min())]})
                 figure.add_vline(x = self.sess_end, line_width = 2, line_dash = 'dash', line_color = 'cyan')
                 figure.add_annotation(x = self.sess_end, y = df_temp['y'].values[0], text = 'End session', font = {'size': 14, 'color': 'cyan'},
                                     textangle = -90, xshift = 20)
-            if ((self.instrument in self.dict_settlement_hour.keys()) and (dashboard.filter_time[0] == dashboard.sess_start) and
-                (dashboard.filter_time[1] == dashboard.sess_end)):
-                df_temp = pd.DataFrame({'settlement': [self.dict_settlement_hour[self.instrument]], 'label': ['Settlement time'],
+            if ((self.session.settlement is not None) and (self.filter_time[0] == self.sess_start) and
+                (self.filter_time[1] == self.sess_end)):
+                df_temp = pd.DataFrame({'settlement': [self.session.settlement], 'label': ['Settlement time'],
                                         'y': [df['Metric'].max() - 0.15*(df['Metric'].max() - df['Metric'].min())]})
-                figure.add_vline(x = self.dict_settlement_hour[self.instrument], line_width = 2, line_dash = 'dash', line_color = 'orange')
-                figure.add_annotation(x = self.dict_settlement_hour[self.instrument], y = df_temp['y'].values[0], text = 'Settlement',
+                figure.add_vline(x = self.session.settlement, line_width = 2, line_dash = 'dash', line_color = 'orange')
+                figure.add_annotation(x = self.session.settlement, y = df_temp['y'].values[0], text = 'Settlement',
                                       font = {'size': 14, 'color': 'orange'}, textangle = -90, xshift = 0)
         return figure
     
+    def _get_event_label(self):
+        '''
+        Function to get the label of the event on which sessions are aligned, with its time.
+
+        Args: None.
+
+        Returns:
+            label: Label.
+        '''
+        anchor, time_custom = self.event[:2]
+        minutes = event_study.get_anchor_minutes(self.session, anchor, time_custom)
+        return session_registry.to_time(minutes) if anchor == 'Custom time' else f'{anchor} ({session_registry.to_time(minutes)})'
+
     def _plot_rect_session_1_metric(self, figure):
         '''
         Function to plot rectangles indicating Asian, European and American trading sessions. It is called by the function `_plot_time_1_metric`.
@@ -980,36 +2262,7 @@ class Dashboard:
         Returns: None.
         '''
         df = self.df.copy()
-        #
-        start_sess = self.dict_sess[dashboard.instrument][0]
-        if start_sess == '17:00:00':
-            figure.add_vrect(x0 = df.loc[np.where(df['Time'] >= pd.to_datetime('17:00:00').time())[0].min(), 'Time'], x1 = '00:00:00', fillcolor = 'yellow',
-                             opacity = 0.15, line_width = 0)
-            figure.add_vrect(x0 = '00:00:00', x1 = '01:00:00', fillcolor = 'yellow', opacity = 0.15, line_width = 0)
-            figure.add_annotation(x = '21:00:00', y = df['Metric'].min()*1.1, text = 'Asia', font = {'size': 18, 'color': 'white'}, yanchor = 'top')
-            figure.add_vrect(x0 = '01:00:00', x1 = '08:00:00', fillcolor = 'red', opacity = 0.15, line_width = 0)
-            figure.add_annotation(x = '04:30:00', y = df['Metric'].min()*1.1, text = 'Europe', font = {'size': 18, 'color': 'white'}, yanchor = 'top')
-            figure.add_vrect(x0 = '08:00:00', x1 = '16:00:00', fillcolor = 'blue', opacity = 0.15, line_width = 0)
-            figure.add_annotation(x = '12:00:00', y = df['Metric'].min()*1.1, text = 'US', font = {'size': 18, 'color': 'white'}, yanchor = 'top')
-        if start_sess == '18:00:00':
-            figure.add_vrect(x0 = df.loc[np.where(df['Time'] >= pd.to_datetime('18:00:00').time())[0].min(), 'Time'], x1 = '00:00:00', fillcolor = 'yellow',
-                             opacity = 0.15, line_width = 0)
-            figure.add_vrect(x0 = '00:00:00', x1 = '02:00:00', fillcolor = 'yellow', opacity = 0.15, line_width = 0)
-            figure.add_annotation(x = '22:00:00', y = df['Metric'].min()*1.1, text = 'Asia', font = {'size': 18, 'color': 'white'}, yanchor = 'top')
-            figure.add_vrect(x0 = '02:00:00', x1 = '09:00:00', fillcolor = 'red', opacity = 0.15, line_width = 0)
-            figure.add_annotation(x = '05:30:00', y = df['Metric'].min()*1.1, text = 'Europe', font = {'size': 18, 'color': 'white'}, yanchor = 'top')
-            figure.add_vrect(x0 = '09:00:00', x1 = '17:00:00', fillcolor = 'blue', opacity = 0.15, line_width = 0)
-            figure.add_annotation(x = '13:00:00', y = df['Metric'].min()*1.1, text = 'US', font = {'size': 18, 'color': 'white'}, yanchor = 'top')
-        if dashboard.instrument == 'FDAX':
-            figure.add_vrect(x0 = df.loc[max(np.where(df['Time'] >= pd.to_datetime('01:10:00').time())[0].min() - 1, 0), 'Time'],
-                             x1 = df.loc[np.where(df['Time'] <= pd.to_datetime('08:00:00').time())[0].max(), 'Time'], fillcolor = 'yellow', opacity = 0.15,
-                             line_width = 0)
-            figure.add_annotation(x = '04:30:00', y = df['Metric'].min()*1.1, text = 'Asia', font = {'size': 18, 'color': 'white'}, yanchor = 'top')
-            figure.add_vrect(x0 = '08:00:00', x1 = '15:00:00', fillcolor = 'red', opacity = 0.15, line_width = 0)
-            figure.add_annotation(x = '11:30:00', y = df['Metric'].min()*1.1, text = 'Europe', font = {'size': 18, 'color': 'white'}, yanchor = 'top')
-            figure.add_vrect(x0 = '15:00:00', x1 = '22:00:00', fillcolor = 'blue', opacity = 0.15, line_width = 0)
-            figure.add_annotation(x = '19:00:00', y = df['Metric'].min()*1.1, text = 'US', font = {'size': 18, 'color': 'white'}, yanchor = 'top')
-        return figure
+        return self._add_session_regions(figure, df['Time'], df['Metric'].min())
     
     def _plot_rect_rth_1_metric(self, figure):
         '''
@@ -1021,59 +2274,171 @@ class Dashboard:
         Returns: None.
         '''
         df = self.df.copy()
-        first_time = self.dict_rth[self.instrument][0]
-        second_time = self.dict_rth[self.instrument][1]
-        #
-        first_time_conv = datetime.datetime.strptime(first_time, '%H:%M:%S')
-        second_time_conv = datetime.datetime.strptime(second_time, '%H:%M:%S')
-        #
-        figure.add_vrect(x0 = first_time, x1 = second_time, fillcolor = 'orange', opacity = 0.15, line_width = 0)
-        figure.add_annotation(x = (first_time_conv + (second_time_conv - first_time_conv)/2).strftime('%H:%M:%S'), y = df['Metric'].min()*1.1,
-                              text = 'Regular trading hours', font = {'size': 17, 'color': 'white'}, yanchor = 'top')
-        return figure
+        return self._add_rth(figure, df['Time'], df['Metric'].min())
     
+    def _add_session_regions(self, figure, times, value_min, **kwargs):
+        '''
+        Function to plot the rectangles of the regions of the session of the instrument (e.g., Asian, European and American trading sessions).
+
+        Args:
+            figure: Figure built by the function `_plot`.
+            times: Times on the x-axis.
+            value_min: Lowest value on the y-axis, used to place labels.
+            kwargs: Subplot of the rectangles (`row` and `col`), if any.
+
+        Returns:
+            figure: Figure with the rectangles.
+        '''
+        for label, color, minutes_start, minutes_end, minutes_label in self.session.regions:
+            figure.add_vrect(x0 = self._snap_time(times, minutes_start), x1 = self._snap_time(times, minutes_end), fillcolor = color, opacity = 0.15,
+                             line_width = 0, **kwargs)
+            figure.add_annotation(x = self._snap_time(times, minutes_label), y = value_min*1.1, text = label, font = {'size': 18, 'color': 'white'},
+                                  yanchor = 'top', **kwargs)
+        return figure
+
+    def _add_rth(self, figure, times, value_min, **kwargs):
+        '''
+        Function to plot the rectangle of the regular trading hours of the instrument.
+
+        Args:
+            figure: Figure built by the function `_plot`.
+            times: Times on the x-axis.
+            value_min: Lowest value on the y-axis, used to place the label.
+            kwargs: Subplot of the rectangle (`row` and `col`), if any.
+
+        Returns:
+            figure: Figure with the rectangle.
+        '''
+        figure.add_vrect(x0 = self.session.rth[0], x1 = self.session.rth[1], fillcolor = 'orange', opacity = 0.15, line_width = 0, **kwargs)
+        figure.add_annotation(x = session_registry.to_time(self.session.rth_middle), y = value_min*1.1, text = 'Regular trading hours',
+                              font = {'size': 17, 'color': 'white'}, yanchor = 'top', **kwargs)
+        return figure
+
+    def _snap_time(self, times, minutes):
+        '''
+        Function to get the time of the last bar beginning at or before a time of the session (the first bar if there is none), so that shapes
+        are placed on existing categories of the x-axis.
+
+        Args:
+            times: Times of the bars (instances of `datetime.time`).
+            minutes: Time, as minutes after midnight.
+
+        Returns:
+            time: Time of the bar.
+        '''
+        times = np.asarray(times)
+        position = self.session.get_position(np.array([i.hour*60 + i.minute for i in times]))
+        before = np.flatnonzero(position <= self.session.get_position(minutes))
+        if before.shape[0] == 0:
+            return times[position.argmin()]
+        return times[before[position[before].argmax()]]
+
+    def _plot_live(self, figure):
+        '''
+        Function to show the chart with the current session overlaid, refreshing it every `live_refresh` seconds: at each refresh, only the bars
+        appended to the live feed are read and added to the session state, while the historical profile is not recomputed.
+
+        Args:
+            figure: Figure built by the function `_plot_1_metric` (and `_plot_time_1_metric`).
+
+        Returns: None.
+        '''
+        feed = BarFeed(self.live_feed)
+        live = LiveSession(self.sess_start, self.timeframe, self.metric, self.unit)
+        col_live = 'cumsum' if self.group_function == 'Cumsum' else 'metric'
+        time_start = pd.to_datetime(self.filter_time[0]).time()
+        time_end = pd.to_datetime(self.filter_time[1]).time()
+        #
+        @st.experimental_fragment(run_every = self.live_refresh)
+        def _refresh():
+            live.update(feed.read_new())
+            df_live = live.to_frame()
+            if time_start < time_end:
+                df_live = df_live[(df_live['time'] >= time_start) & (df_live['time'] <= time_end)]
+            else:
+                df_live = df_live[(df_live['time'] >= time_start) | (df_live['time'] <= time_end)]
+            #
+            figure_live = go.Figure(figure)
+            figure_live.add_trace(go.Scatter(x = df_live['time'], y = df_live[col_live], mode = 'lines', name = 'Live session',
+                                             line = {'color': 'white', 'width': 3}))
+            st.plotly_chart(figure_live)
+            if df_live.shape[0] > 0:
+                st.write(f'Live session: last bar at {df_live["date"].iloc[-1]}.')
+        _refresh()
+
     def _plot_tops_bottoms(self):
         '''
-        Function to plot the highest and lowest values of the chosen metric.
+        Function to plot the highest and lowest values of the chosen metric, for each breakdown.
 
         Args: None.
 
         Returns: None.
         '''
-        df = self.df.copy()
-        df = df.sort_values(by = 'Metric', ascending = False).reset_index(drop = True)
-        #
-        color_top, color_bottom = 'blue', 'red'
-        df_top = df.iloc[:15]
-        df_bottom = df.iloc[-15:]
-        if self.metric in ['Close', 'Body', 'Range', 'Num highs', 'Num lows', 'Num highs or lows', 'Volume']:
-            df_bottom = df.iloc[15:30]
-            color_bottom = 'blue'
-        #
-        df_top = df_top.iloc[::-1]
-        df_bottom = df_bottom.iloc[::-1]
+        df = self.df
+        k = self.n_tops
+        values = df['Metric'].values.astype(float)
+        # for metrics which are non-negative, the lowest values are not meaningful, so twice as many highest values are plotted
+        only_top = self.metric in ['Close', 'Body', 'Range', 'Num highs', 'Num lows', 'Num highs or lows', 'Volume']
+        if self.col_color is None:
+            codes, breakdowns = np.zeros(df.shape[0], dtype = int), [None]
+        else:
+            codes, breakdowns = pd.factorize(df[self.col_color])
+        list_top, list_bottom = ranking.top_bottom_k(values, codes, 2*k if only_top else k)
         # number of digits to use
-        n_digits = 0
-        if np.diff(df['Metric'].drop_duplicates().sort_values().values[:2])[0] > 0:
-            n_digits = len(decimal.Decimal(round(1/np.diff(df['Metric'].drop_duplicates().sort_values().values[:2])[0])).as_tuple().digits)
+        n_digits = self._get_n_digits(values)
         #
         label_x = self.metric
         if label_x in ['Close', 'Delta close', 'Body', 'Range', 'Open-high', 'Open-low']:
             label_x += f' [{self.unit}]'
         #
         figure = go.Figure()
-        figure.update_layout(go.Layout(margin = dict(l = 20, r = 20, t = 20, b = 20), template = 'simple_white', showlegend = False,
+        n_bars = 0
+        list_colors = plotly.colors.qualitative.Plotly
+        for i, breakdown in enumerate(breakdowns):
+            # bars are drawn from the bottom: lowest values first, then highest ones in ascending order
+            if only_top:
+                list_rows = [(list_top[i][::-1], 1)]
+            else:
+                list_rows = [(list_bottom[i], 0.5 if breakdown is not None else 1), (list_top[i][::-1], 1)]
+            for j, (rows, opacity) in enumerate(list_rows):
+                labels = df[self.col_x].values[rows].astype(str)
+                if breakdown is None:
+                    color = 'blue' if (only_top or (j == 1)) else 'red'
+                else:
+                    color = list_colors[i%len(list_colors)]
+                    labels = np.char.add(f'{breakdown} | ', labels)
+                figure.add_trace(go.Bar(x = values[rows], y = labels, marker_color = color, opacity = opacity, orientation = 'h',
+                                        name = f'{breakdown}', legendgroup = f'{breakdown}', showlegend = (breakdown is not None) and (j == 0)))
+                n_bars += rows.shape[0]
+        figure.update_layout(go.Layout(margin = dict(l = 20, r = 20, t = 20, b = 20), template = 'simple_white', showlegend = self.col_color is not None,
                                        xaxis = {'showgrid': True, 'showline': True, 'mirror': True, 'titlefont': {'size': 20}, 'tickfont': {'size': 12},
                                                 'tickformat': f'.{n_digits}f', 'title': label_x},
                                        yaxis = {'showgrid': True, 'showline': True, 'mirror': True, 'titlefont': {'size': 20}, 'tickfont': {'size': 12},
                                                 'title': self.col_x},
-                                       font = {'size': 28}, autosize = False, width = 900, height = 550))
-        #
-        figure.add_trace(go.Bar(x = df_bottom['Metric'], y = df_bottom[self.col_x], marker_color = color_bottom, orientation = 'h'))
-        figure.add_trace(go.Bar(x = df_top['Metric'], y = df_top[self.col_x], marker_color = color_top, orientation = 'h'))
+                                       font = {'size': 28}, autosize = False, width = 900, height = max(550, 18*n_bars + 100)))
         #
         return figure
 
+    def _get_n_digits(self, values):
+        '''
+        Function to get the number of decimal digits to show, from the difference between the two lowest distinct values (in two linear passes,
+        without sorting).
+
+        Args:
+            values: Array of values.
+
+        Returns:
+            n_digits: Number of digits.
+        '''
+        values = values[~np.isnan(values)]
+        if values.shape[0] == 0:
+            return 0
+        value_min = values.min()
+        values = values[values > value_min]
+        if values.shape[0] == 0:
+            return 0
+        return len(decimal.Decimal(round(1/(values.min() - value_min))).as_tuple().digits)
+
     def _plot_2_metrics(self):
         '''
         Function to plot the main chart.
@@ -1096,9 +2461,9 @@ class Dashboard:
         if label_y_2 in ['Close', 'Delta close', 'Body', 'Range', 'Open-high', 'Open-low']:
             label_y_2 += f' [{self.unit}]'
         # shift time back to original values: this way, the first row corresponds to session start
-        if dashboard.col_x == 'Time':
+        if self.col_x == 'Time':
             df['Time'] = (pd.to_datetime('2000-01-01 ' + df['Time']) +
-                          pd.Timedelta(eval(self.sess_start.split(':')[0].lstrip('0')), unit = 'h')).dt.time
+                          pd.Timedelta(self.session.minutes_shift, unit = 'min')).dt.time
         #
         figure = go.Figure()
         figure = make_subplots(rows = 2, cols = 1, shared_xaxes = True)
@@ -1113,29 +2478,29 @@ class Dashboard:
                                                  'tickformat': f'.{n_digits_2}f', 'title': label_y_2},
                                        font = {'size': 28}, autosize = False, width = 900, height = 500))
         #
-        if dashboard.plot_type == 'Lines':
-            if dashboard.col_color is None:
-                figure.add_trace(go.Scatter(x = df[dashboard.col_x], y = df['Metric_1'], mode = 'lines'), row = 1, col = 1)
-                figure.add_trace(go.Scatter(x = df[dashboard.col_x], y = df['Metric_2'], mode = 'lines'), row = 2, col = 1)
+        if self.plot_type == 'Lines':
+            if self.col_color is None:
+                figure.add_trace(go.Scatter(x = df[self.col_x], y = df['Metric_1'], mode = 'lines'), row = 1, col = 1)
+                figure.add_trace(go.Scatter(x = df[self.col_x], y = df['Metric_2'], mode = 'lines'), row = 2, col = 1)
             else:
-                for breakdown in df[dashboard.col_color].unique():
-                    figure.add_trace(go.Scatter(x = df.loc[df[dashboard.col_color] == breakdown, dashboard.col_x],
-                                                y = df.loc[df[dashboard.col_color] == breakdown, 'Metric_1'],
+                for breakdown in df[self.col_color].unique():
+                    figure.add_trace(go.Scatter(x = df.loc[df[self.col_color] == breakdown, self.col_x],
+                                                y = df.loc[df[self.col_color] == breakdown, 'Metric_1'],
                                                 name = f'{breakdown}', mode = 'lines'), row = 1, col = 1)
-                    figure.add_trace(go.Scatter(x = df.loc[df[dashboard.col_color] == breakdown, dashboard.col_x],
-                                                y = df.loc[df[dashboard.col_color] == breakdown, 'Metric_2'],
+                    figure.add_trace(go.Scatter(x = df.loc[df[self.col_color] == breakdown, self.col_x],
+                                                y = df.loc[df[self.col_color] == breakdown, 'Metric_2'],
                                                 name = f'{breakdown}', mode = 'lines'), row = 2, col = 1)
-        elif dashboard.plot_type == 'Bars':
-            if dashboard.col_color is None:
-                figure.add_trace(go.Bar(x = df[dashboard.col_x], y = df['Metric_1'], width = 0.5, offset = -0.5), row = 1, col = 1)
-                figure.add_trace(go.Bar(x = df[dashboard.col_x], y = df['Metric_2'], width = 0.5, offset = -0.5), row = 2, col = 1)
+        elif self.plot_type == 'Bars':
+            if self.col_color is None:
+                figure.add_trace(go.Bar(x = df[self.col_x], y = df['Metric_1'], width = 0.5, offset = -0.5), row = 1, col = 1)
+                figure.add_trace(go.Bar(x = df[self.col_x], y = df['Metric_2'], width = 0.5, offset = -0.5), row = 2, col = 1)
             else:
-                for breakdown in df[dashboard.col_color].unique():
-                    figure.add_trace(go.Bar(x = df.loc[df[dashboard.col_color] == breakdown, dashboard.col_x],
-                                                y = df.loc[df[dashboard.col_color] == breakdown, 'Metric_1'],
+                for breakdown in df[self.col_color].unique():
+                    figure.add_trace(go.Bar(x = df.loc[df[self.col_color] == breakdown, self.col_x],
+                                                y = df.loc[df[self.col_color] == breakdown, 'Metric_1'],
                                                 name = f'{breakdown}', width = 0.5, offset = -0.5), row = 1, col = 1)
-                    figure.add_trace(go.Bar(x = df.loc[df[dashboard.col_color] == breakdown, dashboard.col_x],
-                                                y = df.loc[df[dashboard.col_color] == breakdown, 'Metric_2'],
+                    figure.add_trace(go.Bar(x = df.loc[df[self.col_color] == breakdown, self.col_x],
+                                                y = df.loc[df[self.col_color] == breakdown, 'Metric_2'],
                                                 name = f'{breakdown}', width = 0.5, offset = -0.5), row = 2, col = 1)
         self.df = df
         return figure
@@ -1151,14 +2516,21 @@ class Dashboard:
         Returns: None.
         '''
         df = self.df.copy()
+        # add a vertical line at the event, if sessions are aligned on it
+        if 'Minutes' in df.columns:
+            for row in [1, 2]:
+                figure.add_vline(x = 0, line_width = 2, line_dash = 'dash', line_color = 'orange', row = row, col = 1)
+                figure.add_annotation(x = 0, y = df[f'Metric_{row}'].max() - 0.15*(df[f'Metric_{row}'].max() - df[f'Metric_{row}'].min()),
+                                      text = self._get_event_label(), font = {'size': 14, 'color': 'orange'}, textangle = -90, xshift = 0,
+                                      row = row, col = 1)
         # add vertical lines i `Time` is a column of `df`
         if 'Time' in df.columns:
-            if (self._plot_trading_sessions == 'Yes') and (dashboard.filter_time[0] == dashboard.sess_start) and (dashboard.filter_time[1] == dashboard.sess_end):
+            if (self._plot_trading_sessions == 'Yes') and (self.filter_time[0] == self.sess_start) and (self.filter_time[1] == self.sess_end):
                 figure = self._plot_rect_session_2_metrics(figure)
-            if (self._plot_rth == 'Yes') and (dashboard.filter_time[0] == dashboard.sess_start) and (dashboard.filter_time[1] == dashboard.sess_end):
+            if (self._plot_rth == 'Yes') and (self.filter_time[0] == self.sess_start) and (self.filter_time[1] == self.sess_end):
                 figure = self._plot_rect_rth_2_metrics(figure)
             #
-            if (dashboard.filter_time[0] == dashboard.sess_start) and (dashboard.filter_time[1] == dashboard.sess_end):
+            if (self.filter_time[0] == self.sess_start) and (self.filter_time[1] == self.sess_end):
                 df_temp = pd.DataFrame({'sess_end': [self.sess_end], 'label': ['End of session'],
                                         'y': [df['Metric_1'].max() - 0.12*(df['Metric_1'].max() - df['Metric_1'].min())]})
                 figure.add_vline(x = self.sess_end, line_width = 2, line_dash = 'dash', line_color = 'cyan', row = 1, col = 1)
@@ -1169,17 +2541,17 @@ class Dashboard:
                 figure.add_vline(x = self.sess_end, line_width = 2, line_dash = 'dash', line_color = 'cyan', row = 2, col = 1)
                 figure.add_annotation(x = self.sess_end, y = df_temp['y'].values[0], text = 'End session', font = {'size': 14, 'color': 'cyan'},
                                     textangle = -90, xshift = 20, row = 2, col = 1)
-            if ((self.instrument in self.dict_settlement_hour.keys()) and (dashboard.filter_time[0] == dashboard.sess_start) and
-                (dashboard.filter_time[1] == dashboard.sess_end)):
-                df_temp = pd.DataFrame({'settlement': [self.dict_settlement_hour[self.instrument]], 'label': ['Settlement time'],
+            if ((self.session.settlement is not None) and (self.filter_time[0] == self.sess_start) and
+                (self.filter_time[1] == self.sess_end)):
+                df_temp = pd.DataFrame({'settlement': [self.session.settlement], 'label': ['Settlement time'],
                                         'y': [df['Metric_1'].max() - 0.15*(df['Metric_1'].max() - df['Metric_1'].min())]})
-                figure.add_vline(x = self.dict_settlement_hour[self.instrument], line_width = 2, line_dash = 'dash', line_color = 'orange', row = 1, col = 1)
-                figure.add_annotation(x = self.dict_settlement_hour[self.instrument], y = df_temp['y'].values[0], text = 'Settlement',
+                figure.add_vline(x = self.session.settlement, line_width = 2, line_dash = 'dash', line_color = 'orange', row = 1, col = 1)
+                figure.add_annotation(x = self.session.settlement, y = df_temp['y'].values[0], text = 'Settlement',
                                       font = {'size': 14, 'color': 'orange'}, textangle = -90, xshift = 0, row = 1, col = 1)
-                df_temp = pd.DataFrame({'settlement': [self.dict_settlement_hour[self.instrument]], 'label': ['Settlement time'],
+                df_temp = pd.DataFrame({'settlement': [self.session.settlement], 'label': ['Settlement time'],
                                         'y': [df['Metric_2'].max() - 0.15*(df['Metric_2'].max() - df['Metric_2'].min())]})
-                figure.add_vline(x = self.dict_settlement_hour[self.instrument], line_width = 2, line_dash = 'dash', line_color = 'orange', row = 2, col = 1)
-                figure.add_annotation(x = self.dict_settlement_hour[self.instrument], y = df_temp['y'].values[0], text = 'Settlement',
+                figure.add_vline(x = self.session.settlement, line_width = 2, line_dash = 'dash', line_color = 'orange', row = 2, col = 1)
+                figure.add_annotation(x = self.session.settlement, y = df_temp['y'].values[0], text = 'Settlement',
                                       font = {'size': 14, 'color': 'orange'}, textangle = -90, xshift = 0, row = 2, col = 1)
         return figure
     
@@ -1193,80 +2565,8 @@ class Dashboard:
         Returns: None.
         '''
         df = self.df.copy()
-        #
-        start_sess = self.dict_sess[dashboard.instrument][0]
-        if start_sess == '17:00:00':
-            figure.add_vrect(x0 = df.loc[np.where(df['Time'] >= pd.to_datetime('17:00:00').time())[0].min(), 'Time'], x1 = '00:00:00', fillcolor = 'yellow',
-                             opacity = 0.15, line_width = 0, row = 1, col = 1)
-            figure.add_vrect(x0 = '00:00:00', x1 = '01:00:00', fillcolor = 'yellow', opacity = 0.15, line_width = 0, row = 1, col = 1)
-            figure.add_annotation(x = '21:00:00', y = df['Metric_1'].min()*1.1, text = 'Asia', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 1, col = 1)
-            figure.add_vrect(x0 = '01:00:00', x1 = '08:00:00', fillcolor = 'red', opacity = 0.15, line_width = 0, row = 1, col = 1)
-            figure.add_annotation(x = '04:30:00', y = df['Metric_1'].min()*1.1, text = 'Europe', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 1, col = 1)
-            figure.add_vrect(x0 = '08:00:00', x1 = '16:00:00', fillcolor = 'blue', opacity = 0.15, line_width = 0, row = 1, col = 1)
-            figure.add_annotation(x = '12:00:00', y = df['Metric_1'].min()*1.1, text = 'US', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 1, col = 1)
-            #
-            figure.add_vrect(x0 = df.loc[np.where(df['Time'] >= pd.to_datetime('17:00:00').time())[0].min(), 'Time'], x1 = '00:00:00', fillcolor = 'yellow',
-                             opacity = 0.15, line_width = 0, row = 2, col = 1)
-            figure.add_vrect(x0 = '00:00:00', x1 = '01:00:00', fillcolor = 'yellow', opacity = 0.15, line_width = 0, row = 2, col = 1)
-            figure.add_annotation(x = '21:00:00', y = df['Metric_2'].min()*1.1, text = 'Asia', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 2, col = 1)
-            figure.add_vrect(x0 = '01:00:00', x1 = '08:00:00', fillcolor = 'red', opacity = 0.15, line_width = 0, row = 2, col = 1)
-            figure.add_annotation(x = '04:30:00', y = df['Metric_2'].min()*1.1, text = 'Europe', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 2, col = 1)
-            figure.add_vrect(x0 = '08:00:00', x1 = '16:00:00', fillcolor = 'blue', opacity = 0.15, line_width = 0, row = 2, col = 1)
-            figure.add_annotation(x = '12:00:00', y = df['Metric_2'].min()*1.1, text = 'US', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 2, col = 1)
-        if start_sess == '18:00:00':
-            figure.add_vrect(x0 = df.loc[np.where(df['Time'] >= pd.to_datetime('18:00:00').time())[0].min(), 'Time'], x1 = '00:00:00', fillcolor = 'yellow',
-                             opacity = 0.15, line_width = 0, row = 1, col = 1)
-            figure.add_vrect(x0 = '00:00:00', x1 = '02:00:00', fillcolor = 'yellow', opacity = 0.15, line_width = 0, row = 1, col = 1)
-            figure.add_annotation(x = '22:00:00', y = df['Metric_1'].min()*1.1, text = 'Asia', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 1, col = 1)
-            figure.add_vrect(x0 = '02:00:00', x1 = '09:00:00', fillcolor = 'red', opacity = 0.15, line_width = 0, row = 1, col = 1)
-            figure.add_annotation(x = '05:30:00', y = df['Metric_1'].min()*1.1, text = 'Europe', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 1, col = 1)
-            figure.add_vrect(x0 = '09:00:00', x1 = '17:00:00', fillcolor = 'blue', opacity = 0.15, line_width = 0, row = 1, col = 1)
-            figure.add_annotation(x = '13:00:00', y = df['Metric_1'].min()*1.1, text = 'US', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 1, col = 1)
-            #
-            figure.add_vrect(x0 = df.loc[np.where(df['Time'] >= pd.to_datetime('18:00:00').time())[0].min(), 'Time'], x1 = '00:00:00', fillcolor = 'yellow',
-                             opacity = 0.15, line_width = 0, row = 2, col = 1)
-            figure.add_vrect(x0 = '00:00:00', x1 = '02:00:00', fillcolor = 'yellow', opacity = 0.15, line_width = 0, row = 2, col = 1)
-            figure.add_annotation(x = '22:00:00', y = df['Metric_2'].min()*1.1, text = 'Asia', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 2, col = 1)
-            figure.add_vrect(x0 = '02:00:00', x1 = '09:00:00', fillcolor = 'red', opacity = 0.15, line_width = 0, row = 2, col = 1)
-            figure.add_annotation(x = '05:30:00', y = df['Metric_2'].min()*1.1, text = 'Europe', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 2, col = 1)
-            figure.add_vrect(x0 = '09:00:00', x1 = '17:00:00', fillcolor = 'blue', opacity = 0.15, line_width = 0, row = 2, col = 1)
-            figure.add_annotation(x = '13:00:00', y = df['Metric_2'].min()*1.1, text = 'US', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 2, col = 1)
-        if dashboard.instrument == 'FDAX':
-            figure.add_vrect(x0 = df.loc[max(np.where(df['Time'] >= pd.to_datetime('01:10:00').time())[0].min() - 1, 0), 'Time'],
-                             x1 = df.loc[np.where(df['Time'] <= pd.to_datetime('08:00:00').time())[0].max(), 'Time'], fillcolor = 'yellow', opacity = 0.15,
-                             line_width = 0, row = 1, col = 1)
-            figure.add_annotation(x = '04:30:00', y = df['Metric_1'].min()*1.1, text = 'Asia', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 1, col = 1)
-            figure.add_vrect(x0 = '08:00:00', x1 = '15:00:00', fillcolor = 'red', opacity = 0.15, line_width = 0, row = 1, col = 1)
-            figure.add_annotation(x = '11:30:00', y = df['Metric_1'].min()*1.1, text = 'Europe', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 1, col = 1)
-            figure.add_vrect(x0 = '15:00:00', x1 = '22:00:00', fillcolor = 'blue', opacity = 0.15, line_width = 0, row = 1, col = 1)
-            figure.add_annotation(x = '19:00:00', y = df['Metric_1'].min()*1.1, text = 'US', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 1, col = 1)
-            #
-            figure.add_vrect(x0 = df.loc[max(np.where(df['Time'] >= pd.to_datetime('01:10:00').time())[0].min() - 1, 0), 'Time'],
-                             x1 = df.loc[np.where(df['Time'] <= pd.to_datetime('08:00:00').time())[0].max(), 'Time'], fillcolor = 'yellow', opacity = 0.15,
-                             line_width = 0, row = 2, col = 1)
-            figure.add_annotation(x = '04:30:00', y = df['Metric_2'].min()*1.1, text = 'Asia', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 2, col = 1)
-            figure.add_vrect(x0 = '08:00:00', x1 = '15:00:00', fillcolor = 'red', opacity = 0.15, line_width = 0, row = 2, col = 1)
-            figure.add_annotation(x = '11:30:00', y = df['Metric_2'].min()*1.1, text = 'Europe', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 2, col = 1)
-            figure.add_vrect(x0 = '15:00:00', x1 = '22:00:00', fillcolor = 'blue', opacity = 0.15, line_width = 0, row = 2, col = 1)
-            figure.add_annotation(x = '19:00:00', y = df['Metric_2'].min()*1.1, text = 'US', font = {'size': 18, 'color': 'white'}, yanchor = 'top',
-                                  row = 2, col = 1)
+        for row in [1, 2]:
+            figure = self._add_session_regions(figure, df['Time'], df[f'Metric_{row}'].min(), row = row, col = 1)
         return figure
     
     def _plot_rect_rth_2_metrics(self, figure):
@@ -1279,18 +2579,8 @@ class Dashboard:
         Returns: None.
         '''
         df = self.df.copy()
-        first_time = self.dict_rth[self.instrument][0]
-        second_time = self.dict_rth[self.instrument][1]
-        #
-        first_time_conv = datetime.datetime.strptime(first_time, '%H:%M:%S')
-        second_time_conv = datetime.datetime.strptime(second_time, '%H:%M:%S')
-        #
-        figure.add_vrect(x0 = first_time, x1 = second_time, fillcolor = 'orange', opacity = 0.15, line_width = 0, row = 1, col = 1)
-        figure.add_annotation(x = (first_time_conv + (second_time_conv - first_time_conv)/2).strftime('%H:%M:%S'), y = df['Metric_1'].min()*1.1,
-                              text = 'Regular trading hours', font = {'size': 17, 'color': 'white'}, yanchor = 'top', row = 1, col = 1)
-        figure.add_vrect(x0 = first_time, x1 = second_time, fillcolor = 'orange', opacity = 0.15, line_width = 0, row = 2, col = 1)
-        figure.add_annotation(x = (first_time_conv + (second_time_conv - first_time_conv)/2).strftime('%H:%M:%S'), y = df['Metric_2'].min()*1.1,
-                              text = 'Regular trading hours', font = {'size': 17, 'color': 'white'}, yanchor = 'top', row = 2, col = 1)
+        for row in [1, 2]:
+            figure = self._add_rth(figure, df['Time'], df[f'Metric_{row}'].min(), row = row, col = 1)
         return figure
 
 if __name__ == '__main__':
@@ -1306,38 +2596,31 @@ if __name__ == '__main__':
         #
         run = st.form_submit_button(label = 'Run')
     # run the dashboard
-    if run == True:
-        #
-        dashboard._filter_dates()
-        dashboard._filter_times()
-        dashboard._filter_month()
-        dashboard._filter_day_of_month()
-        dashboard._filter_day_of_week()
-        #
-        dashboard._group_to_timeframe()
-        #
-        dashboard._compute_metric()
-        dashboard._add_split_period()
-        dashboard._group_data()
-        #
-        dashboard._adjust_timeframe()
-        #
-        dashboard._fix_missing_dates()
-        #
-        df = dashboard.df
-        df.columns = df.columns.str.capitalize()
-        dashboard.col_x = dashboard.col_x.capitalize()
-        if dashboard.col_color is not None:
-            dashboard.col_color = dashboard.col_color.capitalize()
+    if (run == True) and (dashboard.session_conditions is None):
+        st.error('Conditions on sessions are not valid.')
+    elif run == True:
+        # comparison of instruments, computed concurrently
+        if len(dashboard.compare_instruments) > 0:
+            dashboard._compute_comparison()
+            st.plotly_chart(dashboard._plot_comparison())
+            st.stop()
+        # correlation between the profiles of all the instruments
+        if dashboard.correlation == 'Yes':
+            dashboard._compute_correlation()
+            st.plotly_chart(dashboard._plot_correlation())
+            st.stop()
+        # data is imported only when a request is run
+        dashboard._get_data()
+        # estimate the cost of the request and decide how to serve it
+        dashboard._plan_query()
+        if dashboard.plan['strategy'] == 'Refuse':
+            st.stop()
+        dashboard._compute()
+        if dashboard.zoom_window is not None:
+            dashboard._compute_zoom()
         # plot
-        if dashboard.n_metrics == 1:
-            if dashboard.plot_tops_bottoms == 'No':
-                figure = dashboard._plot_1_metric()
-                figure = dashboard._plot_time_1_metric(figure)
-            else:
-                figure = dashboard._plot_tops_bottoms()
+        figure = dashboard._plot()
+        if dashboard.live_mode == 'Yes':
+            dashboard._plot_live(figure)
         else:
-            figure = dashboard._plot_2_metrics()
-            figure = dashboard._plot_time_2_metrics(figure)
-        figure.update_layout(xaxis_rangeslider_visible = False)
-        st.plotly_chart(figure)
\ No newline at end of file
+            st.plotly_chart(figure)
\ No newline at end of file
@@ -0,0 +1,422 @@
+import numpy as np
+import pandas as pd
+import atexit
+import json
+import os
+import shutil
+import tempfile
+from time_index import TimeIndex, to_ns
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# decoded instruments attached by this process: {instrument: (version, df, index)}
+_attached = {}
+# metadata read by this process: {instrument: metadata}
+_metadata = {}
+
+def get_path_shared():
+    '''
+    Function to get the directory where decoded instruments are shared between processes. It is RAM-backed (`/dev/shm`) when available, and it
+    can be overridden with the `DASHBOARD_SHARED_DIR` environment variable.
+
+    Args: None.
+
+    Returns:
+        path_shared: Directory path.
+    '''
+    path_shared = os.environ.get('DASHBOARD_SHARED_DIR')
+    if path_shared is None:
+        path_root = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        path_shared = os.path.join(path_root, 'dashboard_instrument')
+    os.makedirs(path_shared, exist_ok = True)
+    return path_shared
+
+def get_data_file(instrument, path_data = './data'):
+    '''
+    Function to get the path of the data file of an instrument.
+
+    Args:
+        instrument: Instrument name.
+        path_data: Directory containing data files.
+
+    Returns:
+        path_file: File path.
+    '''
+    return os.path.join(path_data, f'data_{instrument}.pickle.gz')
+
+def get_path_updates(instrument, path_data = './data'):
+    '''
+    Function to get the directory containing the segments of bars appended to an instrument after its data file was written.
+
+    Args:
+        instrument: Instrument name.
+        path_data: Directory containing data files.
+
+    Returns:
+        path_updates: Directory path.
+    '''
+    return os.path.join(path_data, 'updates', instrument)
+
+def list_segments(instrument, path_data = './data'):
+    '''
+    Function to list the appended segments of an instrument, in order.
+
+    Args:
+        instrument: Instrument name.
+        path_data: Directory containing data files.
+
+    Returns:
+        list_paths: List of segment paths.
+    '''
+    path_updates = get_path_updates(instrument, path_data)
+    if not os.path.isdir(path_updates):
+        return []
+    return [os.path.join(path_updates, name) for name in sorted(os.listdir(path_updates))
+            if name.startswith('seg_') and name.endswith('.pickle')]
+
+def data_version(instrument, path_data = './data'):
+    '''
+    Function to get a version string of the data of an instrument, which changes whenever the data file is rewritten or a segment is appended.
+
+    Args:
+        instrument: Instrument name.
+        path_data: Directory containing data files.
+
+    Returns:
+        version: Version string.
+    '''
+    stat = os.stat(get_data_file(instrument, path_data))
+    return f'{stat.st_mtime_ns}-{stat.st_size}-{len(list_segments(instrument, path_data))}'
+
+def get_path_metadata(instrument, path_data = './data'):
+    '''
+    Function to get the path of the metadata file of an instrument.
+
+    Args:
+        instrument: Instrument name.
+        path_data: Directory containing data files.
+
+    Returns:
+        path_metadata: File path.
+    '''
+    return os.path.join(path_data, 'metadata', f'{instrument}.json')
+
+def compute_metadata(df, version):
+    '''
+    Function to compute the metadata of the decoded data of an instrument.
+
+    Args:
+        df: Decoded data (with session counter).
+        version: Version of the data.
+
+    Returns:
+        metadata: Dictionary with keys 'version', 'date_first', 'date_last', 'n_rows', 'n_sess'.
+    '''
+    metadata = {'version': version, 'date_first': None, 'date_last': None, 'n_rows': int(df.shape[0]),
+                'n_sess': int(np.unique(df['n_sess'].values).shape[0])}
+    if df.shape[0] > 0:
+        metadata['date_first'], metadata['date_last'] = [str(pd.Timestamp(df['date'].values[i])) for i in [0, -1]]
+    return metadata
+
+def read_metadata_file(instrument, path_data = './data'):
+    '''
+    Function to read the metadata file of an instrument, whatever its version, without decoding the data.
+
+    Args:
+        instrument: Instrument name.
+        path_data: Directory containing data files.
+
+    Returns:
+        metadata: Dictionary with keys 'version', 'date_first', 'date_last', 'n_rows', 'n_sess' (`None` if there is no metadata file).
+    '''
+    path_metadata = get_path_metadata(instrument, path_data)
+    if not os.path.isfile(path_metadata):
+        return None
+    with open(path_metadata) as file:
+        return json.load(file)
+
+def write_metadata(instrument, metadata, path_data = './data'):
+    '''
+    Function to write the metadata file of an instrument atomically. Metadata is a cache: if the data directory is read-only, nothing is written.
+
+    Args:
+        instrument: Instrument name.
+        metadata: Dictionary with keys 'version', 'date_first', 'date_last', 'n_rows', 'n_sess'.
+        path_data: Directory containing data files.
+
+    Returns: None.
+    '''
+    path_metadata = get_path_metadata(instrument, path_data)
+    try:
+        os.makedirs(os.path.dirname(path_metadata), exist_ok = True)
+        path_temp = f'{path_metadata}.tmp{os.getpid()}'
+        with open(path_temp, 'w') as file:
+            json.dump(metadata, file)
+        os.replace(path_temp, path_metadata)
+    except OSError:
+        pass
+
+def read_metadata(instrument, path_data = './data'):
+    '''
+    Function to get the metadata of an instrument (dates of the first and last bars, number of bars and of sessions), which is enough to build
+    the widgets of the dashboard. Metadata is written in a small JSON file by the ingestion of new bars (see `ingest.append_bars`), so that it is
+    read without decoding the data file; if the file is missing or older than the data (e.g., the data file was rewritten without the
+    ingestion), the data is decoded once and the file is written for the next readers (also in new server processes).
+
+    Args:
+        instrument: Instrument name.
+        path_data: Directory containing data files.
+
+    Returns:
+        metadata: Dictionary with keys 'version', 'date_first', 'date_last', 'n_rows', 'n_sess'.
+    '''
+    version = data_version(instrument, path_data)
+    if (instrument in _metadata) and (_metadata[instrument]['version'] == version):
+        return _metadata[instrument]
+    metadata = read_metadata_file(instrument, path_data)
+    if (metadata is None) or (metadata['version'] != version):
+        df, _ = attach(instrument, path_data)
+        metadata = compute_metadata(df, version)
+        write_metadata(instrument, metadata, path_data)
+    _metadata[instrument] = metadata
+    return metadata
+
+def read_instrument(instrument, path_data = './data'):
+    '''
+    Function to decode the data file of an instrument, add the session counter and append the segments added afterwards.
+
+    Args:
+        instrument: Instrument name.
+        path_data: Directory containing data files.
+
+    Returns:
+        df: Decoded data.
+    '''
+    df = pd.read_pickle(get_data_file(instrument, path_data))
+    df['date'] = pd.to_datetime(df['date'])
+    # add a session counter
+    df.loc[df['session_start'] == True, 'n_sess'] = range(df['session_start'].sum())
+    df['n_sess'] = df['n_sess'].ffill()
+    df = df[~df['n_sess'].isnull()].reset_index(drop = True)
+    # appended segments already contain the session counter
+    list_segments_instr = list_segments(instrument, path_data)
+    if len(list_segments_instr) > 0:
+        df = pd.concat([df] + [read_segment(path_segment, df.columns) for path_segment in list_segments_instr], ignore_index = True)
+    return df
+
+def read_segment(path_segment, columns):
+    '''
+    Function to read an appended segment, with the same columns (and dtypes) of the data it is appended to.
+
+    Args:
+        path_segment: Segment path.
+        columns: Columns of the data.
+
+    Returns:
+        df: Segment data.
+    '''
+    df = pd.read_pickle(path_segment)
+    df['date'] = pd.to_datetime(df['date'])
+    df['n_sess'] = df['n_sess'].astype(float)
+    return df[list(columns)]
+
+def attach(instrument, path_data = './data'):
+    '''
+    Function to get the decoded data of an instrument. The first process needing it decodes the data file and publishes each column as a
+    memory-mapped array in the shared directory; the other processes map the same arrays read-only, so that each instrument is held in memory
+    once, whatever the number of server processes. Every attaching process holds a reference, which is dropped by `release` (or at exit).
+
+    Args:
+        instrument: Instrument name.
+        path_data: Directory containing data files.
+
+    Returns:
+        df: Decoded data (read-only columns).
+        index: Instance of `TimeIndex` of `df`.
+    '''
+    version = data_version(instrument, path_data)
+    if (instrument in _attached) and (_attached[instrument][0] == version):
+        return _attached[instrument][1], _attached[instrument][2]
+    if instrument in _attached:
+        release(instrument)
+    #
+    path_shared = get_path_shared()
+    path_version = os.path.join(path_shared, f'{instrument}_{version}')
+    with _lock(path_shared, instrument):
+        if not os.path.isfile(os.path.join(path_version, 'columns.json')):
+            # if only segments were appended since a published version, only the new segments are decoded
+            path_previous = _find_previous_version(path_shared, instrument, version)
+            if path_previous is not None:
+                df_previous, _ = _map(path_previous)
+                list_segments_new = list_segments(instrument, path_data)[int(path_previous.rsplit('-', 1)[1]):]
+                df = pd.concat([df_previous] + [read_segment(path_segment, df_previous.columns) for path_segment in list_segments_new],
+                               ignore_index = True)
+            else:
+                df = read_instrument(instrument, path_data)
+            _publish(df, path_version)
+            # previous versions of the instrument, no longer referenced, are removed
+            for name in os.listdir(path_shared):
+                path_old = os.path.join(path_shared, name)
+                if (name.startswith(f'{instrument}_') and (path_old != path_version) and os.path.isdir(path_old) and
+                    (_count_references(path_old) == 0)):
+                    shutil.rmtree(path_old, ignore_errors = True)
+        open(os.path.join(path_version, 'refs', str(os.getpid())), 'w').close()
+    df, index = _map(path_version)
+    #
+    _attached[instrument] = (version, df, index)
+    return df, index
+
+def release(instrument):
+    '''
+    Function to drop the reference of this process to the shared data of an instrument. Data is removed when no process references it anymore.
+
+    Args:
+        instrument: Instrument name.
+
+    Returns: None.
+    '''
+    if instrument not in _attached:
+        return
+    version = _attached.pop(instrument)[0]
+    path_shared = get_path_shared()
+    path_version = os.path.join(path_shared, f'{instrument}_{version}')
+    with _lock(path_shared, instrument):
+        path_ref = os.path.join(path_version, 'refs', str(os.getpid()))
+        if os.path.isfile(path_ref):
+            os.remove(path_ref)
+        if os.path.isdir(path_version) and (_count_references(path_version) == 0):
+            shutil.rmtree(path_version, ignore_errors = True)
+
+def cleanup():
+    '''
+    Function to remove the shared data which is not referenced by any live process (e.g., left behind by crashed processes).
+
+    Args: None.
+
+    Returns:
+        removed: List of removed directories.
+    '''
+    path_shared = get_path_shared()
+    removed = []
+    for name in sorted(os.listdir(path_shared)):
+        path_version = os.path.join(path_shared, name)
+        if not os.path.isdir(path_version):
+            continue
+        with _lock(path_shared, name.rsplit('_', 1)[0]):
+            if _count_references(path_version) == 0:
+                shutil.rmtree(path_version, ignore_errors = True)
+                removed.append(path_version)
+    return removed
+
+def _find_previous_version(path_shared, instrument, version):
+    '''
+    Function to find the published version of an instrument with the same data file and the largest number of segments (smaller than the one of
+    `version`).
+    '''
+    version_file, n_segments = version.rsplit('-', 1)
+    path_previous = None
+    n_segments_previous = -1
+    for name in os.listdir(path_shared):
+        path_version = os.path.join(path_shared, name)
+        if ((not name.startswith(f'{instrument}_{version_file}-')) or ('.tmp' in name) or
+            (not os.path.isfile(os.path.join(path_version, 'columns.json')))):
+            continue
+        n_segments_version = int(name.rsplit('-', 1)[1])
+        if n_segments_previous < n_segments_version < int(n_segments):
+            path_previous = path_version
+            n_segments_previous = n_segments_version
+    return path_previous
+
+def _publish(df, path_version):
+    '''
+    Function to write the columns of `df`, and the offsets of its time index, as `.npy` files. Files are written in a temporary directory which is
+    then renamed, so that other processes never see partial data.
+    '''
+    path_temp = f'{path_version}.tmp{os.getpid()}'
+    os.makedirs(os.path.join(path_temp, 'refs'), exist_ok = True)
+    columns = {}
+    for col in df.columns:
+        values = df[col].values
+        if np.issubdtype(values.dtype, np.datetime64):
+            np.save(os.path.join(path_temp, f'{col}.npy'), to_ns(df[col]))
+            columns[col] = 'datetime64[ns]'
+        elif values.dtype.kind in 'biuf':
+            np.save(os.path.join(path_temp, f'{col}.npy'), np.ascontiguousarray(values))
+            columns[col] = values.dtype.str
+        # non-numeric columns cannot be mapped: they are pickled and decoded by each process
+        else:
+            df[[col]].to_pickle(os.path.join(path_temp, f'{col}.pickle'))
+            columns[col] = 'object'
+    index = TimeIndex.from_frame(df)
+    np.save(os.path.join(path_temp, '_day_offsets.npy'), index.day_offsets)
+    np.save(os.path.join(path_temp, '_sess_offsets.npy'), index.sess_offsets)
+    with open(os.path.join(path_temp, 'columns.json'), 'w') as file:
+        json.dump(columns, file)
+    if os.path.isdir(path_version):
+        shutil.rmtree(path_version, ignore_errors = True)
+    os.rename(path_temp, path_version)
+
+def _map(path_version):
+    '''
+    Function to map the published columns of an instrument read-only and build a frame on top of them, without copying.
+    '''
+    with open(os.path.join(path_version, 'columns.json')) as file:
+        columns = json.load(file)
+    dict_cols = {}
+    for col, dtype in columns.items():
+        if dtype == 'object':
+            dict_cols[col] = pd.read_pickle(os.path.join(path_version, f'{col}.pickle'))[col].values
+        elif dtype == 'datetime64[ns]':
+            dict_cols[col] = np.load(os.path.join(path_version, f'{col}.npy'), mmap_mode = 'r').view('datetime64[ns]')
+        else:
+            dict_cols[col] = np.load(os.path.join(path_version, f'{col}.npy'), mmap_mode = 'r')
+    df = pd.DataFrame(dict_cols, copy = False)
+    #
+    index = TimeIndex.__new__(TimeIndex)
+    index.timestamps = np.asarray(dict_cols['date']).view(np.int64)
+    index.day_offsets = np.load(os.path.join(path_version, '_day_offsets.npy'), mmap_mode = 'r')
+    index.sess_offsets = np.load(os.path.join(path_version, '_sess_offsets.npy'), mmap_mode = 'r')
+    return df, index
+
+def _count_references(path_version):
+    '''
+    Function to count the live processes referencing a published instrument; references of dead processes are removed.
+    '''
+    path_refs = os.path.join(path_version, 'refs')
+    if not os.path.isdir(path_refs):
+        return 0
+    n_refs = 0
+    for pid in os.listdir(path_refs):
+        try:
+            os.kill(int(pid), 0)
+            n_refs += 1
+        except (ProcessLookupError, ValueError):
+            os.remove(os.path.join(path_refs, pid))
+        except PermissionError:
+            n_refs += 1
+    return n_refs
+
+class _lock:
+    '''
+    Inter-process lock on an instrument, based on `fcntl.flock` (no-op where `fcntl` is not available).
+    '''
+    def __init__(self, path_shared, instrument):
+        self.path_lock = os.path.join(path_shared, f'.{instrument}.lock')
+
+    def __enter__(self):
+        self.file = open(self.path_lock, 'a')
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+@atexit.register
+def _release_all():
+    for instrument in list(_attached.keys()):
+        release(instrument)
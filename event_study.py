@@ -0,0 +1,143 @@
+import numpy as np
+import warnings
+from heatmap import grid_reduce
+from session_registry import MINUTES_PER_DAY, to_minutes
+from time_index import NS_PER_DAY
+
+# events on which sessions can be aligned
+LIST_ANCHORS = ['Settlement', 'RTH open', 'RTH close', 'Session start', 'Session end', 'Custom time']
+
+def list_anchors(session):
+    '''
+    Function to list the events defined for the trading session of an instrument.
+
+    Args:
+        session: Instance of `session_registry.Session`.
+
+    Returns:
+        list_anchors: List of events, among `LIST_ANCHORS`.
+    '''
+    list_anchors = []
+    for anchor in LIST_ANCHORS:
+        if ((anchor == 'Settlement') and (session.settlement is None)) or (anchor.startswith('RTH') and (session.rth is None)):
+            continue
+        list_anchors.append(anchor)
+    return list_anchors
+
+def get_anchor_minutes(session, anchor, time_custom = None):
+    '''
+    Function to get the time of an event, as minutes after midnight.
+
+    Args:
+        session: Instance of `session_registry.Session`.
+        anchor: Event, among `LIST_ANCHORS`.
+        time_custom: Time of the 'Custom time' event ('%H:%M:%S').
+
+    Returns:
+        minutes: Number of minutes (`None` if the event is not defined for the session).
+    '''
+    if anchor == 'Custom time':
+        return to_minutes(time_custom)
+    if anchor == 'Session start':
+        return session.minutes_open
+    if anchor == 'Session end':
+        return session.minutes_close
+    if anchor == 'Settlement':
+        return session.minutes_settlement
+    if session.minutes_rth is None:
+        return None
+    return session.minutes_rth[0] if anchor == 'RTH open' else session.minutes_rth[1]
+
+def get_anchor_times(ts_first, minutes_shift, minutes_anchor):
+    '''
+    Function to get the timestamp of the event in each session, from the timestamp of its first bar: sessions are calendar days once times are
+    shifted so that the session begins at 00:xx:00.
+
+    Args:
+        ts_first: Int64 timestamps (nanoseconds) of the first bar of each session.
+        minutes_shift: Shift of times making sessions begin at 00:xx:00, in minutes (see `session_registry.Session`).
+        minutes_anchor: Time of the event, as minutes after midnight.
+
+    Returns:
+        ts_anchor: Int64 timestamps of the event in each session.
+    '''
+    shift = minutes_shift*60*10**9
+    days = (ts_first - shift)//NS_PER_DAY
+    return days*NS_PER_DAY + shift + ((minutes_anchor - minutes_shift)%MINUTES_PER_DAY)*60*10**9
+
+def gather_windows(ts, list_values, ts_anchor, n_before, n_after, minutes_bar):
+    '''
+    Function to gather the values of the bars in a window around the event of each session into (sessions x window) matrices, with NaN for
+    missing bars. The rows of each window are located with `searchsorted` on the time-ordered timestamps (so the cost depends on the size of
+    the windows, not on the number of bars), then values are scattered into the matrices with fancy indexing. Windows are in time, so they
+    can extend beyond the session (e.g., after session end).
+
+    Args:
+        ts: Sorted int64 timestamps (nanoseconds) of the bars.
+        list_values: List of arrays of values of the bars.
+        ts_anchor: Int64 timestamps of the event in each session.
+        n_before: Number of bars before the event.
+        n_after: Number of bars after the event (the bar beginning at the event excluded).
+        minutes_bar: Length of bars, in minutes.
+
+    Returns:
+        list_matrices: List of matrices, one row per session and one column per bar of the window.
+        offsets: Minutes from the event of the columns.
+    '''
+    bar = minutes_bar*60*10**9
+    starts = np.searchsorted(ts, ts_anchor - n_before*bar, side = 'left')
+    ends = np.searchsorted(ts, ts_anchor + (n_after + 1)*bar, side = 'left')
+    lengths = ends - starts
+    # session and row of each gathered bar
+    sessions = np.repeat(np.arange(ts_anchor.shape[0]), lengths)
+    rows = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    cols = (ts[rows] - ts_anchor[sessions])//bar + n_before
+    list_matrices = []
+    for values in list_values:
+        matrix = np.full((ts_anchor.shape[0], n_before + n_after + 1), np.nan)
+        matrix[sessions, cols] = values[rows]
+        list_matrices.append(matrix)
+    return list_matrices, (np.arange(n_before + n_after + 1) - n_before)*minutes_bar
+
+def reduce_windows(matrix, labels, n_labels, group_function):
+    '''
+    Function to reduce the windows of the sessions of each group along sessions.
+
+    Args:
+        matrix: Matrix of the windows (see `gather_windows`).
+        labels: Group of each session.
+        n_labels: Number of groups.
+        group_function: 'Mean', 'Median', 'Sum', 'Cumsum' (cumulative sum of the means along the window), 'Count' or 'Std'.
+
+    Returns:
+        result: Matrix of the reduced values, one row per group.
+        count: Matrix with the number of values of each cell.
+    '''
+    rows, cols = np.nonzero(~np.isnan(matrix))
+    result, count = grid_reduce(labels[rows], cols, matrix[rows, cols], (n_labels, matrix.shape[1]),
+                                'Count' if group_function == 'Median' else group_function)
+    if group_function == 'Median':
+        result = quantile_windows(matrix, labels, n_labels, [0.5])[:, :, 0]
+    return result, count
+
+def quantile_windows(matrix, labels, n_labels, list_quantiles):
+    '''
+    Function to compute quantiles of the windows of the sessions of each group along sessions.
+
+    Args:
+        matrix: Matrix of the windows (see `gather_windows`).
+        labels: Group of each session.
+        n_labels: Number of groups.
+        list_quantiles: List of quantiles, in [0, 1].
+
+    Returns:
+        quantiles: Array of shape (groups, window, quantiles).
+    '''
+    quantiles = np.full((n_labels, matrix.shape[1], len(list_quantiles)), np.nan)
+    with warnings.catch_warnings():
+        # columns without values
+        warnings.simplefilter('ignore', category = RuntimeWarning)
+        for label in range(n_labels):
+            if (labels == label).any():
+                quantiles[label] = np.nanquantile(matrix[labels == label], list_quantiles, axis = 0).T
+    return quantiles
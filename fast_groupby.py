@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+from heatmap import grid_reduce
+
+# maximum number of cells of the grid of the grouping keys, for the dense path
+MAX_GROUPS = 2**22
+# aggregations reduced with weighted `np.bincount`s of the group codes
+LIST_BINCOUNT = ['mean', 'count', 'std']
+# aggregations reduced by segments of the rows sorted by group
+DICT_SEGMENT = {'max': np.fmax, 'min': np.fmin, 'sum': np.add}
+
+def aggregate(df, group_cols, dict_agg):
+    '''
+    Function to compute `df.groupby(group_cols).agg(dict_agg).reset_index()` without the generic machinery of `pandas`, when the keys allow it:
+    - if the last key is strictly increasing (e.g., the dates of 'History'), each row is its own group, so the aggregation is the identity (rows
+      are only sorted by the other keys, if any);
+    - otherwise, keys are encoded as codes of a dense grid: means, counts and standard deviations are weighted `np.bincount`s, while the other
+      aggregations are segment reductions of the rows sorted by group.
+
+    Args:
+        df: Frame to group.
+        group_cols: Grouping column (or list of columns).
+        dict_agg: Dictionary with the aggregation ('mean', 'median', 'sum', 'count', 'std', 'max', 'min', 'first', 'last') of each column.
+
+    Returns:
+        df_result: Aggregated frame, as computed by `pandas` (`None` if no fast path applies, e.g. empty frames or missing keys).
+    '''
+    group_cols = [group_cols] if isinstance(group_cols, str) else list(group_cols)
+    if df.shape[0] == 0:
+        return None
+    if not _is_increasing(df[group_cols[-1]].values):
+        return _aggregate_dense(df, group_cols, dict_agg)
+    # one row per group
+    order = None
+    if len(group_cols) > 1:
+        codes, _ = _encode(df, group_cols[:-1])
+        if codes is None:
+            return None
+        order = np.argsort(codes, kind = 'stable')
+    dict_result = {}
+    for col in group_cols:
+        dict_result[col] = df[col].values if order is None else df[col].values[order]
+    for col, function in dict_agg.items():
+        values = _identity(df[col].values, function)
+        if values is None:
+            return None
+        dict_result[col] = values if order is None else values[order]
+    return pd.DataFrame(dict_result)
+
+def _is_increasing(values):
+    '''
+    Function to check whether string keys are strictly increasing, i.e. unique and sorted.
+    '''
+    if values.dtype != object:
+        return False
+    try:
+        return bool(np.all(values[1:] > values[:-1]))
+    except TypeError:
+        # missing keys
+        return False
+
+def _encode(df, group_cols):
+    '''
+    Function to encode the keys of each row as the code of a cell of the grid of the sorted unique values of the keys (lexicographic order).
+    Returns `None` if keys are missing or if the grid is too large.
+    '''
+    list_codes, list_uniques = [], []
+    for col in group_cols:
+        codes, uniques = pd.factorize(df[col].values, sort = True)
+        if (codes < 0).any():
+            return None, None
+        list_codes.append(codes)
+        list_uniques.append(uniques)
+    shape = tuple(len(uniques) for uniques in list_uniques)
+    if np.prod(shape, dtype = float) > MAX_GROUPS:
+        return None, None
+    return np.ravel_multi_index(list_codes, shape), (list_uniques, shape)
+
+def _identity(values, function):
+    '''
+    Function to aggregate groups made of one value each, with the dtypes of `pandas`.
+    '''
+    if function in ['max', 'min', 'first', 'last']:
+        return values
+    if function in ['mean', 'median']:
+        return values.astype(float)
+    if function == 'sum':
+        if values.dtype.kind in 'biu':
+            return values.astype(np.int64)
+        return np.where(np.isnan(values), 0, values)
+    if function == 'count':
+        return (~pd.isnull(values)).astype(np.int64)
+    if function == 'std':
+        return np.full(values.shape[0], np.nan)
+    return None
+
+def _aggregate_dense(df, group_cols, dict_agg):
+    '''
+    Function to aggregate groups through the codes of their keys in a dense grid.
+    '''
+    codes, grid = _encode(df, group_cols)
+    if codes is None:
+        return None
+    list_uniques, shape = grid
+    # cells with rows are the groups
+    counts = np.bincount(codes)
+    groups = np.flatnonzero(counts)
+    codes = (np.cumsum(counts > 0) - 1)[codes]
+    n_groups = groups.shape[0]
+    order = np.argsort(codes, kind = 'stable')
+    offsets = np.concatenate(([0], np.cumsum(counts[groups])))
+    #
+    dict_result = {col: uniques[index] for col, uniques, index in zip(group_cols, list_uniques, np.unravel_index(groups, shape))}
+    for col, function in dict_agg.items():
+        values = df[col].values
+        if function in LIST_BINCOUNT:
+            if values.dtype.kind not in 'biuf':
+                return None
+            result = grid_reduce(np.zeros(codes.shape[0], dtype = np.int64), codes, values.astype(float), (1, n_groups), function.capitalize())[0][0]
+            dict_result[col] = result.astype(np.int64) if function == 'count' else result
+        elif function in DICT_SEGMENT:
+            if values.dtype.kind not in 'biufM':
+                return None
+            values_sorted = values[order]
+            if function == 'sum':
+                values_sorted = values_sorted.astype(np.int64) if values.dtype.kind in 'biu' else np.nan_to_num(values_sorted)
+            dict_result[col] = DICT_SEGMENT[function].reduceat(values_sorted, offsets[:-1])
+        elif function in ['first', 'last']:
+            # `pandas` skips missing values
+            if pd.isnull(values).any():
+                return None
+            dict_result[col] = values[order[offsets[:-1] if function == 'first' else offsets[1:] - 1]]
+        else:
+            return None
+    return pd.DataFrame(dict_result)
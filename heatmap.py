@@ -0,0 +1,116 @@
+import numpy as np
+import warnings
+
+def grid_partials(keys, values, n_cells, squares = True):
+    '''
+    Function to compute the partial aggregates of values by cell, which can be merged by summing them: counts, sums and sums of squares of each
+    cell are weighted `np.bincount`s of the keys.
+
+    Args:
+        keys: Cell of each value.
+        values: Values (NaN are skipped).
+        n_cells: Number of cells.
+        squares: Whether to compute sums of squares (zeros otherwise).
+
+    Returns:
+        partials: Array of shape (4, cells) with the number of values (including NaN), the number of valid values, the sum and the sum of squares
+            of the centered values of each cell.
+        center: Value subtracted from values, so that sums of squares do not lose precision.
+    '''
+    partials = np.zeros((4, n_cells))
+    partials[0] = np.bincount(keys, minlength = n_cells)
+    valid = ~np.isnan(values)
+    keys, values = keys[valid], values[valid]
+    partials[1] = np.bincount(keys, minlength = n_cells)
+    center = values.mean() if values.shape[0] > 0 else 0
+    partials[2] = np.bincount(keys, weights = values - center, minlength = n_cells)
+    if squares:
+        partials[3] = np.bincount(keys, weights = (values - center)**2, minlength = n_cells)
+    return partials, center
+
+def reduce_partials(partials, center, group_function):
+    '''
+    Function to get the reduced values of cells from their partial aggregates (see `grid_partials`).
+
+    Args:
+        partials: Partial aggregates of the cells.
+        center: Value subtracted from values.
+        group_function: 'Mean', 'Sum', 'Cumsum' (means, cumulated by the caller), 'Count' or 'Std'.
+
+    Returns:
+        result: Array of the reduced values of the cells.
+        count: Array with the number of values (including NaN) of each cell.
+    '''
+    count, n_valid, total, total_sq = partials
+    with np.errstate(invalid = 'ignore', divide = 'ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', category = RuntimeWarning)
+        if group_function == 'Count':
+            result = n_valid.astype(float)
+        elif group_function == 'Sum':
+            result = total + center*n_valid
+        elif group_function in ['Mean', 'Cumsum']:
+            result = total/n_valid + center
+        elif group_function == 'Std':
+            result = np.where(n_valid > 1, np.sqrt(np.maximum(total_sq - total**2/n_valid, 0)/(n_valid - 1)), np.nan)
+    return result, np.rint(count).astype(np.int64)
+
+def grid_reduce(rows, cols, values, shape, group_function):
+    '''
+    Function to reduce values by cell of a two-dimensional grid (e.g., day of week x time) in a single pass: cells are encoded as integer keys,
+    and counts, sums and sums of squares of each cell are weighted `np.bincount`s of the keys.
+
+    Args:
+        rows: Row of the cell of each value.
+        cols: Column of the cell of each value.
+        values: Values (NaN are skipped).
+        shape: Shape of the grid.
+        group_function: 'Mean', 'Sum', 'Cumsum' (cumulative sum of the means along the columns), 'Count' or 'Std'.
+
+    Returns:
+        result: Matrix of the reduced values of the cells.
+        count: Matrix with the number of values (including NaN) of each cell.
+    '''
+    partials, center = grid_partials(rows*shape[1] + cols, values, shape[0]*shape[1], group_function == 'Std')
+    result, count = reduce_partials(partials, center, group_function)
+    result = result.reshape(shape)
+    # cumulative sum along the columns (missing values are skipped)
+    if group_function == 'Cumsum':
+        result = np.where(np.isnan(result), np.nan, np.cumsum(np.nan_to_num(result), axis = 1))
+    return result, count.reshape(shape)
+
+def window_reduce(periods, rows, cols, values, shape, n_periods, window, group_function):
+    '''
+    Function to reduce values by cell of a two-dimensional grid over rolling windows of consecutive periods (e.g., years), stepping by one
+    period. The partial aggregates of each period and cell are computed in a single pass and cumulated along periods, so that each window is
+    the difference of two cumulated partials: the cost does not depend on the number and on the overlap of the windows.
+
+    Args:
+        periods: Period of each value, in [0, n_periods).
+        rows: Row of the cell of each value.
+        cols: Column of the cell of each value.
+        values: Values (NaN are skipped).
+        shape: Shape of the grid.
+        n_periods: Number of periods.
+        window: Number of periods of each window (all the periods, if there are fewer of them).
+        group_function: 'Mean', 'Sum', 'Cumsum' (cumulative sum of the means along the columns), 'Count' or 'Std'.
+
+    Returns:
+        result: Array of shape (windows, rows, columns) of the reduced values of the cells of each window; window `i` spans periods
+            `i:i + window`.
+        count: Array with the number of values (including NaN) of each cell of each window.
+    '''
+    n_cells = shape[0]*shape[1]
+    window = max(min(window, n_periods), 1)
+    n_windows = n_periods - window + 1
+    partials, center = grid_partials((periods*shape[0] + rows)*shape[1] + cols, values, n_periods*n_cells, group_function == 'Std')
+    cumulated = np.zeros((4, n_periods + 1, n_cells))
+    np.cumsum(partials.reshape(4, n_periods, n_cells), axis = 1, out = cumulated[:, 1:])
+    partials = (cumulated[:, window:] - cumulated[:, :n_windows]).reshape(4, -1)
+    # sums of cells without values are exactly zero, as in a single pass
+    partials[2:, partials[1] == 0] = 0
+    result, count = reduce_partials(partials, center, group_function)
+    result = result.reshape(n_windows, *shape)
+    # cumulative sum along the columns (missing values are skipped)
+    if group_function == 'Cumsum':
+        result = np.where(np.isnan(result), np.nan, np.cumsum(np.nan_to_num(result), axis = 2))
+    return result, count.reshape(n_windows, *shape)
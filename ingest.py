@@ -0,0 +1,329 @@
+import numpy as np
+import pandas as pd
+import argparse
+import json
+import os
+import data_store
+from time_index import NS_PER_DAY, to_ns
+
+# timeframes of the derived bars kept up to date by the ingestion
+LIST_TIMEFRAMES = ['5m', '15m', '30m', '60m']
+# aggregation of 1-minute bars into bars of a higher timeframe
+DICT_AGG_BARS = {'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'bpv': 'first', 'vol': 'sum',
+                 'n_sess': 'max'}
+# aggregation of bars into session statistics
+DICT_AGG_SESSIONS = {'date_start': 'first', 'date_end': 'last', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'vol': 'sum',
+                     'n_bars': 'sum'}
+
+def get_path_derived(instrument, path_data = './data'):
+    '''
+    Function to get the directory containing the data derived from the bars of an instrument (higher-timeframe bars and session statistics).
+
+    Args:
+        instrument: Instrument name.
+        path_data: Directory containing data files.
+
+    Returns:
+        path_derived: Directory path.
+    '''
+    return os.path.join(path_data, 'derived', instrument)
+
+def flag_session_start(dates, sess_start, date_previous = None):
+    '''
+    Function to flag the bars opening a session, i.e. the first bar after each session opening time.
+
+    Args:
+        dates: Series of dates of the bars.
+        sess_start: Session opening time ('%H:%M:%S').
+        date_previous: Date of the bar preceding `dates` (`None` if there is none).
+
+    Returns:
+        session_start: Boolean array.
+    '''
+    offset = pd.Timedelta(sess_start).value
+    # day of the session each bar belongs to
+    sess_day = (to_ns(dates) - offset)//NS_PER_DAY
+    sess_day_previous = np.iinfo(np.int64).min
+    if date_previous is not None:
+        sess_day_previous = (pd.Timestamp(date_previous).value - offset)//NS_PER_DAY
+    return sess_day != np.concatenate(([sess_day_previous], sess_day[:-1]))
+
+def aggregate_bars(df, timeframe):
+    '''
+    Function to aggregate 1-minute bars to a higher (intraday) timeframe, as `Dashboard._group_to_timeframe` does.
+
+    Args:
+        df: 1-minute bars.
+        timeframe: Timeframe (e.g., '5m').
+
+    Returns:
+        df_bars: Aggregated bars.
+    '''
+    df = df[['date'] + list(DICT_AGG_BARS.keys())].copy()
+    df['date'] = df['date'].dt.ceil(timeframe.replace('m', 'min'))
+    return df.groupby('date').agg(DICT_AGG_BARS).reset_index()
+
+def aggregate_sessions(df):
+    '''
+    Function to compute the statistics of each session.
+
+    Args:
+        df: 1-minute bars.
+
+    Returns:
+        df_sessions: Session statistics, one row per `n_sess`.
+    '''
+    df = df[['n_sess', 'date', 'open', 'high', 'low', 'close', 'vol']].rename(columns = {'date': 'date_start'})
+    df['date_end'] = df['date_start']
+    df['n_bars'] = 1
+    return df.groupby('n_sess').agg(DICT_AGG_SESSIONS).reset_index()
+
+def combine_aggregates(df_old, df_new, key, dict_agg):
+    '''
+    Function to append new aggregates to old ones. Since data is time-ordered, only the first new aggregate can share its key with the last old one,
+    in which case the two partial aggregates are merged.
+
+    Args:
+        df_old: Old aggregates.
+        df_new: Aggregates of the new data.
+        key: Aggregation key.
+        dict_agg: Aggregation functions of the columns.
+
+    Returns:
+        df: Updated aggregates.
+    '''
+    if (df_old.shape[0] == 0) or (df_new.shape[0] == 0) or (df_old[key].iloc[-1] != df_new[key].iloc[0]):
+        return pd.concat((df_old, df_new), ignore_index = True)
+    df_merge = pd.concat((df_old.iloc[-1:], df_new.iloc[:1]), ignore_index = True).groupby(key).agg(dict_agg).reset_index()
+    return pd.concat((df_old.iloc[:-1], df_merge, df_new.iloc[1:]), ignore_index = True)
+
+def append_bars(instrument, df_new, sess_start = None, path_data = './data', max_segments = 50):
+    '''
+    Function to append new 1-minute bars to an instrument, without rewriting its data file: bars are written as a new segment, continuing the
+    session counter (and, if `sess_start` is given, the session-start flags) from the previous last bar. Derived bars and session statistics are
+    updated using only the new bars, as well as the metadata read by the dashboard (see `data_store.read_metadata`). Segments are compacted into the data file when they are more than `max_segments`.
+
+    Args:
+        instrument: Instrument name.
+        df_new: New bars (columns `date`, `open`, `high`, `low`, `close`, `bpv`, `vol` and, if `sess_start` is `None`, `session_start`).
+        sess_start: Session opening time ('%H:%M:%S'), used to flag the bars opening a session.
+        path_data: Directory containing data files.
+        max_segments: Maximum number of segments before compaction.
+
+    Returns:
+        n_rows: Number of appended bars.
+    '''
+    tail = _read_tail(instrument, path_data)
+    version_previous = data_store.data_version(instrument, path_data)
+    df_new = df_new.copy()
+    df_new['date'] = pd.to_datetime(df_new['date'])
+    df_new = df_new.sort_values(by = 'date')
+    # bars which were already ingested are skipped
+    df_new = df_new[df_new['date'] > pd.Timestamp(tail['date'])].reset_index(drop = True)
+    if df_new.shape[0] == 0:
+        return 0
+    # continue flags and session counter from the previous last bar
+    if sess_start is not None:
+        df_new['session_start'] = flag_session_start(df_new['date'], sess_start, tail['date'])
+    df_new['session_start'] = df_new['session_start'].astype(bool)
+    df_new['n_sess'] = (tail['n_sess'] + np.cumsum(df_new['session_start'].values)).astype(float)
+    #
+    path_updates = data_store.get_path_updates(instrument, path_data)
+    os.makedirs(path_updates, exist_ok = True)
+    n_segments = len(data_store.list_segments(instrument, path_data))
+    _write_pickle(df_new, os.path.join(path_updates, f'seg_{str(n_segments + 1).zfill(6)}.pickle'))
+    _update_derived(instrument, df_new, version_previous, path_data)
+    _update_metadata(instrument, df_new, tail, version_previous, path_data)
+    _write_tail(instrument, {'date': str(df_new['date'].iloc[-1]), 'n_sess': int(df_new['n_sess'].iloc[-1])}, path_data)
+    #
+    if n_segments + 1 > max_segments:
+        compact(instrument, path_data)
+    return df_new.shape[0]
+
+def compact(instrument, path_data = './data'):
+    '''
+    Function to merge the appended segments into the data file of an instrument.
+
+    Args:
+        instrument: Instrument name.
+        path_data: Directory containing data files.
+
+    Returns: None.
+    '''
+    list_segments_instr = data_store.list_segments(instrument, path_data)
+    if len(list_segments_instr) == 0:
+        return
+    version_previous = data_store.data_version(instrument, path_data)
+    df = data_store.read_instrument(instrument, path_data).drop('n_sess', axis = 1)
+    path_file = data_store.get_data_file(instrument, path_data)
+    path_temp = f'{path_file}.tmp{os.getpid()}.pickle.gz'
+    df.to_pickle(path_temp)
+    os.replace(path_temp, path_file)
+    for path_segment in list_segments_instr:
+        os.remove(path_segment)
+    # data is unchanged, so up-to-date derived data and metadata stay valid
+    version = data_store.data_version(instrument, path_data)
+    path_derived = get_path_derived(instrument, path_data)
+    if _read_version(path_derived) == version_previous:
+        _write_version(path_derived, version)
+    metadata = data_store.read_metadata_file(instrument, path_data)
+    if (metadata is not None) and (metadata['version'] == version_previous):
+        data_store.write_metadata(instrument, dict(metadata, version = version), path_data)
+
+def build_derived(df):
+    '''
+    Function to build, from scratch, the data derived from the bars of an instrument.
+
+    Args:
+        df: 1-minute bars, with session counter.
+
+    Returns:
+        dict_derived: Dictionary with the bars of each timeframe of `LIST_TIMEFRAMES` and the session statistics (key 'sessions').
+    '''
+    dict_derived = {timeframe: aggregate_bars(df, timeframe) for timeframe in LIST_TIMEFRAMES}
+    dict_derived['sessions'] = aggregate_sessions(df)
+    return dict_derived
+
+def read_derived(instrument, path_data = './data'):
+    '''
+    Function to read the data derived from the bars of an instrument, building it if missing or older than the data (e.g., if the data file was
+    rewritten without using `append_bars`).
+
+    Args:
+        instrument: Instrument name.
+        path_data: Directory containing data files.
+
+    Returns:
+        dict_derived: Dictionary with the bars of each timeframe of `LIST_TIMEFRAMES` and the session statistics (key 'sessions').
+    '''
+    path_derived = get_path_derived(instrument, path_data)
+    version = data_store.data_version(instrument, path_data)
+    if _read_version(path_derived) != version:
+        df = data_store.read_instrument(instrument, path_data)
+        dict_derived = build_derived(df)
+        _write_derived(dict_derived, path_derived, version)
+        data_store.write_metadata(instrument, data_store.compute_metadata(df, version), path_data)
+        return dict_derived
+    return {name: pd.read_pickle(os.path.join(path_derived, f'{name}.pickle')) for name in LIST_TIMEFRAMES + ['sessions']}
+
+def check_derived(instrument, path_data = './data'):
+    '''
+    Function to check that the incrementally updated derived data is identical to the one rebuilt from the full data.
+
+    Args:
+        instrument: Instrument name.
+        path_data: Directory containing data files.
+
+    Returns:
+        dict_check: Dictionary with the outcome of the check for each derived table.
+    '''
+    dict_incremental = read_derived(instrument, path_data)
+    dict_full = build_derived(data_store.read_instrument(instrument, path_data))
+    dict_check = {}
+    for name in dict_full.keys():
+        try:
+            pd.testing.assert_frame_equal(dict_incremental[name], dict_full[name], check_dtype = False)
+            dict_check[name] = True
+        except AssertionError:
+            dict_check[name] = False
+    return dict_check
+
+def _update_derived(instrument, df_new, version_previous, path_data):
+    '''
+    Function to update the derived data with the new bars; the derived data is built from scratch if missing or older than the data preceding the
+    new bars.
+    '''
+    path_derived = get_path_derived(instrument, path_data)
+    version = data_store.data_version(instrument, path_data)
+    if _read_version(path_derived) != version_previous:
+        # new bars are already in the segments, so they are included
+        _write_derived(build_derived(data_store.read_instrument(instrument, path_data)), path_derived, version)
+        return
+    dict_derived = {name: pd.read_pickle(os.path.join(path_derived, f'{name}.pickle')) for name in LIST_TIMEFRAMES + ['sessions']}
+    for timeframe in LIST_TIMEFRAMES:
+        dict_derived[timeframe] = combine_aggregates(dict_derived[timeframe], aggregate_bars(df_new, timeframe), 'date', DICT_AGG_BARS)
+    dict_derived['sessions'] = combine_aggregates(dict_derived['sessions'], aggregate_sessions(df_new), 'n_sess', DICT_AGG_SESSIONS)
+    _write_derived(dict_derived, path_derived, version)
+
+def _update_metadata(instrument, df_new, tail, version_previous, path_data):
+    '''
+    Function to update the metadata with the new bars (last date, numbers of bars and sessions), so that the dashboard does not have to decode the
+    data to build its widgets; the metadata is computed from the data if missing or older than the data preceding the new bars.
+    '''
+    version = data_store.data_version(instrument, path_data)
+    metadata = data_store.read_metadata_file(instrument, path_data)
+    if (metadata is None) or (metadata['version'] != version_previous):
+        data_store.write_metadata(instrument, data_store.compute_metadata(data_store.read_instrument(instrument, path_data), version), path_data)
+        return
+    # the session counter is consecutive, so new sessions are counted from the previous last bar
+    metadata = dict(metadata, version = version, date_last = str(df_new['date'].iloc[-1]), n_rows = metadata['n_rows'] + df_new.shape[0],
+                    n_sess = metadata['n_sess'] + int(df_new['n_sess'].iloc[-1]) - int(tail['n_sess']))
+    data_store.write_metadata(instrument, metadata, path_data)
+
+def _write_derived(dict_derived, path_derived, version):
+    '''
+    Function to write the derived data and the version of the data it was derived from; the version is written last, so that partially written
+    derived data is never considered up to date.
+    '''
+    os.makedirs(path_derived, exist_ok = True)
+    for name, df in dict_derived.items():
+        _write_pickle(df, os.path.join(path_derived, f'{name}.pickle'))
+    _write_version(path_derived, version)
+
+def _read_version(path_derived):
+    path_version = os.path.join(path_derived, 'version.txt')
+    if not os.path.isfile(path_version):
+        return None
+    with open(path_version) as file:
+        return file.read()
+
+def _write_version(path_derived, version):
+    path_version = os.path.join(path_derived, 'version.txt')
+    with open(f'{path_version}.tmp', 'w') as file:
+        file.write(version)
+    os.replace(f'{path_version}.tmp', path_version)
+
+def _write_pickle(df, path_file):
+    '''
+    Function to write a frame atomically (readers never see a partial file).
+    '''
+    path_temp = f'{path_file}.tmp{os.getpid()}'
+    df.to_pickle(path_temp)
+    os.replace(path_temp, path_file)
+
+def _read_tail(instrument, path_data):
+    '''
+    Function to read date and session counter of the last bar of an instrument; the first time, they are read from the data.
+    '''
+    path_tail = os.path.join(data_store.get_path_updates(instrument, path_data), 'tail.json')
+    if os.path.isfile(path_tail):
+        with open(path_tail) as file:
+            return json.load(file)
+    df = data_store.read_instrument(instrument, path_data)
+    return {'date': str(df['date'].iloc[-1]), 'n_sess': int(df['n_sess'].iloc[-1])}
+
+def _write_tail(instrument, tail, path_data):
+    path_tail = os.path.join(data_store.get_path_updates(instrument, path_data), 'tail.json')
+    with open(f'{path_tail}.tmp', 'w') as file:
+        json.dump(tail, file)
+    os.replace(f'{path_tail}.tmp', path_tail)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Append new 1-minute bars to an instrument.')
+    parser.add_argument('instrument', help = 'Instrument name.')
+    parser.add_argument('--bars', help = 'Pickle or CSV file with the new bars.')
+    parser.add_argument('--sess-start', help = 'Session opening time (%%H:%%M:%%S), used to flag the bars opening a session.')
+    parser.add_argument('--path-data', default = './data', help = 'Directory containing data files.')
+    parser.add_argument('--max-segments', type = int, default = 50, help = 'Maximum number of segments before compaction.')
+    parser.add_argument('--compact', action = 'store_true', help = 'Merge the segments into the data file.')
+    parser.add_argument('--check', action = 'store_true', help = 'Check incremental derived data against a full rebuild.')
+    args = parser.parse_args()
+    #
+    if args.bars is not None:
+        df_bars = pd.read_csv(args.bars) if args.bars.endswith('.csv') else pd.read_pickle(args.bars)
+        n_rows = append_bars(args.instrument, df_bars, args.sess_start, args.path_data, args.max_segments)
+        print(f'{n_rows} bars appended to {args.instrument}.')
+    if args.compact:
+        compact(args.instrument, args.path_data)
+    if args.check:
+        print(check_derived(args.instrument, args.path_data))
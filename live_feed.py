@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+import io
+import os
+from ingest import flag_session_start
+from time_index import segment_offsets, to_ns
+
+class BarFeed:
+    def __init__(self, path_feed):
+        '''
+        Reader of a local append-only feed of 1-minute bars: a CSV file (with header `date,open,high,low,close,bpv,vol`) to which a producer appends
+        one line per bar. Each call to `read_new` only reads the bytes appended since the previous call.
+
+        Args:
+            path_feed: Path of the feed file.
+        '''
+        self.path_feed = path_feed
+        self.offset = 0
+        self.header = None
+
+    def read_new(self):
+        '''
+        Function to read the bars appended since the previous call; an incomplete last line is left for the next call.
+
+        Args: None.
+
+        Returns:
+            df: New bars.
+        '''
+        if not os.path.isfile(self.path_feed):
+            return pd.DataFrame()
+        with open(self.path_feed, 'rb') as file:
+            file.seek(self.offset)
+            data = file.read()
+        data = data[:data.rfind(b'\n') + 1]
+        self.offset += len(data)
+        if self.header is None:
+            if len(data) == 0:
+                return pd.DataFrame()
+            line_header, data = data.split(b'\n', 1)
+            self.header = line_header.decode().strip().split(',')
+        if len(data) == 0:
+            return pd.DataFrame()
+        df = pd.read_csv(io.BytesIO(data), names = self.header)
+        df['date'] = pd.to_datetime(df['date'])
+        return df
+
+def append_to_feed(path_feed, df):
+    '''
+    Function to append bars to a feed file, writing the header if the file is new. It is the stand-in of the real producer.
+
+    Args:
+        path_feed: Path of the feed file.
+        df: Bars to append.
+
+    Returns: None.
+    '''
+    columns = ['date', 'open', 'high', 'low', 'close', 'bpv', 'vol']
+    write_header = not os.path.isfile(path_feed)
+    with open(path_feed, 'a') as file:
+        df[columns].to_csv(file, header = write_header, index = False)
+
+class LiveSession:
+    def __init__(self, sess_start, timeframe, metric, unit = 'points', max_bars = 1441):
+        '''
+        State of the current session, updated with each batch of new 1-minute bars in O(number of new bars): bars of the chosen timeframe, the
+        selected metric and its running sum are kept in preallocated arrays, and only the last (possibly incomplete) bar and the new ones are
+        recomputed.
+
+        Args:
+            sess_start: Session opening time ('%H:%M:%S').
+            timeframe: Intraday timeframe (e.g., '5m').
+            metric: Metric to compute (as in the sidebar).
+            unit: 'points' or '$'.
+            max_bars: Maximum number of bars in a session.
+        '''
+        self.sess_start = sess_start
+        self.timeframe_ns = int(timeframe.replace('m', ''))*60*10**9
+        self.metric_name = metric
+        self.unit = unit
+        #
+        self.date_last = None
+        self.n_bars = 0
+        self.date = np.zeros(max_bars, dtype = np.int64)
+        self.fields = {field: np.zeros(max_bars) for field in ['open', 'high', 'low', 'close', 'bpv', 'vol']}
+        self.metric = np.zeros(max_bars)
+        self.cumsum = np.zeros(max_bars)
+        self.idx_high = -1
+        self.idx_low = -1
+
+    def update(self, df_new):
+        '''
+        Function to add new 1-minute bars; if a new session begins, the state of the previous one is discarded.
+
+        Args:
+            df_new: New bars.
+
+        Returns:
+            n_start: First bar whose values changed.
+        '''
+        if df_new.shape[0] == 0:
+            return self.n_bars
+        # keep only the bars of the last session
+        session_start = flag_session_start(df_new['date'], self.sess_start, self.date_last)
+        if session_start.any():
+            df_new = df_new.iloc[np.flatnonzero(session_start)[-1]:]
+            self.n_bars = 0
+            self.idx_high = -1
+            self.idx_low = -1
+        self.date_last = df_new['date'].iloc[-1]
+        # aggregate new bars to the timeframe
+        key = -((-to_ns(df_new['date']))//self.timeframe_ns)*self.timeframe_ns
+        offsets = segment_offsets(key)
+        starts, ends = offsets[:-1], offsets[1:] - 1
+        new = {'open': df_new['open'].values[starts], 'high': np.maximum.reduceat(df_new['high'].values, starts),
+               'low': np.minimum.reduceat(df_new['low'].values, starts), 'close': df_new['close'].values[ends], 'bpv': df_new['bpv'].values[starts],
+               'vol': np.add.reduceat(df_new['vol'].values.astype(float), starts)}
+        key = key[starts]
+        # the first new bar may complete the last bar of the session
+        n_start = self.n_bars
+        if (self.n_bars > 0) and (self.date[self.n_bars - 1] == key[0]):
+            n_start -= 1
+            new['open'][0] = self.fields['open'][n_start]
+            new['high'][0] = max(new['high'][0], self.fields['high'][n_start])
+            new['low'][0] = min(new['low'][0], self.fields['low'][n_start])
+            new['bpv'][0] = self.fields['bpv'][n_start]
+            new['vol'][0] += self.fields['vol'][n_start]
+        n_end = n_start + key.shape[0]
+        self.date[n_start:n_end] = key
+        for field, values in new.items():
+            self.fields[field][n_start:n_end] = values
+        self.n_bars = n_end
+        #
+        self._update_metric(n_start, n_end)
+        return n_start
+
+    def _update_metric(self, n_start, n_end):
+        '''
+        Function to recompute metric and running sum of bars `n_start:n_end`.
+        '''
+        f = {field: values[n_start:n_end] for field, values in self.fields.items()}
+        metric_name = self.metric_name
+        if metric_name == 'Close':
+            metric = f['close'].copy()
+        elif metric_name == 'Delta close':
+            close_previous = np.concatenate((self.fields['close'][max(n_start - 1, 0):max(n_start, 1)], f['close'][:-1]))
+            metric = f['close'] - close_previous
+            if n_start == 0:
+                metric[0] = 0
+        elif metric_name == 'Body':
+            metric = f['close'] - f['open']
+        elif metric_name == 'Range':
+            metric = f['high'] - f['low']
+        elif metric_name == 'Open-high':
+            metric = f['high'] - f['open']
+        elif metric_name == 'Open-low':
+            metric = f['open'] - f['low']
+        elif metric_name == 'Volume':
+            metric = f['vol'].copy()
+        # counts of highs/lows: the flag moves to the new extreme of the session, if any
+        else:
+            metric = np.zeros(n_end - n_start)
+            self.metric[n_start:n_end] = 0
+            if metric_name in ['Num highs', 'Num highs or lows']:
+                i = n_start + int(np.argmax(f['high']))
+                if (self.idx_high < 0) or (self.idx_high >= n_start) or (self.fields['high'][i] > self.fields['high'][self.idx_high]):
+                    self._move_flag(self.idx_high, i, n_start)
+                    self.idx_high = i
+            if metric_name in ['Num lows', 'Num highs or lows']:
+                i = n_start + int(np.argmin(f['low']))
+                if (self.idx_low < 0) or (self.idx_low >= n_start) or (self.fields['low'][i] < self.fields['low'][self.idx_low]):
+                    self._move_flag(self.idx_low, i, n_start)
+                    self.idx_low = i
+            metric = self.metric[n_start:n_end] + metric
+        if (self.unit == '$') and (metric_name not in ['Num highs', 'Num lows', 'Num highs or lows', 'Volume']):
+            metric = metric*f['bpv']
+        self.metric[n_start:n_end] = metric
+        self.cumsum[n_start:n_end] = np.cumsum(metric) + (self.cumsum[n_start - 1] if n_start > 0 else 0)
+
+    def _move_flag(self, idx_old, idx_new, n_start):
+        '''
+        Function to move a high/low flag; if the old flag precedes the updated bars, the running sum is corrected from it onwards.
+        '''
+        if (idx_old >= 0) and (idx_old < n_start):
+            self.metric[idx_old] -= 1
+            self.cumsum[idx_old:n_start] -= 1
+        self.metric[idx_new] += 1
+
+    def to_frame(self):
+        '''
+        Function to get the bars of the current session, with metric and running sum.
+
+        Args: None.
+
+        Returns:
+            df: Frame with columns `date`, `time`, `metric` and `cumsum`.
+        '''
+        date = pd.to_datetime(self.date[:self.n_bars])
+        return pd.DataFrame({'date': date, 'time': date.time, 'metric': self.metric[:self.n_bars], 'cumsum': self.cumsum[:self.n_bars]})
@@ -0,0 +1,79 @@
+import numpy as np
+
+# quantities distributed over the price levels of each bar
+LIST_PROFILES = ['Volume', 'Time']
+
+def infer_tick(prices, n_sample = 100000):
+    '''
+    Function to infer the tick size of an instrument from its prices, as the smallest change between consecutive prices (among the last
+    `n_sample` prices), for instruments whose tick size is not in the session registry.
+
+    Args:
+        prices: Array of prices (e.g., closes).
+        n_sample: Number of prices used.
+
+    Returns:
+        tick: Tick size (`None` if prices never change).
+    '''
+    prices = np.asarray(prices, dtype = float)[-n_sample:]
+    changes = np.abs(np.diff(prices))
+    # prices stored as floats are not exact multiples of the tick
+    changes = changes[changes > 1e-9*np.abs(prices).max()] if prices.shape[0] > 0 else changes
+    if changes.shape[0] == 0:
+        return None
+    return float(f'{changes.min():.6g}')
+
+def price_levels(prices, tick):
+    '''
+    Function to convert prices to integer price levels (multiples of the tick size).
+
+    Args:
+        prices: Array of prices.
+        tick: Tick size.
+
+    Returns:
+        levels: Array of int64 levels.
+    '''
+    return np.rint(np.asarray(prices, dtype = float)/tick).astype(np.int64)
+
+def bin_profile(low, high, labels, n_labels, weights, spread = True):
+    '''
+    Function to build the profiles (e.g., volume at price) of groups of bars (e.g., sessions): the weight of each bar is distributed over the
+    price levels of its low-high range, either divided evenly among them (e.g., volume) or in full on each of them (e.g., time at price). Each
+    group has its own range of levels, and the ranges are packed one after the other. Weights are histogrammed with weighted `np.bincount`s,
+    adding the weight of each bar at its lowest level and removing it above its highest one, then the histogram is cumulated along levels: the
+    cost depends on the number of bars and of levels, not on the size of the ranges of the bars.
+
+    Args:
+        low: Lowest price level of each bar (see `price_levels`).
+        high: Highest price level of each bar.
+        labels: Group of each bar, in [0, n_labels).
+        n_labels: Number of groups.
+        weights: Weight of each bar.
+        spread: Whether the weight of a bar is divided among its levels.
+
+    Returns:
+        levels: Price level of each bin reached by at least one bar.
+        groups: Group of each bin.
+        profile: Weight of each bin.
+    '''
+    level_min = np.full(n_labels, np.iinfo(np.int64).max)
+    level_max = np.full(n_labels, np.iinfo(np.int64).min)
+    np.minimum.at(level_min, labels, low)
+    np.maximum.at(level_max, labels, high)
+    width = np.where(level_max >= level_min, level_max - level_min + 1, 0)
+    level_min = np.where(width > 0, level_min, 0)
+    # each range has an additional bin above it, where the weights of the bars reaching its highest level are removed
+    base = np.concatenate(([0], np.cumsum(width + 1)))
+    n_bins = int(base[-1])
+    start = base[labels] + low - level_min[labels]
+    end = base[labels] + high - level_min[labels] + 1
+    density = weights/(high - low + 1) if spread else np.asarray(weights, dtype = float)
+    profile = np.cumsum(np.bincount(start, weights = density, minlength = n_bins) - np.bincount(end, weights = density, minlength = n_bins))
+    coverage = np.cumsum(np.bincount(start, minlength = n_bins) - np.bincount(end, minlength = n_bins))
+    groups = np.repeat(np.arange(n_labels), width + 1)
+    # rounding errors left by the previous ranges are removed, and bins not reached by any bar are dropped
+    profile -= np.concatenate(([0], profile[base[1:-1] - 1]))[groups]
+    bins = np.flatnonzero(coverage > 0)
+    groups = groups[bins]
+    return level_min[groups] + bins - base[groups], groups, profile[bins]
@@ -0,0 +1,101 @@
+import numpy as np
+from time_index import TimeIndex, segment_argmax, segment_argmin
+
+# metrics which can be computed, in the order of the columns of the metric matrix
+LIST_METRICS = ['Close', 'Delta close', 'Body', 'Range', 'Open-high', 'Open-low', 'Num highs', 'Num lows', 'Num highs or lows', 'Volume']
+# metrics expressed in points, which are rescaled by the BPV when the unit is '$'
+LIST_METRICS_POINTS = ['Close', 'Delta close', 'Body', 'Range', 'Open-high', 'Open-low']
+# units, in the order of the blocks of columns of the metric matrix
+LIST_UNITS = ['points', '$']
+# bars and metric matrices of the last requests of the process, by key, with their size in bytes
+_cached = {}
+# maximum size of the cached entries of the process (a year of 1-minute bars and its matrix take about 50 MB)
+MAX_CACHED_BYTES = 128*1024**2
+
+def compute_metric_matrix(df, intraday):
+    '''
+    Function to compute all the metrics, in both units, in a single pass over the bars.
+
+    Args:
+        df: Bars of the chosen timeframe.
+        intraday: Whether the timeframe is intraday (in which case the difference between consecutive closes is 0 at the beginning of sessions).
+
+    Returns:
+        matrix: Contiguous float32 array with a row for each bar and a column for each metric and unit (see `get_column`).
+    '''
+    n_metrics = len(LIST_METRICS)
+    matrix = np.empty((df.shape[0], 2*n_metrics), dtype = np.float32)
+    open_, high, low, close = [df[col].values.astype(float) for col in ['open', 'high', 'low', 'close']]
+    # difference between consecutive closes, set to 0 when the session changes
+    delta = np.concatenate(([np.nan], np.diff(close)))
+    if intraday:
+        n_sess = df['n_sess'].values
+        delta[np.concatenate(([True], n_sess[1:] != n_sess[:-1]))] = 0
+    # highs/lows of each calendar day
+    day_offsets = TimeIndex.from_frame(df[['date']]).day_offsets
+    high_sess = np.zeros(df.shape[0])
+    low_sess = np.zeros(df.shape[0])
+    # days whose highs (or lows) are all missing have no extreme
+    rows_high, rows_low = segment_argmax(high, day_offsets), segment_argmin(low, day_offsets)
+    high_sess[rows_high[rows_high >= 0]] = 1
+    low_sess[rows_low[rows_low >= 0]] = 1
+    #
+    for i, values in enumerate([close, delta, close - open_, high - low, high - open_, open_ - low, high_sess, low_sess, high_sess + low_sess,
+                                df['vol'].values]):
+        matrix[:, i] = values
+    # rescale metrics in points by BPV
+    matrix[:, n_metrics:] = matrix[:, :n_metrics]
+    for metric in LIST_METRICS_POINTS:
+        matrix[:, n_metrics + LIST_METRICS.index(metric)] *= df['bpv'].values
+    return matrix
+
+def get_column(metric, unit):
+    '''
+    Function to get the column of the metric matrix containing a metric.
+
+    Args:
+        metric: Metric (as in the sidebar).
+        unit: 'points' or '$'.
+
+    Returns:
+        col: Column index.
+    '''
+    return LIST_UNITS.index(unit)*len(LIST_METRICS) + LIST_METRICS.index(metric)
+
+def get_cached(key):
+    '''
+    Function to get bars and metric matrix computed by a previous request of the process.
+
+    Args:
+        key: Key of the request (it has to depend on all the parameters the bars depend on).
+
+    Returns:
+        df: Bars (`None` if not found).
+        matrix: Metric matrix (`None` if not found).
+    '''
+    if key not in _cached:
+        return None, None
+    # mark the entry as recently used
+    _cached[key] = _cached.pop(key)
+    return _cached[key][:2]
+
+def put_cached(key, df, matrix, max_bytes = MAX_CACHED_BYTES):
+    '''
+    Function to keep bars and metric matrix for the next requests of the process, removing the least recently used entries so that the cached
+    entries take at most `max_bytes`. Entries larger than `max_bytes` are not kept.
+
+    Args:
+        key: Key of the request.
+        df: Bars.
+        matrix: Metric matrix.
+        max_bytes: Maximum size of the cached entries, in bytes.
+
+    Returns: None.
+    '''
+    _cached.pop(key, None)
+    n_bytes = int(df.memory_usage(index = True).sum()) + matrix.nbytes
+    if n_bytes > max_bytes:
+        return
+    _cached[key] = (df, matrix, n_bytes)
+    while sum([entry[2] for entry in _cached.values()]) > max_bytes:
+        _cached.pop(next(iter(_cached)))
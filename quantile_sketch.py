@@ -0,0 +1,141 @@
+import numpy as np
+from time_index import segment_offsets
+
+class QuantileSketch:
+    def __init__(self, groups, means, weights, compression = 200):
+        '''
+        Mergeable quantile sketches (merging t-digest) of many groups at once. Each group is summarized by weighted centroids, which are small near
+        the tails and large near the median: centroids whose left cumulative quantile falls in the same unit interval of the scale function
+        `k(q) = compression/(2*pi)*arcsin(2*q - 1)` are merged. Sketches of different chunks of data (e.g., years, cached partial aggregates) are
+        merged by concatenating and compressing their centroids.
+
+        Args:
+            groups: Integer group of each centroid.
+            means: Mean of each centroid.
+            weights: Weight of each centroid.
+            compression: Compression parameter; each group keeps at most about `compression/2` centroids.
+        '''
+        self.compression = compression
+        self._compress(np.asarray(groups, dtype = np.int64), np.asarray(means, dtype = float), np.asarray(weights, dtype = float))
+
+    @classmethod
+    def from_values(cls, groups, values, compression = 200):
+        '''
+        Function to build the sketches of groups of values (NaN are skipped).
+
+        Args:
+            groups: Integer group of each value.
+            values: Values.
+            compression: Compression parameter.
+
+        Returns:
+            sketch: Sketches of the groups.
+        '''
+        values = np.asarray(values, dtype = float)
+        valid = ~np.isnan(values)
+        return cls(np.asarray(groups)[valid], values[valid], np.ones(valid.sum()), compression)
+
+    def merge(self, other):
+        '''
+        Function to merge with the sketches of another chunk of data; groups with the same label are merged together.
+
+        Args:
+            other: Sketches to merge.
+
+        Returns:
+            sketch: Merged sketches.
+        '''
+        return QuantileSketch(np.concatenate((self.groups, other.groups)), np.concatenate((self.means, other.means)),
+                              np.concatenate((self.weights, other.weights)), self.compression)
+
+    def quantile(self, list_q):
+        '''
+        Function to estimate quantiles of each group. Quantiles are interpolated linearly between the centers of the centroids, so that they are
+        exact (and equal to `np.quantile`) as long as the centroids of a group are single values.
+
+        Args:
+            list_q: List of quantiles (between 0 and 1).
+
+        Returns:
+            groups: Array of the groups.
+            result: Array (groups x quantiles) of estimated quantiles.
+        '''
+        offsets = segment_offsets(self.groups)
+        groups = self.groups[offsets[:-1]]
+        result = np.empty((groups.shape[0], len(list_q)))
+        if groups.shape[0] == 0:
+            return groups, result
+        # centers of the centroids, on the cumulative weight of all groups
+        cum = np.cumsum(self.weights)
+        center = cum - self.weights/2
+        weight_before = np.concatenate(([0], cum[offsets[1:-1] - 1]))
+        weight_group = np.add.reduceat(self.weights, offsets[:-1])
+        for i, q in enumerate(list_q):
+            position = weight_before + 0.5 + q*(weight_group - 1)
+            result[:, i] = np.interp(position, center, self.means)
+        return groups, result
+
+    @property
+    def nbytes(self):
+        '''
+        Memory used by the centroids, in bytes.
+        '''
+        return self.groups.nbytes + self.means.nbytes + self.weights.nbytes
+
+    def _compress(self, groups, means, weights):
+        '''
+        Function to merge the centroids of each group according to the scale function.
+        '''
+        order = np.lexsort((means, groups))
+        groups, means = groups[order], means[order]
+        # values (i.e., unit weights) need no reordering
+        weights = weights[order] if (weights != 1).any() else weights
+        offsets = segment_offsets(groups)
+        # cumulative quantile at the left of each centroid, within its group
+        cum = np.cumsum(weights)
+        weight_before = np.concatenate(([0], cum[offsets[1:-1] - 1]))
+        weight_group = np.add.reduceat(weights, offsets[:-1]) if groups.shape[0] > 0 else np.zeros(0)
+        q_left = (cum - weights - np.repeat(weight_before, np.diff(offsets)))/np.repeat(weight_group, np.diff(offsets))
+        k = np.floor(self.compression/(2*np.pi)*(np.arcsin(np.maximum(2*q_left - 1, -1)) + np.pi/2)).astype(np.int64)
+        # centroids of the same group and unit interval of `k` are merged
+        starts = segment_offsets(groups*(self.compression + 1) + k)[:-1]
+        self.weights = np.add.reduceat(weights, starts) if groups.shape[0] > 0 else weights
+        self.means = np.add.reduceat(means*weights, starts)/self.weights if groups.shape[0] > 0 else means
+        self.groups = groups[starts]
+
+def window_quantile(periods, keys, values, n_periods, n_cells, window, list_q, compression = 200):
+    '''
+    Function to estimate quantiles of values by cell over rolling windows of consecutive periods (e.g., years), stepping by one period. The
+    sketches of each period and cell are built in a single pass, then the sketches of the periods of each window are merged: each value is
+    sketched once, whatever the number and the overlap of the windows.
+
+    Args:
+        periods: Period of each value, in [0, n_periods).
+        keys: Cell of each value, in [0, n_cells).
+        values: Values (NaN are skipped).
+        n_periods: Number of periods.
+        n_cells: Number of cells.
+        window: Number of periods of each window (all the periods, if there are fewer of them).
+        list_q: List of quantiles (between 0 and 1).
+        compression: Compression parameter of the sketches.
+
+    Returns:
+        result: Array of shape (windows, cells, quantiles) of estimated quantiles (NaN for cells without values); window `i` spans periods
+            `i:i + window`.
+    '''
+    window = max(min(window, n_periods), 1)
+    n_windows = n_periods - window + 1
+    sketch_periods = QuantileSketch.from_values(np.asarray(periods, dtype = np.int64)*n_cells + keys, values, compression)
+    period_centroid, cell_centroid = np.divmod(sketch_periods.groups, n_cells)
+    # the j-th period of each window is merged at step j
+    sketch = None
+    for j in range(window):
+        window_centroid = period_centroid - j
+        keep = (window_centroid >= 0) & (window_centroid < n_windows)
+        sketch_step = QuantileSketch(window_centroid[keep]*n_cells + cell_centroid[keep], sketch_periods.means[keep], sketch_periods.weights[keep],
+                                     compression)
+        sketch = sketch_step if sketch is None else sketch.merge(sketch_step)
+    result = np.full((n_windows*n_cells, len(list_q)), np.nan)
+    groups, quantiles = sketch.quantile(list_q)
+    result[groups] = quantiles
+    return result.reshape(n_windows, n_cells, len(list_q))
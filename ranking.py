@@ -0,0 +1,45 @@
+import numpy as np
+
+def top_bottom_k(values, groups, k):
+    '''
+    Function to find the highest and lowest values of each group with partial selection (`np.argpartition`) instead of sorting the whole data:
+    rows are bucketed by group with a stable sort of the group codes (a radix sort for 16-bit codes), then only the rows selected in each
+    group are sorted. The highest and lowest rows of a group are disjoint (if a group has less than `2*k` values, its lowest rows are the ones
+    which are not among the highest).
+
+    Args:
+        values: Values (NaN are skipped).
+        groups: Integer code of the group of each value (from 0 to the number of groups - 1).
+        k: Number of highest and lowest values of each group.
+
+    Returns:
+        list_top: List with, for each group, the rows of its highest values (in descending order).
+        list_bottom: List with, for each group, the rows of its lowest values (in ascending order).
+    '''
+    values = np.asarray(values, dtype = float)
+    groups = np.asarray(groups)
+    rows = np.flatnonzero(~np.isnan(values))
+    codes = groups[rows]
+    n_groups = int(groups.max()) + 1 if groups.shape[0] > 0 else 0
+    order = rows[np.argsort(codes.astype(np.int16 if n_groups < 2**15 else np.int64), kind = 'stable')]
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength = n_groups))))
+    #
+    list_top, list_bottom = [], []
+    for i in range(n_groups):
+        rows_group = order[offsets[i]:offsets[i + 1]]
+        if rows_group.shape[0] <= 2*k:
+            rows_sorted = _select(values, rows_group, rows_group.shape[0], descending = True)
+            list_top.append(rows_sorted[:k])
+            list_bottom.append(rows_sorted[k:][::-1])
+        else:
+            list_top.append(_select(values, rows_group, k, descending = True))
+            list_bottom.append(_select(values, rows_group, k, descending = False))
+    return list_top, list_bottom
+
+def _select(values, rows, k, descending):
+    '''
+    Function to select the rows of the `k` highest (or lowest) values, sorted.
+    '''
+    x = -values[rows] if descending else values[rows]
+    selected = np.argpartition(x, k - 1)[:k] if rows.shape[0] > k else np.arange(rows.shape[0])
+    return rows[selected[np.argsort(x[selected], kind = 'stable')]]
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import pickle
+
+class ResultStore:
+    def __init__(self, path_store = None, max_bytes = 512*1024**2):
+        '''
+        Persistent store of aggregated results, shared by all server processes. Entries are addressed by a hash of the parameters and of the data
+        version, and the least recently used ones are evicted when the store exceeds `max_bytes`.
+
+        Args:
+            path_store: Directory of the store; by default, the `DASHBOARD_RESULT_DIR` environment variable or `./cache/results`.
+            max_bytes: Maximum size of the store, in bytes.
+        '''
+        if path_store is None:
+            path_store = os.environ.get('DASHBOARD_RESULT_DIR', './cache/results')
+        os.makedirs(path_store, exist_ok = True)
+        self.path_store = path_store
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(instrument, version, params):
+        '''
+        Function to build the key of an entry.
+
+        Args:
+            instrument: Instrument name.
+            version: Version of the data of the instrument.
+            params: Dictionary with all the parameters the result depends on.
+
+        Returns:
+            key: Key of the entry.
+        '''
+        params_canonical = json.dumps(params, sort_keys = True, separators = (',', ':'), default = str)
+        return f'{instrument}_{version}_' + hashlib.sha256(params_canonical.encode()).hexdigest()
+
+    def contains(self, key):
+        '''
+        Function to check whether an entry is in the store.
+
+        Args:
+            key: Key of the entry.
+
+        Returns:
+            found: Whether the entry is in the store.
+        '''
+        return os.path.isfile(os.path.join(self.path_store, f'{key}.pickle'))
+
+    def get(self, key):
+        '''
+        Function to read an entry.
+
+        Args:
+            key: Key of the entry.
+
+        Returns:
+            df: Stored frame (`None` if the entry is missing).
+            attrs: Dictionary of attributes stored together with the frame (`None` if the entry is missing).
+        '''
+        path_entry = os.path.join(self.path_store, f'{key}.pickle')
+        try:
+            with open(path_entry, 'rb') as file:
+                entry = pickle.load(file)
+            # mark the entry as recently used
+            os.utime(path_entry)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None, None
+        return entry['df'], entry['attrs']
+
+    def put(self, key, df, attrs):
+        '''
+        Function to write an entry, removing the entries of older versions of the same instrument and evicting the least recently used ones if the
+        store is too large.
+
+        Args:
+            key: Key of the entry.
+            df: Frame to store.
+            attrs: Dictionary of attributes to store together with the frame.
+
+        Returns: None.
+        '''
+        path_entry = os.path.join(self.path_store, f'{key}.pickle')
+        path_temp = f'{path_entry}.tmp{os.getpid()}'
+        with open(path_temp, 'wb') as file:
+            pickle.dump({'df': df, 'attrs': attrs}, file, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(path_temp, path_entry)
+        #
+        instrument, version = key.split('_')[:2]
+        for name in os.listdir(self.path_store):
+            if name.startswith(f'{instrument}_') and not name.startswith(f'{instrument}_{version}_'):
+                self._remove(name)
+        self._evict()
+
+    def _evict(self):
+        '''
+        Function to remove the least recently used entries until the store fits in `max_bytes`.
+        '''
+        entries = []
+        for name in os.listdir(self.path_store):
+            # entries being written by other processes are skipped
+            if not name.endswith('.pickle'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.path_store, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, name))
+        total_bytes = sum([entry[1] for entry in entries])
+        for _, size, name in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            self._remove(name)
+            total_bytes -= size
+
+    def _remove(self, name):
+        try:
+            os.remove(os.path.join(self.path_store, name))
+        except FileNotFoundError:
+            pass
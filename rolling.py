@@ -0,0 +1,80 @@
+import numpy as np
+from time_index import segment_labels
+
+# rolling statistics, used as grouping functions
+LIST_ROLLING = ['Rolling mean', 'Rolling std', 'Rolling z-score']
+
+def get_window_starts(dates_session, window, unit):
+    '''
+    Function to get the first session of the rolling window ending at each session.
+
+    Args:
+        dates_session: Time-ordered dates of the first bar of each session (`datetime64[ns]`).
+        window: Length of the window.
+        unit: Unit of the length ('Sessions' or 'Days', i.e. calendar days).
+
+    Returns:
+        starts: Index of the first session of the window of each session.
+    '''
+    n_sessions = dates_session.shape[0]
+    if unit == 'Sessions':
+        return np.maximum(np.arange(n_sessions) - window + 1, 0)
+    return np.searchsorted(dates_session, dates_session - np.timedelta64(window, 'D'), side = 'right')
+
+def _prefix_sums(values, axis = 0):
+    '''
+    Function to compute the prefix sums (with a leading zero) of the count, of the values and of their squares, skipping NaN. Values are centered
+    first, so that sums of squares do not lose precision when values are far from zero (e.g., prices).
+    '''
+    valid = ~np.isnan(values)
+    center = np.nanmean(values) if valid.any() else 0
+    values = np.where(valid, values - center, 0)
+    shape = list(values.shape)
+    shape[axis] = 1
+    zeros = np.zeros(shape)
+    return [np.concatenate((zeros, np.cumsum(i, axis = axis)), axis = axis) for i in [valid.astype(float), values, values*values]], center
+
+def _moments(sums_end, sums_start, center):
+    '''
+    Function to compute count, mean and sample standard deviation of windows from the prefix sums at their ends and starts.
+    '''
+    count, total, total_squares = [end - start for end, start in zip(sums_end, sums_start)]
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        mean = total/count
+        variance = np.maximum(total_squares - count*mean*mean, 0)/(count - 1)
+    return count, mean + center, np.sqrt(np.where(count > 1, variance, np.nan))
+
+def rolling_statistic(values, offsets, starts, function, slots = None):
+    '''
+    Function to compute a rolling statistic of the values of bars over windows of sessions, from prefix sums: the cost does not depend on the
+    length of the windows. The window of a bar spans the bars from the first session of the window of its session to the bar itself or, by
+    time slot, the bars of the same time slot in the sessions of the window.
+
+    Args:
+        values: Values of the bars (NaN are skipped).
+        offsets: Row offsets of the sessions (see `time_index.segment_offsets`).
+        starts: First session of the window of each session (see `get_window_starts`).
+        function: Statistic, among `LIST_ROLLING`.
+        slots: Integer time slot of each bar, to compute statistics by time slot (`None` otherwise).
+
+    Returns:
+        result: Statistic of the window of each bar (NaN if the window has too few values).
+    '''
+    values = np.asarray(values, dtype = float)
+    sessions = segment_labels(offsets)
+    if slots is None:
+        sums, center = _prefix_sums(values)
+        rows = np.arange(values.shape[0])
+        count, mean, std = _moments([i[rows + 1] for i in sums], [i[offsets[starts[sessions]]] for i in sums], center)
+    else:
+        # sessions x time slots matrix, with NaN for missing bars
+        matrix = np.full((offsets.shape[0] - 1, int(slots.max()) + 1 if slots.shape[0] > 0 else 0), np.nan)
+        matrix[sessions, slots] = values
+        sums, center = _prefix_sums(matrix)
+        count, mean, std = _moments([i[sessions + 1, slots] for i in sums], [i[starts[sessions], slots] for i in sums], center)
+    if function == 'Rolling mean':
+        return mean
+    if function == 'Rolling std':
+        return std
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        return np.where(std > 0, (values - mean)/std, np.nan)
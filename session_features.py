@@ -0,0 +1,114 @@
+import numpy as np
+import re
+import data_store
+import ingest
+
+# features of each session (prices in points); 'prior_' features are the ones of the previous session
+LIST_FEATURES = ['open', 'high', 'low', 'close', 'range', 'gap', 'change', 'volume', 'prior_range', 'prior_gap', 'prior_change', 'prior_volume']
+# comparison operators of conditions (longer operators first, so that they are matched before their prefixes)
+DICT_OPERATORS = {'>=': np.greater_equal, '<=': np.less_equal, '==': np.equal, '!=': np.not_equal, '>': np.greater, '<': np.less}
+
+# feature tables built by this process: {instrument: (version, table)}
+_cached = {}
+
+def build_features(df_sessions):
+    '''
+    Function to build the feature table of the sessions from their statistics.
+
+    Args:
+        df_sessions: Session statistics, one row per `n_sess` (see `ingest.aggregate_sessions`).
+
+    Returns:
+        table: Feature table, one row per session, with the columns `n_sess`, `date_start` and `LIST_FEATURES`.
+    '''
+    table = df_sessions[['n_sess', 'date_start', 'open', 'high', 'low', 'close']].copy()
+    close_prior = np.concatenate(([np.nan], table['close'].values[:-1]))
+    table['range'] = table['high'] - table['low']
+    table['gap'] = table['open'] - close_prior
+    table['change'] = table['close'] - close_prior
+    table['volume'] = df_sessions['vol'].values.astype(float)
+    for feature in ['range', 'gap', 'change', 'volume']:
+        table[f'prior_{feature}'] = np.concatenate(([np.nan], table[feature].values[:-1]))
+    return table
+
+def get_features(instrument, path_data = './data'):
+    '''
+    Function to get the feature table of the sessions of an instrument, built once per version of the data from its session statistics.
+
+    Args:
+        instrument: Instrument name.
+        path_data: Directory containing data files.
+
+    Returns:
+        table: Feature table (see `build_features`).
+    '''
+    version = data_store.data_version(instrument, path_data)
+    if (instrument not in _cached) or (_cached[instrument][0] != version):
+        _cached[instrument] = (version, build_features(ingest.read_derived(instrument, path_data)['sessions']))
+    return _cached[instrument][1]
+
+def parse_conditions(text):
+    '''
+    Function to parse conditions on the features of sessions, such as 'prior_range > 20 and gap > 0'. Each condition compares a feature with
+    a number or with another feature; conditions are joined by 'and'.
+
+    Args:
+        text: Conditions.
+
+    Returns:
+        conditions: List of lists `[feature, operator, value]` (`value` is a number or a feature name).
+    '''
+    conditions = []
+    for part in re.split(r'\s+and\s+', text.strip(), flags = re.IGNORECASE):
+        if part.strip() == '':
+            continue
+        match = re.fullmatch(r'\s*(\w+)\s*(' + '|'.join(DICT_OPERATORS.keys()) + r')\s*(\S+)\s*', part)
+        if match is None:
+            raise ValueError(f"Condition '{part.strip()}' is not of the form 'feature operator value'.")
+        feature, operator, value = match.groups()
+        if feature not in LIST_FEATURES:
+            raise ValueError(f"Unknown feature '{feature}': features are {', '.join(LIST_FEATURES)}.")
+        if value not in LIST_FEATURES:
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"Value '{value}' of condition '{part.strip()}' is neither a number nor a feature.")
+        conditions.append([feature, operator, value])
+    return conditions
+
+def get_mask(table, conditions):
+    '''
+    Function to evaluate conditions on the feature table. Comparisons with missing features (e.g., prior features of the first session) are
+    false.
+
+    Args:
+        table: Feature table.
+        conditions: Output of `parse_conditions`.
+
+    Returns:
+        mask: Boolean array, `True` for the sessions satisfying all the conditions.
+    '''
+    mask = np.ones(table.shape[0], dtype = bool)
+    for feature, operator, value in conditions:
+        values = table[value].values if isinstance(value, str) else value
+        with np.errstate(invalid = 'ignore'):
+            mask &= DICT_OPERATORS[operator](table[feature].values, values)
+    return mask
+
+def select_bars(n_sess, table, mask):
+    '''
+    Function to broadcast the selection of sessions back to bars, through their session counter.
+
+    Args:
+        n_sess: Session counter of each bar.
+        table: Feature table.
+        mask: Boolean array over the sessions of the table.
+
+    Returns:
+        keep: Boolean array, `True` for the bars of the selected sessions.
+    '''
+    sessions = table['n_sess'].values
+    if sessions.shape[0] == 0:
+        return np.zeros(len(n_sess), dtype = bool)
+    position = np.minimum(np.searchsorted(sessions, n_sess), sessions.shape[0] - 1)
+    return mask[position] & (sessions[position] == n_sess)
@@ -0,0 +1,272 @@
+import numpy as np
+import pandas as pd
+import copy
+import warnings
+from bootstrap import bootstrap_ci
+from quantile_sketch import QuantileSketch
+from time_index import NS_PER_DAY, segment_offsets, to_ns
+
+# session layouts of the bars of the last requests of the process, by key
+_cached = {}
+# maximum size of the cached layouts of the process (the layout of 1-minute bars of 15 years takes about 50 MB)
+MAX_CACHED_BYTES = 128*1024**2
+
+class SessionMatrix:
+    def __init__(self, df, shift, fields):
+        '''
+        Dense layout of intraday bars: one row per session (i.e., per day once times are shifted so that the session begins at 00:00:00), one
+        column per time slot, NaN for missing bars. Grouping by time then becomes a reduction along axis 0, and cumulative sums along time become
+        a `cumsum` along axis 1. The layout (rows, columns and per-session attributes) does not depend on the fields, so it can be kept and reused
+        with other fields of the same bars (see `with_fields`).
+
+        Args:
+            df: Time-ordered bars, with a `date` column.
+            shift: Shift of times (nanoseconds) making the session begin at 00:00:00.
+            fields: Columns of `df` to store as matrices (e.g., `open`, `high`, `low`, `close`, `vol`, `metric`).
+        '''
+        shifted = to_ns(df['date']) - shift
+        self.shift = shift
+        # sessions (rows) and time slots (columns)
+        self.days, self.row = np.unique(shifted//NS_PER_DAY, return_inverse = True)
+        self.slots, self.col = np.unique(shifted%NS_PER_DAY, return_inverse = True)
+        self.row, self.col = self.row.astype(np.int32), self.col.astype(np.int32)
+        self.shape = (self.days.shape[0], self.slots.shape[0])
+        # whether each bar has a cell on its own
+        cell = self.row*self.shape[1] + self.col
+        self.is_dense = np.unique(cell).shape[0] == cell.shape[0]
+        self.present = np.zeros(self.shape, dtype = bool)
+        self.present[self.row, self.col] = True
+        # columns falling on the calendar day after the session day
+        self.cross = ((self.slots + shift) >= NS_PER_DAY).astype(int)
+        #
+        self.values = {field: self._to_matrix(df[field].values) for field in fields}
+        self.attributes = {}
+
+    def with_fields(self, dict_values):
+        '''
+        Function to get a matrix with the same layout (shared, not copied) and other fields.
+
+        Args:
+            dict_values: Dictionary with the array of values of each field, one value for each bar.
+
+        Returns:
+            matrix: Instance of `SessionMatrix`.
+        '''
+        matrix = copy.copy(self)
+        matrix.values = {field: self._to_matrix(values) for field, values in dict_values.items()}
+        return matrix
+
+    def add_attribute(self, name, values):
+        '''
+        Function to store a per-session attribute (e.g., the weekday) from a per-bar one.
+
+        Args:
+            name: Attribute name.
+            values: Array with a value for each bar.
+
+        Returns:
+            values_row: Array with the value of each session (`None` if the value is not constant within sessions).
+        '''
+        self.attributes[name] = self.row_values(values)
+        return self.attributes[name]
+
+    @property
+    def nbytes(self):
+        '''
+        Memory used by layout and fields, in bytes.
+        '''
+        list_arrays = [self.days, self.row, self.slots, self.col, self.present, self.cross] + list(self.values.values())
+        return sum([array.nbytes for array in list_arrays]) + sum([values.nbytes for values in self.attributes.values() if values is not None])
+
+    def row_values(self, values):
+        '''
+        Function to get a per-session attribute from a per-bar one.
+
+        Args:
+            values: Array with a value for each bar.
+
+        Returns:
+            values_row: Array with the value of each session (`None` if the value is not constant within sessions).
+        '''
+        values_row = np.zeros(self.shape[0], dtype = values.dtype)
+        values_row[self.row] = values
+        if (values_row[self.row] != values).any():
+            return None
+        return values_row
+
+    def row_dates(self, cross):
+        '''
+        Function to get the calendar date of the cells of each session, for the columns before (`cross = 0`) or after (`cross = 1`) midnight.
+
+        Args:
+            cross: 0 or 1.
+
+        Returns:
+            dates: DatetimeIndex with a date for each session.
+        '''
+        return pd.DatetimeIndex((self.days + cross).astype('datetime64[D]'))
+
+    def slot_labels(self):
+        '''
+        Function to get the (shifted) time of each column, formatted as '%H:%M:%S'.
+
+        Args: None.
+
+        Returns:
+            labels: Array of strings.
+        '''
+        seconds = self.slots//10**9
+        return np.array([f'{i//3600:02d}:{(i%3600)//60:02d}:{i%60:02d}' for i in seconds])
+
+    def reduce(self, field, labels, group_function):
+        '''
+        Function to reduce a field along sessions, separately for each group of sessions. Since calendar attributes may change at midnight, the
+        group of a session is given for the columns before and after midnight.
+
+        Args:
+            field: Field to reduce.
+            labels: Tuple of two integer arrays, with the group of each session before and after midnight.
+            group_function: 'Mean', 'Median', 'Sum', 'Cumsum', 'Count' or 'Std'.
+
+        Returns:
+            groups: Array of the groups.
+            result: Matrix (groups x time slots) of reduced values.
+            count: Matrix (groups x time slots) with the number of bars of each cell.
+        '''
+        groups = np.unique(np.concatenate(labels))
+        result = np.full((groups.shape[0], self.shape[1]), np.nan)
+        count = np.zeros((groups.shape[0], self.shape[1]), dtype = np.int64)
+        for cross in [0, 1]:
+            cols = np.flatnonzero(self.cross == cross)
+            if cols.shape[0] == 0:
+                continue
+            # sort sessions by group, so that each group is a contiguous block of rows
+            order = np.argsort(labels[cross], kind = 'stable')
+            labels_sorted = labels[cross][order]
+            offsets = segment_offsets(labels_sorted)
+            rows_group = np.searchsorted(groups, labels_sorted[offsets[:-1]])
+            result[np.ix_(rows_group, cols)] = _reduce_blocks(self.values[field][np.ix_(order, cols)], offsets, group_function)
+            count[np.ix_(rows_group, cols)] = np.add.reduceat(self.present[np.ix_(order, cols)], offsets[:-1], axis = 0)
+        # cumulative sum of the means along time (missing means are skipped)
+        if group_function == 'Cumsum':
+            result = np.where(np.isnan(result), np.nan, np.cumsum(np.nan_to_num(result), axis = 1))
+        return groups, result, count
+
+    def quantile(self, field, labels, list_q, compression = 200):
+        '''
+        Function to estimate quantiles of a field for each group of sessions and time slot, using mergeable quantile sketches.
+
+        Args:
+            field: Field whose quantiles are estimated.
+            labels: Tuple of two integer arrays, with the group of each session before and after midnight.
+            list_q: List of quantiles (between 0 and 1).
+            compression: Compression parameter of the sketches.
+
+        Returns:
+            groups: Array of the groups.
+            result: Array (groups x time slots x quantiles) of estimated quantiles.
+        '''
+        groups = np.unique(np.concatenate(labels))
+        rows, cols = np.nonzero(self.present)
+        # one sketch for each cell of the grouped matrix
+        label_cell = np.where(self.cross[cols] == 1, labels[1][rows], labels[0][rows])
+        key = np.searchsorted(groups, label_cell)*self.shape[1] + cols
+        keys, values = QuantileSketch.from_values(key, self.values[field][rows, cols], compression).quantile(list_q)
+        result = np.full((groups.shape[0]*self.shape[1], len(list_q)), np.nan)
+        result[keys] = values
+        return groups, result.reshape(groups.shape[0], self.shape[1], len(list_q))
+
+    def bootstrap(self, field, labels, group_function, level = 0.95, n_boot = 1000, seed = 0, n_jobs = None):
+        '''
+        Function to compute bootstrap confidence intervals of the reduction of a field, resampling the sessions of each group.
+
+        Args:
+            field: Field to reduce.
+            labels: Tuple of two integer arrays, with the group of each session before and after midnight.
+            group_function: 'Mean', 'Sum' or 'Cumsum'.
+            level: Confidence level.
+            n_boot: Number of replicates.
+            seed: Seed of the random generator.
+            n_jobs: Number of processes (by default, the number of CPUs).
+
+        Returns:
+            groups: Array of the groups.
+            lower: Matrix (groups x time slots) of lower bounds.
+            upper: Matrix (groups x time slots) of upper bounds.
+        '''
+        groups = np.unique(np.concatenate(labels))
+        list_groups = []
+        for group in groups:
+            include = np.column_stack((labels[0] == group, labels[1] == group))
+            rows = np.flatnonzero(include.any(axis = 1))
+            list_groups.append((rows, include[rows]))
+        lower, upper = bootstrap_ci(self.values[field], self.cross, list_groups, group_function, level, n_boot, seed, n_jobs)
+        return groups, lower, upper
+
+    def _to_matrix(self, values):
+        '''
+        Function to place the values of the bars in their cells.
+        '''
+        matrix = np.full(self.shape, np.nan)
+        matrix[self.row, self.col] = values
+        return matrix
+
+def get_cached(key):
+    '''
+    Function to get the session layout of bars computed by a previous request of the process.
+
+    Args:
+        key: Key of the bars.
+
+    Returns:
+        matrix: Instance of `SessionMatrix` (`None` if not found).
+    '''
+    if key not in _cached:
+        return None
+    # mark the entry as recently used
+    _cached[key] = _cached.pop(key)
+    return _cached[key]
+
+def put_cached(key, matrix, max_bytes = MAX_CACHED_BYTES):
+    '''
+    Function to keep the session layout of bars for the next requests of the process, removing the least recently used entries so that the
+    cached layouts take at most `max_bytes`. Fields are not kept.
+
+    Args:
+        key: Key of the bars.
+        matrix: Instance of `SessionMatrix`.
+        max_bytes: Maximum size of the cached layouts, in bytes.
+
+    Returns: None.
+    '''
+    _cached.pop(key, None)
+    matrix = matrix.with_fields({})
+    if matrix.nbytes > max_bytes:
+        return
+    _cached[key] = matrix
+    while sum([entry.nbytes for entry in _cached.values()]) > max_bytes:
+        _cached.pop(next(iter(_cached)))
+
+def _reduce_blocks(matrix, offsets, group_function):
+    '''
+    Function to reduce contiguous blocks of rows of a matrix, ignoring NaN.
+    '''
+    valid = ~np.isnan(matrix)
+    n_valid = np.add.reduceat(valid, offsets[:-1], axis = 0)
+    total = np.add.reduceat(np.where(valid, matrix, 0), offsets[:-1], axis = 0)
+    with np.errstate(invalid = 'ignore', divide = 'ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', category = RuntimeWarning)
+        if group_function == 'Count':
+            return n_valid
+        if group_function == 'Sum':
+            return total
+        # exact medians (sketches are used only for percentile bands)
+        if group_function == 'Median':
+            return np.vstack([np.nanmedian(matrix[i:j], axis = 0) for i, j in zip(offsets[:-1], offsets[1:])])
+        mean = total/n_valid
+        if group_function in ['Mean', 'Cumsum']:
+            return mean
+        if group_function == 'Std':
+            dev = np.where(valid, matrix - np.repeat(mean, np.diff(offsets), axis = 0), 0)
+            # cells with fewer than two values have no standard deviation, as in `pandas`
+            return np.where(n_valid > 1, np.sqrt(np.add.reduceat(dev**2, offsets[:-1], axis = 0)/(n_valid - 1)), np.nan)
@@ -0,0 +1,155 @@
+import json
+import os
+
+# file with the trading sessions of the instruments
+PATH_REGISTRY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sessions.json')
+# step, in minutes, of the options of the time slider
+MINUTES_STEP_SLIDER = 5
+MINUTES_PER_DAY = 1440
+
+# registry loaded by this process: {instrument: session}
+_registry = None
+
+def to_minutes(text):
+    '''
+    Function to convert a time of the day to minutes after midnight.
+
+    Args:
+        text: Time ('%H:%M:%S').
+
+    Returns:
+        minutes: Number of minutes.
+    '''
+    hours, minutes = text.split(':')[:2]
+    return int(hours)*60 + int(minutes)
+
+def to_time(minutes):
+    '''
+    Function to convert minutes after midnight (possibly of the next day) to a time of the day.
+
+    Args:
+        minutes: Number of minutes.
+
+    Returns:
+        text: Time ('%H:%M:%S').
+    '''
+    minutes = minutes%MINUTES_PER_DAY
+    return f'{minutes//60:02d}:{minutes%60:02d}:00'
+
+class Session:
+    def __init__(self, instrument, session, rth = None, settlement = None, regions = [], listed = True, tick = None):
+        '''
+        Trading hours of an instrument, as minutes after midnight, with the options of the time slider and the regions (e.g., Asian, European
+        and American sessions) highlighted on plots computed once.
+
+        Args:
+            instrument: Instrument name.
+            session: List with session opening and closing times ('%H:%M:%S').
+            rth: List with opening and closing times of regular trading hours (`None` if not defined).
+            settlement: Settlement time (`None` if not defined).
+            regions: List of dictionaries with keys 'label', 'color', 'start' and 'end' (times).
+            listed: Whether the instrument is shown in the dashboard.
+            tick: Tick size, in points (`None` if not defined: it is then inferred from prices).
+        '''
+        self.instrument = instrument
+        self.minutes_open, self.minutes_close = [to_minutes(i) for i in session]
+        self.sess_start, self.sess_end = [to_time(i) for i in [self.minutes_open, self.minutes_close]]
+        # times of the bars are shifted by the whole hours of the session opening, so that sessions begin at 00:xx:00
+        self.minutes_shift = self.minutes_open - self.minutes_open%60
+        self.minutes_rth = None if rth is None else [to_minutes(i) for i in rth]
+        self.rth = None if rth is None else [to_time(i) for i in self.minutes_rth]
+        self.minutes_settlement = None if settlement is None else to_minutes(settlement)
+        self.settlement = None if settlement is None else to_time(self.minutes_settlement)
+        self.listed = listed
+        self.tick = tick
+        #
+        self.time_options = self._get_time_options()
+        self.regions = [(region['label'], region['color'], to_minutes(region['start']), to_minutes(region['end']),
+                         _get_middle(to_minutes(region['start']), to_minutes(region['end']))) for region in regions]
+        self.rth_middle = None if rth is None else _get_middle(*self.minutes_rth)
+
+    def _get_time_options(self):
+        '''
+        Function to get the options of the time slider: every `MINUTES_STEP_SLIDER` minutes from session opening to session closing.
+        '''
+        minutes_end = self.minutes_close if self.minutes_close > self.minutes_open else self.minutes_close + MINUTES_PER_DAY
+        time_options = [to_time(i) for i in range(self.minutes_open, minutes_end + 1, MINUTES_STEP_SLIDER)]
+        # sessions closing at midnight include the last second of the day
+        if self.sess_end == '23:59:00':
+            time_options.append('23:59:59')
+        return time_options
+
+    def get_position(self, minutes):
+        '''
+        Function to get the position of a time in the session, in minutes after session opening.
+
+        Args:
+            minutes: Time, as minutes after midnight (scalar or array).
+
+        Returns:
+            position: Minutes after session opening.
+        '''
+        return (minutes - self.minutes_open)%MINUTES_PER_DAY
+
+def _get_middle(minutes_start, minutes_end):
+    '''
+    Function to get the time in the middle of two times, which can be on different days.
+    '''
+    return (minutes_start + ((minutes_end - minutes_start)%MINUTES_PER_DAY)//2)%MINUTES_PER_DAY
+
+def load_registry(path = PATH_REGISTRY):
+    '''
+    Function to read the trading sessions of the instruments. Sessions sharing the same regions (e.g., the CME Globex sessions) refer to them by
+    name.
+
+    Args:
+        path: File path.
+
+    Returns:
+        registry: Dictionary with the instance of `Session` of each instrument.
+    '''
+    with open(path) as file:
+        content = json.load(file)
+    registry = {}
+    for instrument, entry in content['instruments'].items():
+        entry = dict(entry)
+        entry['regions'] = content['regions'][entry['regions']] if 'regions' in entry else []
+        registry[instrument] = Session(instrument, **entry)
+    return registry
+
+def get_registry():
+    '''
+    Function to get the trading sessions of the instruments, read once per process.
+
+    Args: None.
+
+    Returns:
+        registry: Dictionary with the instance of `Session` of each instrument.
+    '''
+    global _registry
+    if _registry is None:
+        _registry = load_registry()
+    return _registry
+
+def get_session(instrument):
+    '''
+    Function to get the trading session of an instrument.
+
+    Args:
+        instrument: Instrument name.
+
+    Returns:
+        session: Instance of `Session`.
+    '''
+    return get_registry()[instrument]
+
+def list_instruments():
+    '''
+    Function to list the instruments shown in the dashboard.
+
+    Args: None.
+
+    Returns:
+        list_instr: List of instrument names.
+    '''
+    return [instrument for instrument, session in get_registry().items() if session.listed]
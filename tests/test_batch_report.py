@@ -0,0 +1,34 @@
+import datetime
+import json
+import pytest
+import batch_report
+from batch_report import ParameterSidebar
+
+def test_sidebar_values_and_defaults():
+    sidebar = ParameterSidebar({'Group by': 'Time', 'Date range': ['2015-01-01', '2020-12-31'], 'Rolling window': 50, 'Percentile bands': [10, 90]})
+    assert sidebar.radio(label = 'Timeframe:', options = ['1m', '5m']) == '1m'
+    assert sidebar.radio(label = 'Group by:', options = [None, 'Time']) == 'Time'
+    start, end = datetime.datetime(2010, 1, 1), datetime.datetime(2024, 12, 31)
+    assert sidebar.slider(label = 'Date range', min_value = start, max_value = end, value = [start, end]) == [datetime.datetime(2015, 1, 1),
+                                                                                                         datetime.datetime(2020, 12, 31)]
+    assert sidebar.number_input(label = 'Rolling window:', min_value = 2, max_value = 5000, value = 20) == 50
+    assert sidebar.multiselect(label = 'Percentile bands:', options = [5, 10, 25, 75, 90, 95]) == [10, 90]
+    sidebar.check_unused()
+
+def test_sidebar_checks():
+    with pytest.raises(ValueError, match = 'not an option'):
+        ParameterSidebar({'Metric': 'Rnage'}).radio(label = 'Metric:', options = ['Close', 'Range'])
+    with pytest.raises(ValueError, match = 'out of the range'):
+        ParameterSidebar({'Rolling window': 1}).number_input(label = 'Rolling window:', min_value = 2, max_value = 5000, value = 20)
+    with pytest.raises(ValueError, match = 'not used'):
+        ParameterSidebar({'Event': 'Settlement'}).check_unused()
+
+def test_read_jobs(tmp_path):
+    path = tmp_path / 'jobs.json'
+    path.write_text(json.dumps({'reports': [{'name': 'ranges', 'params': {'Timeframe': '5m'},
+                                             'grid': {'Instrument': ['ES', 'NQ'], 'Group by': ['Time', 'Day of week + time']}},
+                                            {'name': 'single', 'params': {'Instrument': 'ES'}}]}))
+    list_jobs = batch_report.read_jobs(path)
+    assert [job['name'] for job in list_jobs] == ['ranges_ES_Time', 'ranges_ES_Day-of-week-time', 'ranges_NQ_Time', 'ranges_NQ_Day-of-week-time',
+                                                  'single']
+    assert list_jobs[1]['params'] == {'Timeframe': '5m', 'Instrument': 'ES', 'Group by': 'Day of week + time'}
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from bootstrap import bootstrap_ci
+
+@pytest.fixture
+def profile():
+    rng = np.random.default_rng(0)
+    values = rng.normal(loc = 1, scale = 2, size = (400, 12))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    cross = np.array([0]*8 + [1]*4)
+    # two groups of sessions, one changing after midnight
+    include = np.ones((400, 2), dtype = bool)
+    include_after = include.copy()
+    include_after[::3, 1] = False
+    list_groups = [(np.arange(400), include), (np.arange(0, 400, 2), include_after[::2])]
+    return values, cross, list_groups
+
+@pytest.mark.parametrize('group_function', ['Mean', 'Sum', 'Cumsum'])
+def test_independent_of_processes(profile, group_function):
+    values, cross, list_groups = profile
+    lower, upper = bootstrap_ci(values, cross, list_groups, group_function, n_boot = 300, n_jobs = 1)
+    lower_pool, upper_pool = bootstrap_ci(values, cross, list_groups, group_function, n_boot = 300, n_jobs = 3, min_parallel = 0)
+    np.testing.assert_array_equal(lower, lower_pool)
+    np.testing.assert_array_equal(upper, upper_pool)
+
+def test_width_matches_standard_error(profile):
+    values, cross, list_groups = profile
+    lower, upper = bootstrap_ci(values, cross, list_groups[:1], 'Mean', level = 0.95, n_boot = 2000)
+    # normal approximation of the interval of the mean
+    standard_error = np.nanstd(values, axis = 0, ddof = 1)/np.sqrt((~np.isnan(values)).sum(axis = 0))
+    ratio = (upper[0] - lower[0])/(2*1.96*standard_error)
+    assert (np.abs(ratio - 1) < 0.15).all()
+    mean = np.nanmean(values, axis = 0)
+    assert ((lower[0] < mean) & (mean < upper[0])).all()
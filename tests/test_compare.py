@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+import compare
+
+@pytest.fixture
+def profiles():
+    '''
+    Profiles of instruments on misaligned grids (different sessions and missing points), in two groups of similar shapes.
+    '''
+    rng = np.random.default_rng(0)
+    grid = pd.Index([f'{i//60:02d}:{i%60:02d}:00' for i in range(0, 1440, 15)])
+    base = [np.sin(np.arange(grid.shape[0])/10), np.cos(np.arange(grid.shape[0])/7)]
+    dict_profiles = {}
+    for i in range(6):
+        values = base[i%2]*(1 + i) + rng.normal(scale = 0.3, size = grid.shape[0])
+        keep = rng.random(grid.shape[0]) < 0.8
+        keep[:10*i] = False
+        dict_profiles[f'X{i}'] = pd.Series(values[keep], index = grid[keep])
+    # an instrument with too few points in common with the others
+    dict_profiles['X6'] = pd.Series([1.0, 2.0, 3.0], index = grid[:3])
+    return dict_profiles
+
+def test_correlation_equals_pandas(profiles):
+    corr, n_points = compare.correlation_matrix(profiles)
+    df = pd.DataFrame(profiles)
+    np.testing.assert_allclose(corr, df.corr(min_periods = 10).values, atol = 1e-12, equal_nan = True)
+    valid = df.notnull().values.astype(int)
+    np.testing.assert_array_equal(n_points, valid.T@valid)
+
+def test_cluster_order_groups_similar_profiles(profiles):
+    del profiles['X6']
+    corr, _ = compare.correlation_matrix(profiles)
+    order = compare.cluster_order(corr)
+    assert sorted(order) == list(range(6))
+    # instruments of the same group are contiguous (on the circle of angles)
+    groups = np.array([i%2 for i in order])
+    assert (groups != np.roll(groups, 1)).sum() == 2
+    np.testing.assert_array_equal(compare.cluster_order(corr[:2, :2]), [0, 1])
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from time_index import TimeIndex
+from test_session_matrix import make_bars, make_dashboard
+
+@pytest.fixture
+def board():
+    df, session = make_bars('17:00:00', '16:00:00', n_days = 140)
+    df['n_sess'] = df['session_start'].cumsum() - 1
+    df = df[df['n_sess'] >= 0].reset_index(drop = True)
+    board = make_dashboard(df, session, group_by = 'Profile', profile = ['Volume', 'Absolute', 'Session'], group_function = 'Sum',
+                           timeframe = '60m', split_in_periods = 'No', n_metrics = 1, plot_tops_bottoms = 'No', max_rows = 250000,
+                           date_start = '2019-01-01', date_end = '2021-01-01', filt_month = [], filt_day_month = [], filt_day_week = [],
+                           filter_time = [None, None])
+    board.index = TimeIndex.from_frame(df[['date', 'n_sess']])
+    return board
+
+def test_session_profiles_keep_their_levels(board):
+    board._group_data()
+    n_rows = board.df.shape[0]
+    board._fix_missing_dates()
+    # no session is filled with the levels of the others
+    assert board.df.shape[0] == n_rows
+    assert (board.df.groupby('session')['price'].nunique() < board.df['price'].nunique()).all()
+
+def test_estimate_counts_all_session_points(board):
+    estimate = board._estimate_cost('60m')
+    board._group_data()
+    # levels of calendar days approximate the ones of sessions
+    assert estimate['total_points'] <= estimate['points']*estimate['breakdowns']
+    assert 0.8 < estimate['total_points']/board.df.shape[0] < 1.3
+    # downsampling applies to the points of all the sessions
+    board.max_rows = board.df.shape[0]//4
+    board._fix_missing_dates()
+    board._downsample()
+    # one level every `step` is kept, so sessions keep about `1/step` of their levels
+    assert board.df.shape[0] < 1.1*board.max_rows
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import pandas as pd
+import pytest
+import data_store
+import ingest
+from test_ingest import SESS_START, make_bars, write_instrument
+
+@pytest.fixture
+def path_shared(tmp_path, monkeypatch):
+    path_shared = tmp_path/'shared'
+    monkeypatch.setenv('DASHBOARD_SHARED_DIR', str(path_shared))
+    monkeypatch.setattr(data_store, '_attached', {})
+    monkeypatch.setattr(data_store, '_metadata', {})
+    return path_shared
+
+def list_versions(path_shared):
+    return sorted([name for name in os.listdir(path_shared) if not name.startswith('.')])
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+def test_attach_release_cleanup(tmp_path, path_shared):
+    path_data = tmp_path/'data'
+    write_instrument(make_bars(n_days = 3), path_data)
+    df, index = data_store.attach('XX', str(path_data))
+    pd.testing.assert_frame_equal(df.copy(), data_store.read_instrument('XX', str(path_data)), check_index_type = False)
+    assert index.timestamps.shape[0] == df.shape[0]
+    # attaching again reuses the mapped data, with a single reference
+    df_again, _ = data_store.attach('XX', str(path_data))
+    assert df_again is df
+    [name] = list_versions(path_shared)
+    assert os.listdir(path_shared/name/'refs') == [str(os.getpid())]
+    # data referenced by another live process is kept
+    open(path_shared/name/'refs'/str(os.getppid()), 'w').close()
+    data_store.release('XX')
+    assert list_versions(path_shared) == [name]
+    assert data_store.cleanup() == []
+    # once no live process references it, data is removed
+    os.replace(path_shared/name/'refs'/str(os.getppid()), path_shared/name/'refs'/str(dead_pid()))
+    assert data_store.cleanup() == [str(path_shared/name)]
+    assert list_versions(path_shared) == []
+
+def test_new_version_supersedes(tmp_path, path_shared):
+    path_data = tmp_path/'data'
+    bars = make_bars(n_days = 4)
+    n_base = bars.shape[0]//2
+    write_instrument(bars.iloc[:n_base], path_data)
+    df, _ = data_store.attach('XX', str(path_data))
+    [name_old] = list_versions(path_shared)
+    ingest.append_bars('XX', bars.iloc[n_base:].drop('session_start', axis = 1), SESS_START, str(path_data))
+    df_new, _ = data_store.attach('XX', str(path_data))
+    assert df_new.shape[0] > df.shape[0]
+    pd.testing.assert_frame_equal(df_new.copy(), data_store.read_instrument('XX', str(path_data)), check_index_type = False)
+    # the previous version is no longer referenced by this process
+    [name_new] = list_versions(path_shared)
+    assert name_new != name_old
+    data_store.release('XX')
+    assert list_versions(path_shared) == []
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import event_study
+import session_registry
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(0)
+    # 5-minute bars of sessions opening at 17:00 and closing at 16:00, with missing bars
+    minutes = np.concatenate([day*1440 + 17*60 + np.arange(0, 23*60, 5) for day in range(20)])
+    minutes = minutes[rng.random(minutes.shape[0]) > 0.1]
+    ts = minutes.astype(np.int64)*60*10**9
+    n_sess = (minutes - 17*60)//1440
+    values = rng.normal(0, 1, ts.shape[0])
+    return ts, n_sess, values
+
+def test_anchor_minutes():
+    session = session_registry.Session('ES', ['17:00:00', '16:00:00'], rth = ['08:30:00', '15:15:00'], settlement = '15:00:00')
+    assert event_study.list_anchors(session) == event_study.LIST_ANCHORS
+    assert [event_study.get_anchor_minutes(session, anchor, '09:00:00') for anchor in event_study.LIST_ANCHORS] == [900, 510, 915, 1020, 960, 540]
+    assert event_study.list_anchors(session_registry.Session('BTCUSD', ['00:00:00', '23:59:00'])) == ['Session start', 'Session end', 'Custom time']
+
+@pytest.mark.parametrize('minutes_anchor, n_before, n_after', [(15*60, 6, 12), (16*60, 3, 20), (17*60, 12, 0)])
+def test_windows_equal_brute_force(bars, minutes_anchor, n_before, n_after):
+    ts, n_sess, values = bars
+    first = np.flatnonzero(np.diff(n_sess, prepend = -1) != 0)
+    ts_anchor = event_study.get_anchor_times(ts[first], 17*60, minutes_anchor)
+    [matrix], offsets = event_study.gather_windows(ts, [values], ts_anchor, n_before, n_after, 5)
+    np.testing.assert_array_equal(offsets, np.arange(-n_before, n_after + 1)*5)
+    for session, anchor in enumerate(ts_anchor):
+        # event of the session on the same (shifted) day as the session opening
+        assert (anchor - 17*3600*10**9)//(86400*10**9) == (ts[first[session]] - 17*3600*10**9)//(86400*10**9)
+        expected = np.full(n_before + n_after + 1, np.nan)
+        for j, offset in enumerate(offsets):
+            rows = np.flatnonzero(ts == anchor + offset*60*10**9)
+            if rows.shape[0] > 0:
+                expected[j] = values[rows[0]]
+        np.testing.assert_array_equal(matrix[session], expected)
+
+@pytest.mark.parametrize('group_function', ['Mean', 'Median', 'Sum', 'Cumsum', 'Count', 'Std'])
+def test_reduce_windows(group_function):
+    rng = np.random.default_rng(1)
+    matrix = rng.normal(0, 1, (30, 8))
+    matrix[rng.random(matrix.shape) < 0.2] = np.nan
+    labels = rng.integers(0, 3, 30)
+    result, count = event_study.reduce_windows(matrix, labels, 3, group_function)
+    for label in range(3):
+        block = matrix[labels == label]
+        expected = {'Mean': np.nanmean(block, axis = 0), 'Median': np.nanmedian(block, axis = 0), 'Sum': np.nansum(block, axis = 0),
+                    'Cumsum': np.cumsum(np.nanmean(block, axis = 0)), 'Count': (~np.isnan(block)).sum(axis = 0).astype(float),
+                    'Std': np.nanstd(block, axis = 0, ddof = 1)}[group_function]
+        np.testing.assert_allclose(result[label], expected, rtol = 1e-10)
+        np.testing.assert_array_equal(count[label], (~np.isnan(block)).sum(axis = 0))
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+import fast_groupby
+from time_index import format_dates, format_times, to_ns
+
+FUNCTIONS = ['mean', 'median', 'sum', 'count', 'std', 'max', 'min', 'first', 'last']
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(0)
+    n = 3000
+    date = pd.Timestamp('2020-01-05 17:00') + pd.to_timedelta(np.cumsum(rng.integers(1, 240, n)), unit = 'min')
+    df = pd.DataFrame({'date': date, 'session_start': rng.random(n) < 0.05, 'open': 3000 + rng.normal(0, 10, n),
+                       'bpv': 50.0, 'vol': rng.integers(1, 500, n)})
+    df.loc[rng.random(n) < 0.05, 'open'] = np.nan
+    df['metric'] = rng.normal(0, 1, n)
+    df['time'] = format_times(to_ns(df['date']) - 17*3600*10**9)
+    df['weekday'] = df['date'].dt.weekday.astype(str)
+    df['month'] = df['date'].dt.month.astype(str)
+    df['history'] = format_dates(df['date'])
+    return df
+
+def check(df, group_cols, dict_agg):
+    df_fast = fast_groupby.aggregate(df, group_cols, dict_agg)
+    assert df_fast is not None
+    pd.testing.assert_frame_equal(df_fast, df.groupby(group_cols).agg(dict_agg).reset_index(), rtol = 1e-9)
+
+@pytest.mark.parametrize('function', FUNCTIONS)
+@pytest.mark.parametrize('group_cols', ['history', ['weekday', 'history'], ['month', 'weekday', 'history']])
+def test_identity_equals_pandas(bars, group_cols, function):
+    check(bars, group_cols, {'metric': function, 'open': function, 'date': 'max', 'session_start': 'sum', 'bpv': 'first', 'vol': 'sum'})
+
+@pytest.mark.parametrize('function', ['mean', 'sum', 'count', 'std', 'max', 'min'])
+@pytest.mark.parametrize('group_cols', ['time', ['weekday', 'time'], ['month', 'weekday', 'time']])
+def test_dense_equals_pandas(bars, group_cols, function):
+    check(bars, group_cols, {'metric': function, 'open': function, 'date': 'max', 'session_start': 'sum', 'bpv': 'first', 'vol': 'sum'})
+
+def test_fallback(bars):
+    # medians of groups, first values with missing values and missing keys are left to pandas
+    assert fast_groupby.aggregate(bars, 'time', {'metric': 'median'}) is None
+    assert fast_groupby.aggregate(bars, 'time', {'open': 'first'}) is None
+    bars.loc[0, 'weekday'] = None
+    assert fast_groupby.aggregate(bars, ['weekday', 'time'], {'metric': 'mean'}) is None
+    assert fast_groupby.aggregate(bars.iloc[:0], 'time', {'metric': 'mean'}) is None
+
+@pytest.mark.parametrize('dates', [['2020-01-05 17:00:00', '1969-12-31 23:59:59', '2020-02-29 00:00:00'], ['2020-01-05', '2020-02-29'],
+                                   ['2020-01-05 17:00:00.5']])
+def test_format_equals_pandas(dates):
+    dates = pd.Series(pd.to_datetime(dates, format = 'ISO8601'))
+    assert format_dates(dates).tolist() == dates.astype(str).tolist()
+    assert format_times(to_ns(dates) - 3600*10**9).tolist() == (dates - pd.Timedelta(1, unit = 'h')).dt.time.astype(str).tolist()
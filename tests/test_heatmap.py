@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+from heatmap import grid_reduce, window_reduce
+
+@pytest.mark.parametrize('window', [1, 3, 10])
+@pytest.mark.parametrize('group_function', ['Mean', 'Sum', 'Cumsum', 'Count', 'Std'])
+def test_windows_equal_single_pass(window, group_function):
+    rng = np.random.default_rng(0)
+    n = 5000
+    periods, rows, cols = rng.integers(0, 6, n), rng.integers(0, 3, n), rng.integers(0, 20, n)
+    values = 100 + rng.normal(0, 1, n)
+    values[rng.random(n) < 0.1] = np.nan
+    result, count = window_reduce(periods, rows, cols, values, (3, 20), 6, window, group_function)
+    n_windows = max(6 - window + 1, 1)
+    assert result.shape == count.shape == (n_windows, 3, 20)
+    for i in range(n_windows):
+        keep = (periods >= i) & (periods < i + min(window, 6))
+        expected, expected_count = grid_reduce(rows[keep], cols[keep], values[keep], (3, 20), group_function)
+        np.testing.assert_allclose(result[i], expected, rtol = 1e-9)
+        np.testing.assert_array_equal(count[i], expected_count)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+import data_store
+import ingest
+
+SESS_START = '17:00:00'
+
+def make_bars(n_days = 8, seed = 0):
+    '''
+    Function to build synthetic 1-minute bars of a session from 17:00 to 16:00, skipping weekends.
+    '''
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2021-03-01 00:00', periods = n_days*1440, freq = 'min')
+    time = dates.hour*60 + dates.minute
+    dates = dates[((time <= 16*60) | (time > 17*60)) & (dates.weekday < 5)]
+    close = 4000 + np.cumsum(rng.normal(scale = 0.25, size = dates.shape[0])).round(2)
+    df = pd.DataFrame({'date': dates, 'open': close - 0.25, 'high': close + 0.5, 'low': close - 0.5, 'close': close, 'bpv': 50.0,
+                       'vol': rng.integers(1, 500, size = dates.shape[0])})
+    df.insert(1, 'session_start', ingest.flag_session_start(df['date'], SESS_START))
+    return df
+
+@pytest.fixture
+def bars():
+    return make_bars()
+
+def write_instrument(df, path_data, instrument = 'XX'):
+    path_data.mkdir(exist_ok = True)
+    df.to_pickle(data_store.get_data_file(instrument, str(path_data)))
+
+@pytest.mark.parametrize('max_segments', [50, 2])
+def test_incremental_equals_full(tmp_path, bars, max_segments):
+    # base data with the first days, then new bars appended in chunks (with compaction if `max_segments` is small)
+    n_base = bars.shape[0]//3
+    path_incremental = tmp_path/'incremental'
+    write_instrument(bars.iloc[:n_base], path_incremental)
+    df_new = bars.iloc[n_base:].drop('session_start', axis = 1)
+    for rows in np.array_split(np.arange(df_new.shape[0]), 7):
+        ingest.append_bars('XX', df_new.iloc[rows], SESS_START, str(path_incremental), max_segments)
+    path_full = tmp_path/'full'
+    write_instrument(bars, path_full)
+    #
+    df_incremental = data_store.read_instrument('XX', str(path_incremental))
+    df_full = data_store.read_instrument('XX', str(path_full))
+    pd.testing.assert_frame_equal(df_incremental, df_full)
+    dict_incremental = ingest.read_derived('XX', str(path_incremental))
+    dict_full = ingest.build_derived(df_full)
+    for name in dict_full.keys():
+        pd.testing.assert_frame_equal(dict_incremental[name], dict_full[name], check_dtype = False)
+    assert all(ingest.check_derived('XX', str(path_incremental)).values())
+
+def test_append_skips_ingested_bars(tmp_path, bars):
+    write_instrument(bars.iloc[:1000], tmp_path/'data')
+    n_rows = ingest.append_bars('XX', bars.iloc[500:1500].drop('session_start', axis = 1), SESS_START, str(tmp_path/'data'))
+    assert n_rows == 500
+    assert ingest.append_bars('XX', bars.iloc[:1500].drop('session_start', axis = 1), SESS_START, str(tmp_path/'data')) == 0
+
+def test_derived_rebuilt_when_data_rewritten(tmp_path, bars):
+    write_instrument(bars.iloc[:2000], tmp_path/'data')
+    ingest.read_derived('XX', str(tmp_path/'data'))
+    # data file rewritten without the ingestion
+    write_instrument(bars, tmp_path/'data')
+    dict_derived = ingest.read_derived('XX', str(tmp_path/'data'))
+    pd.testing.assert_frame_equal(dict_derived['sessions'], ingest.build_derived(data_store.read_instrument('XX', str(tmp_path/'data')))['sessions'])
+
+@pytest.mark.parametrize('max_segments', [50, 2])
+def test_metadata_written_by_append(tmp_path, bars, monkeypatch, max_segments):
+    path_data = str(tmp_path/'data')
+    write_instrument(bars.iloc[:2000], tmp_path/'data')
+    df_new = bars.iloc[2000:].drop('session_start', axis = 1)
+    for rows in np.array_split(np.arange(df_new.shape[0]), 5):
+        ingest.append_bars('XX', df_new.iloc[rows], SESS_START, path_data, max_segments)
+    metadata = data_store.compute_metadata(data_store.read_instrument('XX', path_data), data_store.data_version('XX', path_data))
+    assert data_store.read_metadata_file('XX', path_data) == metadata
+    # the dashboard reads it without decoding the data
+    monkeypatch.setattr(data_store, '_metadata', {})
+    monkeypatch.setattr(data_store, 'attach', None)
+    assert data_store.read_metadata('XX', path_data) == metadata
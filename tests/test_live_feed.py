@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+import ingest
+from live_feed import BarFeed, LiveSession, append_to_feed
+from test_ingest import SESS_START, make_bars
+
+def batch_metric(df_bars, metric, unit):
+    '''
+    Function to compute a metric on the bars of a session, as the batch computation does.
+    '''
+    if metric in ['Num highs', 'Num lows', 'Num highs or lows']:
+        values = np.zeros(df_bars.shape[0])
+        if metric != 'Num lows':
+            values[df_bars['high'].values.argmax()] += 1
+        if metric != 'Num highs':
+            values[df_bars['low'].values.argmin()] += 1
+        return values
+    values = {'Close': df_bars['close'], 'Delta close': df_bars['close'].diff().fillna(0), 'Body': df_bars['close'] - df_bars['open'],
+              'Range': df_bars['high'] - df_bars['low'], 'Open-high': df_bars['high'] - df_bars['open'],
+              'Open-low': df_bars['open'] - df_bars['low'], 'Volume': df_bars['vol'].astype(float)}[metric].values
+    return values*df_bars['bpv'].values if (unit == '$') and (metric != 'Volume') else values
+
+def test_feed_partial_lines(tmp_path):
+    path_feed = str(tmp_path/'feed.csv')
+    feed = BarFeed(path_feed)
+    assert feed.read_new().shape[0] == 0
+    bars = make_bars(n_days = 1)
+    append_to_feed(path_feed, bars.iloc[:3])
+    # a line being written is read once it is complete
+    with open(path_feed, 'a') as file:
+        file.write('2021-03-01 00:04:00,4000.0')
+    df = feed.read_new()
+    pd.testing.assert_series_equal(df['date'], bars['date'].iloc[:3], check_names = False)
+    with open(path_feed, 'a') as file:
+        file.write(',4001.0,3999.0,4000.5,50.0,10\n')
+    df = feed.read_new()
+    assert (df.shape[0] == 1) and (df['date'].iloc[0] == pd.Timestamp('2021-03-01 00:04:00')) and (df['vol'].iloc[0] == 10)
+    assert feed.read_new().shape[0] == 0
+
+@pytest.mark.parametrize('metric', ['Close', 'Delta close', 'Body', 'Range', 'Open-high', 'Open-low', 'Num highs', 'Num lows',
+                                    'Num highs or lows', 'Volume'])
+@pytest.mark.parametrize('unit', ['points', '$'])
+def test_live_equals_batch(tmp_path, metric, unit):
+    bars = make_bars(n_days = 2, seed = 1)
+    columns = ['date', 'open', 'high', 'low', 'close', 'bpv', 'vol']
+    text = bars[columns].to_csv(index = False)
+    path_feed = str(tmp_path/'feed.csv')
+    feed = BarFeed(path_feed)
+    live = LiveSession(SESS_START, '5m', metric, unit)
+    # the producer writes chunks cut at any byte (also within lines), across session changes
+    cuts = np.sort(np.random.default_rng(2).choice(len(text), 120, replace = False))
+    list_dates = []
+    for start, end in zip(np.concatenate(([0], cuts)), np.concatenate((cuts, [len(text)]))):
+        with open(path_feed, 'a') as file:
+            file.write(text[start:end])
+        df_new = feed.read_new()
+        if df_new.shape[0] > 0:
+            list_dates.append(df_new['date'])
+        live.update(df_new)
+    pd.testing.assert_series_equal(pd.concat(list_dates, ignore_index = True), bars['date'], check_names = False)
+    # state of the last session
+    bars['n_sess'] = np.cumsum(bars['session_start'].values)
+    df_bars = ingest.aggregate_bars(bars[bars['n_sess'] == bars['n_sess'].iloc[-1]], '5m')
+    df_live = live.to_frame()
+    np.testing.assert_array_equal(df_live['date'].values, df_bars['date'].values)
+    expected = batch_metric(df_bars, metric, unit)
+    np.testing.assert_allclose(df_live['metric'].values, expected, atol = 1e-9)
+    np.testing.assert_allclose(df_live['cumsum'].values, np.cumsum(expected), atol = 1e-6)
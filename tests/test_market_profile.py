@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+import market_profile
+
+@pytest.mark.parametrize('spread', [True, False])
+def test_profile_equals_brute_force(spread):
+    rng = np.random.default_rng(0)
+    n = 3000
+    low = 16000 + np.cumsum(rng.integers(-3, 4, n))
+    high = low + rng.integers(0, 6, n)
+    labels = rng.integers(0, 5, n)
+    labels[labels == 3] = 4
+    weights = rng.integers(1, 500, n).astype(float)
+    levels, groups, profile = market_profile.bin_profile(low, high, labels, 6, weights, spread)
+    expected = {}
+    for i in range(n):
+        for level in range(low[i], high[i] + 1):
+            key = (labels[i], level)
+            expected[key] = expected.get(key, 0) + (weights[i]/(high[i] - low[i] + 1) if spread else weights[i])
+    assert sorted(zip(groups.tolist(), levels.tolist())) == list(zip(groups.tolist(), levels.tolist())) == sorted(expected.keys())
+    np.testing.assert_allclose(profile, [expected[key] for key in zip(groups, levels)], rtol = 1e-9)
+
+def test_ticks():
+    prices = np.array([4000.25, 4000.5, 4000.5, 3999.75, 4001.0]) + 1e-12
+    assert market_profile.infer_tick(prices) == 0.25
+    assert market_profile.infer_tick(np.full(10, 1.5)) is None
+    np.testing.assert_array_equal(market_profile.price_levels(prices, 0.25), [16001, 16002, 16002, 15999, 16004])
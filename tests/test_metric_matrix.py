@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from metric_matrix import LIST_METRICS, LIST_METRICS_POINTS, compute_metric_matrix, get_column
+from test_ingest import make_bars
+
+def define_metric(df, metric, intraday):
+    '''
+    Function to compute a metric bar by bar with `pandas`, as the dashboard did before the metric matrix.
+    '''
+    df = df.copy()
+    if metric == 'Close':
+        return df['close'].values
+    if metric == 'Delta close':
+        delta = df['close'] - df['close'].shift(1)
+        # set `delta` to 0 when the session changes
+        if intraday:
+            delta[df['n_sess'] != df['n_sess'].shift(1)] = 0
+        return delta.values
+    if metric in ['Body', 'Range', 'Open-high', 'Open-low']:
+        return {'Body': df['close'] - df['open'], 'Range': df['high'] - df['low'], 'Open-high': df['high'] - df['open'],
+                'Open-low': df['open'] - df['low']}[metric].values
+    if metric == 'Volume':
+        return df['vol'].values
+    # highs/lows of each calendar day
+    df['date_temp'] = df['date'].dt.date
+    df['high_sess'], df['low_sess'] = 0, 0
+    df.loc[df.groupby('date_temp').agg({'high': 'idxmax'})['high'].values, 'high_sess'] = 1
+    df.loc[df.groupby('date_temp').agg({'low': 'idxmin'})['low'].values, 'low_sess'] = 1
+    return {'Num highs': df['high_sess'], 'Num lows': df['low_sess'], 'Num highs or lows': df['high_sess'] + df['low_sess']}[metric].values
+
+@pytest.fixture
+def bars():
+    df = make_bars(n_days = 6)
+    df['n_sess'] = np.cumsum(df['session_start'].values) - 1.0
+    df['bpv'] = np.where(df['date'] < pd.Timestamp('2021-03-04'), 50.0, 20.0)
+    # missing highs and lows in some bars
+    df.loc[df.index[100:110], 'high'] = np.nan
+    df.loc[df.index[2000:2003], 'low'] = np.nan
+    return df
+
+@pytest.mark.parametrize('intraday', [True, False])
+def test_matrix_equals_define_metric(bars, intraday):
+    matrix = compute_metric_matrix(bars, intraday)
+    for metric in LIST_METRICS:
+        expected = define_metric(bars, metric, intraday).astype(float)
+        np.testing.assert_allclose(matrix[:, get_column(metric, 'points')], expected, rtol = 1e-6, equal_nan = True)
+        if metric in LIST_METRICS_POINTS:
+            expected = expected*bars['bpv'].values
+        np.testing.assert_allclose(matrix[:, get_column(metric, '$')], expected, rtol = 1e-6, equal_nan = True)
+
+def test_day_without_highs(bars):
+    # the highs of the last day are all missing: no bar of the frame is flagged
+    last_day = bars['date'].dt.date == bars['date'].dt.date.iloc[-1]
+    bars.loc[last_day, 'high'] = np.nan
+    matrix = compute_metric_matrix(bars, True)
+    num_highs = matrix[:, get_column('Num highs', 'points')]
+    assert (num_highs[last_day.values] == 0).all()
+    assert num_highs[~last_day.values].sum() == bars.loc[~last_day, 'date'].dt.date.nunique()
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from quantile_sketch import QuantileSketch, window_quantile
+
+LIST_Q = [0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99]
+
+def rank_error(values, estimates, list_q):
+    '''
+    Function to compute the largest distance between the target quantiles and the ranks of the estimates among the values.
+    '''
+    values = np.sort(values)
+    ranks = np.searchsorted(values, estimates)/values.shape[0]
+    return np.abs(ranks - np.array(list_q)).max()
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    groups = np.repeat(np.arange(5), 20000)
+    # heavy-tailed values, as bar ranges and returns
+    values = rng.standard_t(3, size = groups.shape[0])*(groups + 1)
+    return groups, values
+
+def test_exact_with_few_values():
+    rng = np.random.default_rng(1)
+    groups = rng.integers(0, 10, size = 500)
+    values = rng.normal(size = 500)
+    values[::17] = np.nan
+    result_groups, result = QuantileSketch.from_values(groups, values).quantile(LIST_Q)
+    for i, group in enumerate(result_groups):
+        values_group = values[(groups == group) & ~np.isnan(values)]
+        np.testing.assert_allclose(result[i], np.quantile(values_group, LIST_Q))
+
+def test_rank_error(data):
+    groups, values = data
+    sketch = QuantileSketch.from_values(groups, values)
+    result_groups, result = sketch.quantile(LIST_Q)
+    np.testing.assert_array_equal(result_groups, np.arange(5))
+    for i in range(5):
+        assert rank_error(values[groups == i], result[i], LIST_Q) < 0.002
+    # the sketches are much smaller than the values
+    assert sketch.nbytes < values.nbytes/10
+
+def test_merge_equals_single_build(data):
+    groups, values = data
+    chunks = np.arange(groups.shape[0])%7
+    sketch = QuantileSketch.from_values(groups, values)
+    sketch_merged = None
+    for chunk in range(7):
+        sketch_chunk = QuantileSketch.from_values(groups[chunks == chunk], values[chunks == chunk])
+        sketch_merged = sketch_chunk if sketch_merged is None else sketch_merged.merge(sketch_chunk)
+    # same groups and total weights, same accuracy
+    np.testing.assert_array_equal(np.unique(sketch_merged.groups), np.unique(sketch.groups))
+    np.testing.assert_allclose(np.bincount(sketch_merged.groups, sketch_merged.weights), np.bincount(sketch.groups, sketch.weights))
+    result_groups, result = sketch_merged.quantile(LIST_Q)
+    for i in range(5):
+        assert rank_error(values[groups == i], result[i], LIST_Q) < 0.002
+    np.testing.assert_allclose(result, sketch.quantile(LIST_Q)[1], rtol = 0.02, atol = 0.02)
+
+def test_merge_exact_with_few_values():
+    rng = np.random.default_rng(2)
+    groups = rng.integers(0, 4, size = 200)
+    values = rng.normal(size = 200)
+    sketch_merged = QuantileSketch.from_values(groups[:80], values[:80]).merge(QuantileSketch.from_values(groups[80:], values[80:]))
+    np.testing.assert_array_equal(sketch_merged.quantile(LIST_Q)[1], QuantileSketch.from_values(groups, values).quantile(LIST_Q)[1])
+
+def test_window_quantile_equals_exact():
+    rng = np.random.default_rng(3)
+    periods = rng.integers(0, 6, size = 240)
+    keys = rng.integers(0, 4, size = 240)
+    values = rng.normal(size = 240)
+    values[::23] = np.nan
+    result = window_quantile(periods, keys, values, 6, 4, 3, LIST_Q)
+    assert result.shape == (4, 4, len(LIST_Q))
+    for i in range(4):
+        for key in range(4):
+            values_cell = values[(periods >= i) & (periods < i + 3) & (keys == key) & ~np.isnan(values)]
+            np.testing.assert_allclose(result[i, key], np.quantile(values_cell, LIST_Q))
+
+def test_window_quantile_rank_error(data):
+    groups, values = data
+    periods = np.arange(groups.shape[0])%5
+    result = window_quantile(periods, groups, values, 5, 5, 2, LIST_Q)
+    for i in range(4):
+        for group in range(5):
+            mask = (groups == group) & (periods >= i) & (periods < i + 2)
+            assert rank_error(values[mask], result[i, group], LIST_Q) < 0.003
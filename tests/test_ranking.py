@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from ranking import top_bottom_k
+
+@pytest.mark.parametrize('n, k', [(10000, 15), (20, 15), (5, 3)])
+def test_top_bottom_k_equals_sort(n, k):
+    rng = np.random.default_rng(0)
+    values = rng.normal(0, 1, n)
+    values[rng.random(n) < 0.05] = np.nan
+    groups = rng.integers(0, 4, n)
+    list_top, list_bottom = top_bottom_k(values, groups, k)
+    for i in range(4):
+        rows = np.flatnonzero((groups == i) & ~np.isnan(values))
+        rows_sorted = rows[np.argsort(-values[rows])]
+        np.testing.assert_array_equal(list_top[i], rows_sorted[:k])
+        # lowest values are disjoint from the highest ones
+        np.testing.assert_array_equal(list_bottom[i], rows_sorted[k:][::-1][:k])
+
+def test_top_bottom_k_empty_group():
+    list_top, list_bottom = top_bottom_k(np.array([1.0, 2.0]), np.array([0, 2]), 5)
+    assert [rows.tolist() for rows in list_top] == [[0], [], [1]]
+    assert [rows.tolist() for rows in list_bottom] == [[], [], []]
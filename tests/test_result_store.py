@@ -0,0 +1,45 @@
+import os
+import numpy as np
+import pandas as pd
+from result_store import ResultStore
+
+def make_frame(seed):
+    return pd.DataFrame({'time': np.arange(100), 'value': np.random.default_rng(seed).normal(size = 100)})
+
+def test_put_get(tmp_path):
+    store = ResultStore(str(tmp_path))
+    key = store.make_key('ES', '1-2-0', {'metric': 'Range', 'group_by': ['time']})
+    assert key == store.make_key('ES', '1-2-0', {'group_by': ['time'], 'metric': 'Range'})
+    assert (not store.contains(key)) and (store.get(key) == (None, None))
+    store.put(key, make_frame(0), {'strategy': 'Full computation'})
+    df, attrs = store.get(key)
+    pd.testing.assert_frame_equal(df, make_frame(0))
+    assert attrs == {'strategy': 'Full computation'}
+
+def test_eviction_least_recently_used(tmp_path):
+    store = ResultStore(str(tmp_path))
+    keys = [store.make_key('ES', '1-2-0', {'metric': metric}) for metric in ['Close', 'Range', 'Volume', 'Body']]
+    for i, key in enumerate(keys[:3]):
+        store.put(key, make_frame(i), {})
+        # distinct modification times, from the oldest to the newest entry
+        os.utime(os.path.join(str(tmp_path), f'{key}.pickle'), ns = (10**18 + i*10**9, 10**18 + i*10**9))
+    size = os.path.getsize(os.path.join(str(tmp_path), f'{keys[0]}.pickle'))
+    # reading the oldest entry makes it the most recently used, so the second one is evicted
+    store.get(keys[0])
+    store.max_bytes = 3*size + size//2
+    store.put(keys[3], make_frame(3), {})
+    assert [store.contains(key) for key in keys] == [True, False, True, True]
+    # entries larger than the store are not kept
+    store.max_bytes = size//2
+    store.put(keys[1], make_frame(1), {})
+    assert os.listdir(str(tmp_path)) == []
+
+def test_new_version_drops_older_versions(tmp_path):
+    store = ResultStore(str(tmp_path))
+    key_old = store.make_key('ES', '1-2-0', {'metric': 'Range'})
+    key_other = store.make_key('NQ', '1-2-0', {'metric': 'Range'})
+    store.put(key_old, make_frame(0), {})
+    store.put(key_other, make_frame(1), {})
+    key_new = store.make_key('ES', '1-2-1', {'metric': 'Volume'})
+    store.put(key_new, make_frame(2), {})
+    assert [store.contains(key) for key in [key_old, key_other, key_new]] == [False, True, True]
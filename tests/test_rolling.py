@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+import rolling
+from time_index import segment_offsets
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(0)
+    # sessions of different lengths, prices far from zero, some missing values
+    n_sess = np.repeat(np.arange(40), rng.integers(5, 12, size = 40))
+    values = 3000 + np.cumsum(rng.normal(size = n_sess.shape[0]))
+    values[rng.random(n_sess.shape[0]) < 0.05] = np.nan
+    slots = np.concatenate([np.arange(i) for i in np.bincount(n_sess)])
+    dates = np.datetime64('2021-01-04') + np.unique(n_sess)*np.timedelta64(1, 'D')*7//5
+    return n_sess, values, slots, dates
+
+def reference(values, sessions, slots, starts, function, by_slot):
+    result = np.full(values.shape[0], np.nan)
+    for i in range(values.shape[0]):
+        window = (sessions >= starts[sessions[i]]) & (sessions <= sessions[i])
+        window &= (slots == slots[i]) if by_slot else (np.arange(values.shape[0]) <= i)
+        x = values[window]
+        x = x[~np.isnan(x)]
+        mean, std = x.mean(), (x.std(ddof = 1) if x.shape[0] > 1 else np.nan)
+        result[i] = {'Rolling mean': mean, 'Rolling std': std, 'Rolling z-score': (values[i] - mean)/std if std > 0 else np.nan}[function]
+    return result
+
+@pytest.mark.parametrize('function', rolling.LIST_ROLLING)
+@pytest.mark.parametrize('window, unit', [(5, 'Sessions'), (10, 'Days')])
+@pytest.mark.parametrize('by_slot', [False, True])
+def test_rolling_equals_direct(bars, function, window, unit, by_slot):
+    n_sess, values, slots, dates = bars
+    offsets = segment_offsets(n_sess)
+    starts = rolling.get_window_starts(dates, window, unit)
+    result = rolling.rolling_statistic(values, offsets, starts, function, slots if by_slot else None)
+    np.testing.assert_allclose(result, reference(values, n_sess, slots, starts, function, by_slot), rtol = 1e-9, atol = 1e-9)
+
+def test_window_starts_by_days():
+    dates = np.array(['2021-01-01', '2021-01-02', '2021-01-05', '2021-01-06'], dtype = 'datetime64[ns]')
+    np.testing.assert_array_equal(rolling.get_window_starts(dates, 3, 'Days'), [0, 0, 2, 2])
+    np.testing.assert_array_equal(rolling.get_window_starts(dates, 3, 'Sessions'), [0, 0, 0, 1])
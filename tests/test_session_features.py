@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+import session_features
+from test_ingest import make_bars, write_instrument
+
+@pytest.fixture
+def bars():
+    df = make_bars(n_days = 15)
+    df['n_sess'] = np.cumsum(df['session_start'].values) - 1.0
+    return df[df['n_sess'] >= 0].reset_index(drop = True)
+
+def test_features_equal_groupby(tmp_path, bars):
+    write_instrument(bars.drop('n_sess', axis = 1), tmp_path)
+    table = session_features.get_features('XX', str(tmp_path))
+    df_sessions = bars.groupby('n_sess').agg(open = ('open', 'first'), high = ('high', 'max'), low = ('low', 'min'), close = ('close', 'last'))
+    np.testing.assert_allclose(table['range'].values, (df_sessions['high'] - df_sessions['low']).values)
+    np.testing.assert_allclose(table['gap'].values[1:], (df_sessions['open'] - df_sessions['close'].shift(1)).values[1:])
+    np.testing.assert_allclose(table['prior_range'].values[1:], table['range'].values[:-1])
+    assert np.isnan(table['prior_change'].values[0])
+
+def test_conditions_select_sessions(tmp_path, bars):
+    write_instrument(bars.drop('n_sess', axis = 1), tmp_path)
+    table = session_features.get_features('XX', str(tmp_path))
+    conditions = session_features.parse_conditions('prior_range > 5 AND change >= 0 and range < prior_range')
+    mask = session_features.get_mask(table, conditions)
+    expected = (table['prior_range'] > 5) & (table['change'] >= 0) & (table['range'] < table['prior_range'])
+    np.testing.assert_array_equal(mask, expected.values)
+    keep = session_features.select_bars(bars['n_sess'].values, table, mask)
+    np.testing.assert_array_equal(keep, bars['n_sess'].isin(table['n_sess'][mask]).values)
+
+@pytest.mark.parametrize('text', ['range >', 'width > 3', 'gap > up', 'gap => 2'])
+def test_invalid_conditions(text):
+    with pytest.raises(ValueError):
+        session_features.parse_conditions(text)
+
+def test_empty_conditions():
+    assert session_features.parse_conditions('  ') == []
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+import dashboard
+import ingest
+from session_registry import Session
+
+def make_bars(sess_start, sess_end, n_days = 550, seed = 0):
+    '''
+    Function to build synthetic 60-minute bars (labelled by their close) with a metric, for the sessions of the weekdays from `sess_start` to
+    `sess_end`, which may cross midnight.
+    '''
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2019-11-04 01:00', periods = n_days*24, freq = '60min')
+    session = Session('XX', [sess_start, sess_end])
+    # minutes after session opening, and weekday of the session
+    minutes = (dates.hour*60 + dates.minute - session.minutes_open - 1)%1440 + 1
+    minutes_end = (session.minutes_close - session.minutes_open)%1440 or 1440
+    weekday = (dates - pd.Timedelta(minutes = session.minutes_open + 1)).weekday
+    dates = dates[(minutes <= minutes_end) & (weekday < 5)]
+    close = 4000 + np.cumsum(rng.normal(size = dates.shape[0])).round(2)
+    df = pd.DataFrame({'date': dates, 'open': close - 0.25, 'high': close + 0.5, 'low': close - 0.5, 'close': close, 'bpv': 50.0,
+                       'vol': rng.integers(1, 500, size = dates.shape[0]), 'metric': rng.normal(size = dates.shape[0]).astype(np.float32)})
+    df.loc[rng.random(df.shape[0]) < 0.02, 'metric'] = np.nan
+    df.insert(1, 'session_start', ingest.flag_session_start(df['date'], session.sess_start))
+    return df, session
+
+def make_dashboard(df, session, **params):
+    '''
+    Function to build a dashboard holding the bars of a request, without the sidebar.
+    '''
+    board = dashboard.Dashboard.__new__(dashboard.Dashboard)
+    board.dict_month = {'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6, 'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12}
+    board.dict_day_of_week = {'Mon': 0, 'Tue': 1, 'Wed': 2, 'Thu': 3, 'Fri': 4, 'Sat': 5, 'Sun': 6}
+    board.session = session
+    board.messages = []
+    board.shown = []
+    board.metric_matrix_key = None
+    board.heatmap = 'No'
+    board.percentiles = []
+    board.confidence = 'No'
+    board.df = df.copy()
+    for key, value in params.items():
+        setattr(board, key, value)
+    board._add_split_period()
+    return board
+
+def group(df, session, use_matrix, **params):
+    board = make_dashboard(df, session, **params)
+    if use_matrix:
+        assert board._group_data_matrix()
+    else:
+        board._group_data_matrix = lambda: False
+        board._group_data()
+    return board
+
+LIST_GROUP_BY = ['Time', 'Day of week + time', 'Day of month + time', 'Month + time', 'Month + day of month + time']
+
+@pytest.mark.parametrize('sess_start, sess_end', [('17:00:00', '16:00:00'), ('08:00:00', '22:00:00')])
+@pytest.mark.parametrize('split_in_periods', ['No', 'By year'])
+@pytest.mark.parametrize('group_function', ['Mean', 'Median', 'Sum', 'Count', 'Std', 'Cumsum'])
+def test_matrix_equals_groupby(sess_start, sess_end, split_in_periods, group_function):
+    df, session = make_bars(sess_start, sess_end)
+    for group_by in LIST_GROUP_BY:
+        # the cumulative sum of this grouping follows the order of the days of month as strings
+        if (group_by == 'Month + day of month + time') and (group_function == 'Cumsum'):
+            continue
+        params = {'metric': 'Range', 'group_by': group_by, 'group_function': group_function, 'split_in_periods': split_in_periods}
+        board_matrix = group(df, session, True, **params)
+        board_groupby = group(df, session, False, **params)
+        df_groupby = board_groupby.df[board_matrix.df.columns]
+        pd.testing.assert_frame_equal(board_matrix.df, df_groupby, check_dtype = False, rtol = 1e-5, atol = 1e-4)
+        assert (board_matrix.col_x, board_matrix.col_color, board_matrix.group_cols) == (board_groupby.col_x, board_groupby.col_color,
+                                                                                          board_groupby.group_cols)
+
+@pytest.mark.parametrize('group_function', ['Mean', 'Cumsum'])
+def test_matrix_equals_groupby_two_metrics(group_function):
+    df, session = make_bars('17:00:00', '16:00:00')
+    df = df.rename(columns = {'metric': 'metric_1'})
+    df['metric_2'] = (df['metric_1'].abs() > 1).astype(np.float32)
+    params = {'metric': ['Num highs', 'Body'], 'group_by': 'Day of week + time', 'group_function': group_function, 'split_in_periods': 'By two years'}
+    board_matrix = group(df, session, True, **params)
+    board_groupby = group(df, session, False, **params)
+    pd.testing.assert_frame_equal(board_matrix.df, board_groupby.df[board_matrix.df.columns], check_dtype = False, rtol = 1e-5, atol = 1e-4)
+    assert (board_matrix.metric, board_matrix.group_function) == (board_groupby.metric, board_groupby.group_function)
@@ -0,0 +1,28 @@
+import session_registry
+from session_registry import Session
+
+def test_time_options_overnight_session():
+    session = Session('ES', ['17:00:00', '16:00:00'])
+    assert session.time_options[0] == '17:00:00'
+    assert session.time_options[-1] == '16:00:00'
+    assert len(session.time_options) == 23*12 + 1
+    assert session.minutes_shift == 17*60
+
+def test_time_options_whole_day_session():
+    session = Session('BTCUSD', ['00:00:00', '23:59:00'])
+    assert session.time_options[-2:] == ['23:55:00', '23:59:59']
+    assert session.minutes_shift == 0
+
+def test_regions_across_midnight():
+    session = Session('CL', ['18:00:00', '17:00:00'], rth = ['09:00:00', '14:30:00'],
+                      regions = [{'label': 'Asia', 'color': 'yellow', 'start': '18:00:00', 'end': '02:00:00'}])
+    assert session.regions == [('Asia', 'yellow', 18*60, 2*60, 22*60)]
+    assert session_registry.to_time(session.rth_middle) == '11:45:00'
+    assert session.get_position(60) == 7*60
+
+def test_registry_file():
+    registry = session_registry.load_registry()
+    assert 'BTCUSD' not in session_registry.list_instruments()
+    assert registry['FDAX'].minutes_shift == 60
+    assert (registry['ES'].tick == 0.25) and (registry['GC'].tick is None)
+    assert all(session.time_options[0] == session.sess_start for session in registry.values())
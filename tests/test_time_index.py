@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+from time_index import TimeIndex, reduce_segments, segment_argmax, segment_argmin, segment_offsets
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(0)
+    n = 2000
+    return pd.DataFrame({'session_start': rng.random(n) < 0.05, 'open': rng.normal(0, 1, n), 'high': rng.normal(0, 1, n),
+                         'low': rng.normal(0, 1, n), 'vol': rng.integers(1, 500, n), 'n_sess': np.sort(rng.integers(0, 40, n)).astype(float)})
+
+def test_reduce_segments_equals_groupby(bars):
+    dict_agg = {'session_start': 'sum', 'open': 'first', 'high': 'max', 'low': 'min', 'vol': 'sum', 'n_sess': 'last'}
+    df_result = reduce_segments(bars, segment_offsets(bars['n_sess'].values), dict_agg)
+    pd.testing.assert_frame_equal(df_result, bars.groupby('n_sess').agg(dict_agg).reset_index(drop = True))
+    assert reduce_segments(bars.iloc[:0], segment_offsets(bars['n_sess'].values[:0]), {'high': 'max', 'open': 'first'}).shape == (0, 2)
+
+def test_segment_offsets_equals_groupby(bars):
+    offsets = segment_offsets(bars['n_sess'].values)
+    sizes = bars.groupby('n_sess', sort = False).size().values
+    np.testing.assert_array_equal(offsets, np.concatenate(([0], np.cumsum(sizes))))
+    np.testing.assert_array_equal(segment_offsets(np.zeros(0)), [0])
+
+@pytest.mark.parametrize('function', ['idxmax', 'idxmin'])
+def test_segment_argextreme_equals_idxextreme(bars, function):
+    values = bars['high'].values.copy()
+    values[::7] = np.nan
+    # a segment with only NaN
+    values[bars['n_sess'].values == bars['n_sess'].values[0]] = np.nan
+    offsets = segment_offsets(bars['n_sess'].values)
+    rows = {'idxmax': segment_argmax, 'idxmin': segment_argmin}[function](values, offsets)
+    valid = ~np.isnan(values)
+    expected = getattr(pd.Series(values[valid], index = np.flatnonzero(valid)).groupby(bars['n_sess'].values[valid]), function)()
+    assert rows[0] == -1
+    np.testing.assert_array_equal(rows[1:], expected.values)
+    assert segment_argmax(np.array([5, np.nan, 4]), np.array([0, 3]))[0] == 0
+
+def test_segment_argextreme_empty_segments():
+    values = np.array([3.0, 1.0, 4.0, 1.0, 5.0, 9.0])
+    offsets = np.array([0, 2, 2, 5, 5, 6])
+    np.testing.assert_array_equal(segment_argmax(values, offsets), [0, -1, 4, -1, 5])
+    np.testing.assert_array_equal(segment_argmin(values, offsets), [1, -1, 3, -1, 5])
+    assert segment_argmax(values[:0], np.zeros(1, dtype = np.int64)).shape == (0,)
+
+def test_locate_and_slice():
+    dates = pd.Series(pd.date_range('2024-01-01 17:00', periods = 5000, freq = '7min'))
+    # sessions start at 17:00
+    n_sess = (dates.values.view(np.int64) - 17*3600*10**9)//(86400*10**9)
+    index = TimeIndex(dates.values.view(np.int64), n_sess)
+    for date_start, date_end in [('2024-01-03', '2024-01-05 12:00'), ('2023-01-01', '2024-01-01 17:00'), ('2024-02-01', '2024-01-01')]:
+        i_start, i_end = index.locate(date_start, date_end)
+        in_range = (dates >= pd.Timestamp(date_start)) & (dates <= pd.Timestamp(date_end))
+        assert (i_start, i_end) == ((int(np.argmax(in_range.values)), int(np.argmax(in_range.values)) + int(in_range.sum()))
+                                    if in_range.any() else (i_start, i_start))
+        index_slice = index.slice(i_start, i_end)
+        np.testing.assert_array_equal(index_slice.timestamps, index.timestamps[i_start:i_end])
+        np.testing.assert_array_equal(index_slice.day_offsets, segment_offsets(index_slice.timestamps//(86400*10**9)) if i_end > i_start
+                                      else [0])
+        np.testing.assert_array_equal(index_slice.sess_offsets, segment_offsets(n_sess[i_start:i_end]) if i_end > i_start else [0])
@@ -0,0 +1,336 @@
+import numpy as np
+import pandas as pd
+
+# nanoseconds in a day
+NS_PER_DAY = 86400*10**9
+
+def segment_offsets(keys):
+    '''
+    Function to compute the row offsets of the contiguous segments of an ordered array of keys.
+
+    Args:
+        keys: Array of keys; rows belonging to the same segment have to be contiguous.
+
+    Returns:
+        offsets: Array of length `number of segments + 1`; segment `i` spans rows `offsets[i]:offsets[i + 1]`.
+    '''
+    keys = np.asarray(keys)
+    if keys.shape[0] == 0:
+        return np.zeros(1, dtype = np.int64)
+    starts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    return np.concatenate(([0], starts, [keys.shape[0]])).astype(np.int64)
+
+def flag_offsets(flags):
+    '''
+    Function to compute the row offsets of the segments opened by a boolean flag (e.g., `session_start`). Rows preceding the first flag are not
+    part of any segment.
+
+    Args:
+        flags: Boolean array; `True` marks the first row of a segment.
+
+    Returns:
+        offsets: Array of length `number of segments + 1`.
+    '''
+    flags = np.asarray(flags, dtype = bool)
+    return np.concatenate((np.flatnonzero(flags), [flags.shape[0]])).astype(np.int64)
+
+def segment_labels(offsets):
+    '''
+    Function to broadcast segment numbers back to rows.
+
+    Args:
+        offsets: Segment offsets, as returned by `segment_offsets` or `flag_offsets`.
+
+    Returns:
+        labels: Array with the segment number of each row, `-1` for rows preceding the first segment.
+    '''
+    labels = np.repeat(np.arange(offsets.shape[0] - 1, dtype = np.int64), np.diff(offsets))
+    return np.concatenate((np.full(offsets[0], -1, dtype = np.int64), labels))
+
+def segment_first_true(mask, offsets):
+    '''
+    Function to find, for each segment, the first row where `mask` is `True`.
+
+    Args:
+        mask: Boolean array.
+        offsets: Segment offsets.
+
+    Returns:
+        rows: Array with the position of the first `True` row of each segment, `-1` if the segment has none.
+    '''
+    rows = np.full(offsets.shape[0] - 1, -1, dtype = np.int64)
+    pos = np.flatnonzero(mask)
+    pos = pos[pos >= offsets[0]]
+    if pos.shape[0] > 0:
+        seg = np.searchsorted(offsets, pos, side = 'right') - 1
+        seg_unique, first = np.unique(seg, return_index = True)
+        rows[seg_unique] = pos[first]
+    return rows
+
+def _segment_extreme(values, offsets, function):
+    '''
+    Function to find the position of the (first) extreme of each segment, where extremes are given by `function` (`np.fmax` or `np.fmin`).
+    '''
+    values = np.asarray(values)
+    nonempty = np.flatnonzero(np.diff(offsets) > 0)
+    if nonempty.shape[0] == 0:
+        return np.full(max(offsets.shape[0] - 1, 0), -1, dtype = np.int64)
+    # empty segments span no rows, so each non-empty segment ends where the next one starts
+    extreme = function.reduceat(values[:offsets[-1]], offsets[nonempty])
+    mask = np.zeros(values.shape[0], dtype = bool)
+    mask[offsets[0]:offsets[-1]] = values[offsets[0]:offsets[-1]] == np.repeat(extreme, np.diff(offsets)[nonempty])
+    return segment_first_true(mask, offsets)
+
+def segment_argmax(values, offsets):
+    '''
+    Function to find the position of the (first) maximum of each segment, as `groupby().idxmax()` would do (NaN are skipped).
+
+    Args:
+        values: Array of values.
+        offsets: Segment offsets.
+
+    Returns:
+        rows: Array with the position of the maximum of each segment, `-1` if the segment is empty or has only NaN.
+    '''
+    return _segment_extreme(values, offsets, np.fmax)
+
+def segment_argmin(values, offsets):
+    '''
+    Function to find the position of the (first) minimum of each segment, as `groupby().idxmin()` would do (NaN are skipped).
+
+    Args:
+        values: Array of values.
+        offsets: Segment offsets.
+
+    Returns:
+        rows: Array with the position of the minimum of each segment, `-1` if the segment is empty or has only NaN.
+    '''
+    return _segment_extreme(values, offsets, np.fmin)
+
+def reduce_segments(df, offsets, dict_agg):
+    '''
+    Function to aggregate the contiguous segments of a frame (e.g., the bars of each session), as `groupby().agg()` would do for frames without
+    missing values, with one `reduceat` (or one fancy indexing) per column.
+
+    Args:
+        df: Frame.
+        offsets: Segment offsets; segments must not be empty.
+        dict_agg: Dictionary with the aggregation ('first', 'last', 'max', 'min' or 'sum') of each column.
+
+    Returns:
+        df_result: Frame with one row per segment.
+    '''
+    dict_result = {}
+    for col, function in dict_agg.items():
+        values = df[col].values
+        if function == 'first':
+            dict_result[col] = values[offsets[:-1]]
+        elif function == 'last':
+            dict_result[col] = values[offsets[1:] - 1]
+        elif offsets.shape[0] < 2:
+            dict_result[col] = values[:0]
+        elif function == 'sum':
+            dict_result[col] = np.add.reduceat(values.astype(np.int64) if values.dtype == bool else values, offsets[:-1])
+        else:
+            dict_result[col] = {'max': np.maximum, 'min': np.minimum}[function].reduceat(values, offsets[:-1])
+    return pd.DataFrame(dict_result)
+
+def to_ns(dates):
+    '''
+    Function to convert dates to int64 nanosecond timestamps without copying, when possible.
+
+    Args:
+        dates: Series (or array) of naive datetimes.
+
+    Returns:
+        ts: Array of int64 timestamps.
+    '''
+    return np.asarray(dates, dtype = 'datetime64[ns]').view(np.int64)
+
+def _clock_table(seconds, prefix = ''):
+    '''
+    Function to get a table of the times of the day ('%H:%M:%S'), by second after midnight, where only the times among `seconds` are formatted.
+    '''
+    present = np.flatnonzero(np.bincount(seconds, minlength = 86400))
+    table = np.empty(86400, dtype = object)
+    table[present] = [f'{prefix}{i//3600:02d}:{i//60%60:02d}:{i%60:02d}' for i in present]
+    return table
+
+def format_dates(dates):
+    '''
+    Function to format dates as strings, as `pd.Series.astype(str)` does ('%Y-%m-%d %H:%M:%S', or '%Y-%m-%d' if all dates are at midnight).
+    Distinct days and times of the day are formatted once, then concatenated.
+
+    Args:
+        dates: Series (or array) of naive datetimes.
+
+    Returns:
+        text: Object array of strings.
+    '''
+    ts = to_ns(dates)
+    if (ts.shape[0] == 0) or (ts%10**9 != 0).any():
+        return pd.Series(dates).astype(str).values
+    days = ts//NS_PER_DAY
+    day_first = days.min()
+    days = days - day_first
+    present = np.flatnonzero(np.bincount(days))
+    table_days = np.empty(present[-1] + 1, dtype = object)
+    table_days[present] = np.datetime_as_string((present + day_first).astype('datetime64[D]')).tolist()
+    seconds = ts%NS_PER_DAY//10**9
+    if (seconds == 0).all():
+        return table_days[days]
+    return table_days[days] + _clock_table(seconds, ' ')[seconds]
+
+def format_times(ts):
+    '''
+    Function to format the times of the day of timestamps as strings, as `pd.Series.dt.time.astype(str)` does ('%H:%M:%S'). Distinct times are
+    formatted once.
+
+    Args:
+        ts: Array of int64 timestamps (nanoseconds).
+
+    Returns:
+        text: Object array of strings.
+    '''
+    if (ts%10**9 != 0).any():
+        return pd.Series(ts.view('datetime64[ns]')).dt.time.astype(str).values
+    seconds = ts%NS_PER_DAY//10**9
+    return _clock_table(seconds)[seconds]
+
+class TimeIndex:
+    def __init__(self, timestamps, n_sess = None):
+        '''
+        Index of a time-ordered frame, holding int64 timestamps and the row offsets of each calendar day and each session, so that date ranges
+        can be located with `searchsorted` and per-day/per-session operations can use offsets instead of `groupby`.
+
+        Args:
+            timestamps: Sorted int64 timestamps (nanoseconds), one per row.
+            n_sess: Session counter of each row; if `None`, session offsets are not available.
+        '''
+        self.timestamps = timestamps
+        self.day_offsets = segment_offsets(timestamps//NS_PER_DAY)
+        self.sess_offsets = None
+        if n_sess is not None:
+            self.sess_offsets = segment_offsets(n_sess)
+
+    @classmethod
+    def from_frame(cls, df):
+        '''
+        Function to build the index of a frame with (sorted) `date` and, optionally, `n_sess` columns.
+
+        Args:
+            df: Frame to index.
+
+        Returns:
+            index: Instance of `TimeIndex`.
+        '''
+        n_sess = df['n_sess'].values if 'n_sess' in df.columns else None
+        return cls(to_ns(df['date']), n_sess)
+
+    def __len__(self):
+        return self.timestamps.shape[0]
+
+    @property
+    def n_days(self):
+        '''Number of calendar days.'''
+        return self.day_offsets.shape[0] - 1
+
+    @property
+    def n_sessions(self):
+        '''Number of sessions (`None` if session offsets are not available).'''
+        return None if self.sess_offsets is None else self.sess_offsets.shape[0] - 1
+
+    def locate(self, date_start, date_end):
+        '''
+        Function to find the rows whose date lies in `[date_start, date_end]`.
+
+        Args:
+            date_start: First date (anything accepted by `pd.Timestamp`).
+            date_end: Last date (anything accepted by `pd.Timestamp`).
+
+        Returns:
+            i_start: First row of the range.
+            i_end: Row after the last one of the range.
+        '''
+        i_start = np.searchsorted(self.timestamps, pd.Timestamp(date_start).value, side = 'left')
+        i_end = np.searchsorted(self.timestamps, pd.Timestamp(date_end).value, side = 'right')
+        return int(i_start), int(max(i_end, i_start))
+
+    def slice(self, i_start, i_end):
+        '''
+        Function to build the index of rows `i_start:i_end`, reusing the timestamps buffer.
+
+        Args:
+            i_start: First row.
+            i_end: Row after the last one.
+
+        Returns:
+            index: Instance of `TimeIndex`.
+        '''
+        index = TimeIndex.__new__(TimeIndex)
+        index.timestamps = self.timestamps[i_start:i_end]
+        index.day_offsets = _slice_offsets(self.day_offsets, i_start, i_end)
+        index.sess_offsets = None
+        if self.sess_offsets is not None:
+            index.sess_offsets = _slice_offsets(self.sess_offsets, i_start, i_end)
+        return index
+
+    def time_of_day(self):
+        '''
+        Function to get the time of day of each row.
+
+        Args: None.
+
+        Returns:
+            tod: Array with the nanoseconds elapsed since midnight.
+        '''
+        return self.timestamps%NS_PER_DAY
+
+    def day_labels(self):
+        '''
+        Function to get the calendar day number (starting from 0) of each row.
+
+        Args: None.
+
+        Returns:
+            labels: Array of day numbers.
+        '''
+        return segment_labels(self.day_offsets)
+
+    def sess_labels(self):
+        '''
+        Function to get the session number (starting from 0) of each row.
+
+        Args: None.
+
+        Returns:
+            labels: Array of session numbers.
+        '''
+        return segment_labels(self.sess_offsets)
+
+def _slice_offsets(offsets, i_start, i_end):
+    '''
+    Function to restrict segment offsets to rows `i_start:i_end`, clipping the segments at the borders.
+    '''
+    if i_end <= i_start:
+        return np.zeros(1, dtype = np.int64)
+    inner = offsets[(offsets > i_start) & (offsets < i_end)]
+    return np.concatenate(([i_start], inner, [i_end])).astype(np.int64) - i_start
+
+def session_start_weekday(df):
+    '''
+    Function to get, for each row, the weekday of the session it belongs to, where sessions are opened by the `session_start` flag. It replaces
+    the merge of the session-start rows followed by a forward fill.
+
+    Args:
+        df: Time-ordered frame with `date` and `session_start` columns.
+
+    Returns:
+        weekday: Float array with the weekday of the session start, `NaN` for rows preceding the first session start.
+    '''
+    offsets = flag_offsets(df['session_start'].values == True)
+    labels = segment_labels(offsets)
+    weekday_start = ((to_ns(df['date'])[offsets[:-1]]//NS_PER_DAY + 3)%7).astype(float)
+    weekday = np.full(labels.shape[0], np.nan)
+    weekday[labels >= 0] = weekday_start[labels[labels >= 0]]
+    return weekday